@@ -9,13 +9,15 @@ import sys
 import os
 import hashlib
 import time
-import gzip
 import inspect
+from .monitoring import MonitoringTracer, resolveTraceBackend
+from .trace_writer import BackgroundTraceWriter, DEFAULT_BUFFER_BYTES
 
 class TestResult:
     def __init__(self, trace: bool = False, prof: bool = False, cov: bool = False, 
                  outputDir: str = ".", testName: str = "",
-                 automation_root: Path = None, project_root_dir: str = ""):
+                 automation_root: Path = None, project_root_dir: str = "", trace_backend: str = "auto",
+                 trace_buffer_bytes: int = DEFAULT_BUFFER_BYTES):
         
         self.outputDir = outputDir
         self.prof = prof
@@ -23,9 +25,15 @@ class TestResult:
         self.cov = cov
         self.testName = testName
         
-        # Buffer para Tracing
+        # Buffer para Tracing (descarregado em blocos para o writer em segundo plano)
         self.traceBuffer = []
         self.trace_depth = 0
+        self.trace_buffer_bytes = trace_buffer_bytes
+        self._buffered_bytes = 0
+        self._trace_writer = None
+        self.trace_backend = resolveTraceBackend(trace_backend)
+        self._monitor = None
+        self._code_cache = {}
         
         # Contadores
         self.passed = 0
@@ -37,29 +45,54 @@ class TestResult:
         self.profiler = None
         self.start_time = 0
 
+    def _should_trace(self, code) -> Optional[bool]:
+        """ Filtra ruído interno (site-packages, código gerado), memoizado por code object """
+        try:
+            return self._code_cache[code]
+        except KeyError:
+            filename = code.co_filename
+            traced = None if "site-packages" in filename or "<string>" in filename else True
+            self._code_cache[code] = traced
+            return traced
+
     def trace_calls(self, frame, event, arg):
         """ Callback para sys.settrace """
-        if event != 'call' and event != 'return':
-            return self.trace_calls
+        if event != 'call':
+            return None
 
-        co = frame.f_code
-        func_name = co.co_name
-        filename = co.co_filename
-        
-        # Filtra ruído interno
-        if "site-packages" in filename or "<string>" in filename:
-            return self.trace_calls
+        if self._should_trace(frame.f_code) is None:
+            return None
 
+        frame.f_trace_lines = False
+        self._record_call(frame.f_code)
+        return self._trace_return
+
+    def _trace_return(self, frame, event, arg):
+        if event == 'return':
+            self._record_return(frame.f_code, arg)
+        return self._trace_return
+
+    def _record_call(self, code):
         indent = "  " * self.trace_depth
-        
-        if event == 'call':
-            self.traceBuffer.append(f"{indent}> {func_name} in {filename}\n")
-            self.trace_depth += 1
-        elif event == 'return':
-            self.trace_depth = max(0, self.trace_depth - 1)
-            self.traceBuffer.append(f"{indent}< {func_name} returned\n")
-            
-        return self.trace_calls
+        self._buffer_line(f"{indent}> {code.co_name} in {code.co_filename}\n")
+        self.trace_depth += 1
+
+    def _record_return(self, code, arg):
+        indent = "  " * self.trace_depth
+        self.trace_depth = max(0, self.trace_depth - 1)
+        self._buffer_line(f"{indent}< {code.co_name} returned\n")
+
+    def _buffer_line(self, line):
+        self.traceBuffer.append(line)
+        self._buffered_bytes += len(line)
+        if self._buffered_bytes >= self.trace_buffer_bytes:
+            self._flush_trace_buffer()
+
+    def _flush_trace_buffer(self):
+        if self.traceBuffer:
+            self._trace_writer.submit("".join(self.traceBuffer).encode("utf-8"))
+        self.traceBuffer = []
+        self._buffered_bytes = 0
 
     @pytest.hookimpl(hookwrapper=True)
     def pytest_runtest_protocol(self, item, nextitem):
@@ -70,7 +103,13 @@ class TestResult:
             
         if self.trace:
             self.traceBuffer = []
-            sys.settrace(self.trace_calls)
+            self._buffered_bytes = 0
+            self._trace_writer = BackgroundTraceWriter(self._get_safe_filename(item, "trace.gz"))
+            if self.trace_backend == "monitoring":
+                self._monitor = MonitoringTracer(self._should_trace, lambda code, _: self._record_call(code), self._record_return)
+                self._monitor.start()
+            else:
+                sys.settrace(self.trace_calls)
         
         self.start_time = time.time()
         
@@ -81,7 +120,11 @@ class TestResult:
         self.total_duration += duration
         
         if self.trace:
-            sys.settrace(None)
+            if self._monitor is not None:
+                self._monitor.stop()
+                self._monitor = None
+            else:
+                sys.settrace(None)
             self._save_tracing(item)
 
         if self.prof and self.profiler:
@@ -106,10 +149,11 @@ class TestResult:
             print(f"Erro salvando profile: {e}")
 
     def _save_tracing(self, item):
-        filename = self._get_safe_filename(item, "trace.gz")
         try:
-            with gzip.open(filename, "wt", encoding="utf-8") as f:
-                f.writelines(self.traceBuffer)
+            try:
+                self._flush_trace_buffer()
+            finally:
+                self._trace_writer.close()
         except Exception as e:
             print(f"Erro salvando tracing: {e}")
 
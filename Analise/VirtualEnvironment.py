@@ -2,6 +2,9 @@ from typing import List, Tuple, Optional
 from pathlib import Path
 from os import getcwd, chdir
 from . import analise
+from .pipeline import PostProcessingPipeline, dispatch
+from .venv_cache import VenvCache, runInstallStep, shellStep, sourceRevision
+from .wheelhouse import Wheelhouse
 import subprocess
 import pytest
 import shutil
@@ -28,11 +31,21 @@ class VirtualEnvironment:
         "celery": ["pip install -e ."]
     }
 
-    def __init__(self, venv_dir: str, root_dir: str, requirements: Optional[List[Path]] = ["requirements.txt"]) -> None:
+    def __init__(self, venv_dir: str, root_dir: str, requirements: Optional[List[Path]] = ["requirements.txt"],
+                 cache_dir: Optional[str] = None, wheelhouse: Optional[Wheelhouse] = None) -> None:
+        """
+        :param cache_dir: diretório do cache de venvs. Com ele nenhum venv é criado aqui: runCommands monta (ou
+            reaproveita) o venv no cache, uma camada por comando, e venv_dir passa a apontar para ele.
+        :param wheelhouse: wheelhouse local usado pelos comandos de instalação.
+        """
         self._venv_dir = f"{root_dir}/{venv_dir}"
         self._requirements = requirements
         self._root_dir = root_dir
         self._repo_name = os.path.basename(root_dir)
+        self._cache = VenvCache(Path(cache_dir)) if cache_dir else None
+        self._wheelhouse = wheelhouse
+        if self._cache is not None:
+            return
 
         print(f"Criando Venv em: {self._venv_dir}")
         create_venv_cmd = ["virtualenv", "--clear", self._venv_dir]
@@ -48,22 +61,27 @@ class VirtualEnvironment:
     def venv_dir(self): return self._venv_dir
     
     def cleanUp(self):
-        if os.path.exists(self._venv_dir):
+        # As camadas do cache são compartilhadas e nunca são apagadas por um ambiente
+        if self._cache is None and os.path.exists(self._venv_dir):
             shutil.rmtree(self._venv_dir)
 
-    def runCommands(self, commands: Optional[List[str]] = None) -> Tuple[str, str]:
-        activate_cmd = f"source '{self._venv_dir}/bin/activate'"
-        full_command_script = [activate_cmd, "pip install --upgrade pip setuptools wheel"]
+    @classmethod
+    def recipeFor(cls, repo_name: str) -> Optional[List[str]]:
+        """Receita do CUSTOM_INSTALLS para o repositório, se houver."""
+        for key in cls.CUSTOM_INSTALLS:
+            if key.lower() in repo_name.lower():
+                return cls.CUSTOM_INSTALLS[key]
+        return None
+
+    def installCommands(self, commands: Optional[List[str]] = None) -> List[str]:
+        """Comandos de instalação do projeto (receita do CUSTOM_INSTALLS ou instalação genérica), em ordem."""
+        full_command_script = ["pip install --upgrade pip setuptools wheel"]
 
         # INSTALA DEPENDÊNCIAS DE ANÁLISE (Coverage precisa do pytest-cov)
         full_command_script.append("pip install pytest pytest-cov")
 
         # --- APLICAÇÃO DAS VACINAS ---
-        receita_especial = None
-        for key in self.CUSTOM_INSTALLS:
-            if key.lower() in self._repo_name.lower():
-                receita_especial = self.CUSTOM_INSTALLS[key]
-                break
+        receita_especial = self.recipeFor(self._repo_name)
         
         if receita_especial:
             print(f"[VACINA] Aplicando instalação customizada para: {self._repo_name}")
@@ -77,12 +95,35 @@ class VirtualEnvironment:
 
         if commands:
             full_command_script.extend(commands)
+        return full_command_script
+
+    def runCommands(self, commands: Optional[List[str]] = None) -> Tuple[str, str]:
+        full_command_script = self.installCommands(commands)
+        steps = [shellStep(command, Path(self._root_dir)) for command in full_command_script]
+        if self._cache is not None:
+            try:
+                self._venv_dir = str(self._cache.build(steps, Path(self._root_dir), sourceRevision(Path(self._root_dir)), self._wheelhouse))
+            except subprocess.CalledProcessError as e:
+                return e.stdout or "", e.stderr or ""
+            return f"Venv pronto no cache: {self._venv_dir}\n", ""
+
+        if self._wheelhouse is not None:
+            # Um comando por vez: cada um pode precisar construir as wheels que faltam antes de instalar
+            outputs = []
+            for step in steps:
+                try:
+                    outputs.append(runInstallStep(Path(self._venv_dir), step, Path(self._root_dir), self._wheelhouse).stdout)
+                except subprocess.CalledProcessError as e:
+                    return "".join(outputs) + (e.stdout or ""), e.stderr or ""
+            return "".join(outputs), ""
 
-        final_cmd = " && ".join(full_command_script)
+        activate_cmd = f"source '{self._venv_dir}/bin/activate'"
+        final_cmd = " && ".join([activate_cmd] + full_command_script)
         process = subprocess.run(final_cmd, shell=True, executable="/bin/bash", cwd=self._root_dir, capture_output=True, text=True)
         return process.stdout, process.stderr
 
-    def executePytest(self, test_node: str, params: List[bool], output_dir: str, origin_dir: str, count: int = 0, test_result_plugin = None) -> Tuple[str, float, int, int, int, int]:
+    def executePytest(self, test_node: str, params: List[bool], output_dir: str, origin_dir: str, count: int = 0, test_result_plugin = None, trace_backend: str = "auto",
+                      pipeline: Optional[PostProcessingPipeline] = None) -> Tuple[str, float, int, int, int, int]:
         cwd = getcwd()
         chdir(origin_dir)
 
@@ -97,7 +138,8 @@ class VirtualEnvironment:
             prof=include_profiling,
             cov=include_coverage,
             outputDir=output_dir,
-            testName=test_node.split("/")[-1]
+            testName=test_node.split("/")[-1],
+            trace_backend=trace_backend
         )
 
         pytest_args = [
@@ -119,57 +161,32 @@ class VirtualEnvironment:
         pytest.main(pytest_args, plugins=[test_result])
         
         # --- PÓS-PROCESSAMENTO (PARSERS) ---
-        
+        # Os parsers são importados como módulos: com pipeline rodam no pool, em paralelo com a próxima run;
+        # sem pipeline, rodam aqui mesmo. Os caminhos vão absolutos porque o worker não está no origin_dir.
+        abs_output_dir = os.path.abspath(output_dir)
+
         # 1. Coverage Parser
-        script_cov = os.path.join(self._root_dir, "parse_coverage.py")
-        if include_coverage and os.path.exists(script_cov) and os.path.exists(json_cov_path):
-             csv_cov_path = f"{output_dir}/coverage.csv"
-             subprocess.run([
-                 "python3", script_cov,
-                 "--input_file", json_cov_path,
-                 "--output_file", csv_cov_path,
-                 "--result", "PASSED" if test_result.passed > 0 else "FAILED"
-             ])
+        if include_coverage and os.path.exists(json_cov_path):
+             dispatch(pipeline, self._root_dir, "parse_coverage", "parse_coverage_data",
+                      os.path.abspath(json_cov_path), os.path.join(abs_output_dir, "coverage.csv"),
+                      "PASSED" if test_result.passed > 0 else "FAILED")
 
         # 2. Profiling Parser
-        # O parse_profiling.py espera texto, mas temos binário (.prof). Convertemos primeiro.
-        script_prof = os.path.join(self._root_dir, "parse_profiling.py")
-        if include_profiling and os.path.exists(script_prof):
+        # Exporta o binário (.prof) direto para CSV a partir do pstats.Stats, sem o texto intermediário.
+        if include_profiling:
             prof_files = [f for f in os.listdir(output_dir) if f.endswith(".prof")]
             for p_file in prof_files:
-                bin_path = os.path.join(output_dir, p_file)
-                txt_path = bin_path.replace(".prof", "_stats.txt")
+                bin_path = os.path.join(abs_output_dir, p_file)
                 csv_path = bin_path.replace(".prof", ".csv")
-                
-                try:
-                    # Converte Binário .prof -> Texto Formatado
-                    with open(txt_path, 'w') as f_txt:
-                        stats = pstats.Stats(bin_path, stream=f_txt)
-                        stats.sort_stats('cumulative')
-                        stats.print_stats()
-                    
-                    # Chama o script do usuário para converter Texto -> CSV
-                    subprocess.run([
-                        "python3", script_prof,
-                        "--input_file", txt_path,
-                        "--output_file", csv_path
-                    ])
-                except Exception as e:
-                    print(f"Erro processando profiling: {e}")
+                dispatch(pipeline, self._root_dir, "parse_profiling", "export_profiling_stats", bin_path, csv_path)
 
         # 3. Tracing Parser
-        script_trace = os.path.join(self._root_dir, "parse_tracing.py")
-        if include_tracing and os.path.exists(script_trace):
+        if include_tracing:
             trace_files = [f for f in os.listdir(output_dir) if f.endswith(".trace.gz")]
             for t_file in trace_files:
-                gz_path = os.path.join(output_dir, t_file)
+                gz_path = os.path.join(abs_output_dir, t_file)
                 csv_path = gz_path.replace(".trace.gz", ".csv")
-                
-                subprocess.run([
-                    "python3", script_trace,
-                    "--input_file", gz_path,
-                    "--output_file", csv_path
-                ])
+                dispatch(pipeline, self._root_dir, "parse_tracing", "parse_tracing_file", gz_path, csv_path)
 
         passed = test_result.passed
         failed = test_result.failed
@@ -0,0 +1,195 @@
+""" Repr limitado para os valores de retorno rastreados.
+
+O tracer só guarda os primeiros REPR_LIMIT caracteres de cada retorno. Um repr() completo de um DataFrame,
+de um dict enorme ou de um objeto de ORM monta a string inteira só para descartar quase tudo; aqui a
+montagem para assim que o orçamento de saída é atingido:
+* tipos builtin (escalares, str/bytes, list/tuple/set/dict) têm caminho rápido e são percorridos só até o limite;
+* objetos com o repr padrão de object são formatados direto, sem chamar repr();
+* tipos pesados conhecidos (DataFrame, Series, ndarray) viram um resumo com shape/dtype;
+* tipos listados em `placeholder_types` recebem um placeholder barato, sem chamar repr();
+* para os demais o repr() é chamado; tipos cujo repr falha entram em um cache por tipo e passam a falhar
+  sem chamá-lo de novo.
+A escolha depende só do tipo, nunca do tempo gasto: o mesmo valor gera o mesmo texto em todas as runs.
+"""
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+
+REPR_LIMIT = 150
+UNREPRESENTABLE = "[Unrepresentable object]"
+
+# Acima disso, a conversão de int para decimal é cara (e pode estourar sys.get_int_max_str_digits)
+_MAX_INT_BITS = 4096
+
+_SCALAR_TYPES = (type(None), bool, int, float, complex)
+
+# Resumos para tipos cujo repr é caro, identificados pelo nome para não importar as bibliotecas
+_SUMMARIZERS: Dict[str, Callable[[Any], str]] = {
+    "pandas.core.frame.DataFrame": lambda obj: f"<DataFrame shape={obj.shape}>",
+    "pandas.core.series.Series": lambda obj: f"<Series name={obj.name!r} length={len(obj)} dtype={obj.dtype}>",
+    "numpy.ndarray": lambda obj: f"<ndarray shape={obj.shape} dtype={obj.dtype}>",
+}
+
+
+class BoundedRepr:
+    """Gera reprs limitados a `limit` caracteres (mais "..." quando truncados), como o tracer já fazia.
+
+    :param limit: orçamento de caracteres da saída.
+    :param placeholder_types: nomes qualificados ("modulo.Classe") de tipos cujo repr é caro demais para o
+        tracer; recebem um placeholder com o nome do tipo.
+    """
+
+    def __init__(self, limit: int = REPR_LIMIT, placeholder_types: Iterable[str] = ()) -> None:
+        self.limit = limit
+        self.placeholder_types = frozenset(placeholder_types)
+        # tipo -> None (repr confiável) ou estratégia substituta
+        self._type_cache: Dict[type, Optional[Callable[[Any], str]]] = {}
+
+    def __call__(self, obj: Any) -> str:
+        try:
+            text = self._repr(obj, self.limit, set())
+        except Exception:
+            return UNREPRESENTABLE
+        if len(text) > self.limit:
+            return text[:self.limit] + "..."
+        return text
+
+    def _repr(self, obj: Any, budget: int, seen: Set[int]) -> str:
+        """Retorna o repr de obj ou um prefixo dele com mais de `budget` caracteres."""
+        obj_type = type(obj)
+
+        if obj_type in _SCALAR_TYPES:
+            if obj_type is int and obj.bit_length() > _MAX_INT_BITS:
+                return f"<int with {obj.bit_length()} bits>"
+            return repr(obj)
+
+        if obj_type is str or obj_type is bytes or obj_type is bytearray:
+            # Dentro de containers o orçamento restante pode ser negativo (o texto já passou do limite)
+            budget = max(budget, 0)
+            if len(obj) > budget:
+                # Um caractere a mais garante que o resultado passe do limite e seja marcado com "..."
+                return _truncatedRepr(obj, budget + 1)
+            return repr(obj)
+
+        if obj_type is list:
+            return self._sequence(obj, "[", "]", budget, seen)
+        if obj_type is tuple:
+            if len(obj) == 1:
+                return "(" + self._repr(obj[0], budget - 1, seen) + ",)"
+            return self._sequence(obj, "(", ")", budget, seen)
+        if obj_type is set:
+            return self._sequence(obj, "{", "}", budget, seen) if obj else "set()"
+        if obj_type is frozenset:
+            return "frozenset(" + self._sequence(obj, "{", "}", budget - 10, seen) + ")" if obj else "frozenset()"
+        if obj_type is dict:
+            return self._mapping(obj, budget, seen)
+
+        return self._object(obj, obj_type)
+
+    def _sequence(self, items, opening: str, closing: str, budget: int, seen: Set[int]) -> str:
+        if id(items) in seen:
+            return opening + "..." + closing
+        seen.add(id(items))
+        parts = []
+        used = len(opening)
+        for item in items:
+            # used conta o separador do próximo item; o texto montado até aqui tem used - 2 caracteres
+            if used - 2 > budget:
+                break
+            part = self._repr(item, budget - used, seen)
+            parts.append(part)
+            used += len(part) + 2
+        seen.discard(id(items))
+        return opening + ", ".join(parts) + closing
+
+    def _mapping(self, mapping: dict, budget: int, seen: Set[int]) -> str:
+        if id(mapping) in seen:
+            return "{...}"
+        seen.add(id(mapping))
+        parts = []
+        used = 1
+        for key, value in mapping.items():
+            if used - 2 > budget:
+                break
+            key_repr = self._repr(key, budget - used, seen)
+            value_repr = self._repr(value, budget - used - len(key_repr) - 2, seen)
+            parts.append(f"{key_repr}: {value_repr}")
+            used += len(key_repr) + len(value_repr) + 4
+        seen.discard(id(mapping))
+        return "{" + ", ".join(parts) + "}"
+
+    def _object(self, obj: Any, obj_type: type) -> str:
+        try:
+            strategy = self._type_cache[obj_type]
+        except KeyError:
+            strategy = self._strategyFor(obj_type)
+            self._type_cache[obj_type] = strategy
+
+        if strategy is not None:
+            return strategy(obj)
+
+        try:
+            return repr(obj)
+        except Exception:
+            self._type_cache[obj_type] = _unrepresentable
+            raise
+
+    def _strategyFor(self, obj_type: type) -> Optional[Callable[[Any], str]]:
+        if obj_type.__repr__ is object.__repr__:
+            return _defaultRepr
+        name = f"{obj_type.__module__}.{obj_type.__qualname__}"
+        if name in self.placeholder_types:
+            return _placeholder
+        summarizer = _SUMMARIZERS.get(name)
+        if summarizer is not None:
+            return _guarded(summarizer)
+        return None
+
+
+def _truncatedRepr(obj, length: int) -> str:
+    """repr() dos primeiros `length` caracteres de obj, com as aspas que o repr de obj inteiro usaria.
+
+    O repr escolhe as aspas olhando o conteúdo: "it's" usa aspas duplas, mas o corte "it" usaria simples. Sem
+    esse ajuste o resultado deixaria de ser um prefixo de repr(obj).
+    """
+    text = repr(obj[:length])
+    single, double = ("'", '"') if type(obj) is str else (b"'", b'"')
+    quote = '"' if single in obj and double not in obj else "'"
+    start = text.index(text[-2 if type(obj) is bytearray else -1])
+    if text[start] == quote:
+        return text
+    end = text.rindex(text[start])
+    body = text[start + 1:end]
+    if quote == "'":
+        # O corte usou aspas duplas por ter "'" e nenhuma '"': as simples passam a ser escapadas
+        body = body.replace("'", "\\'")
+    return text[:start] + quote + body + quote + text[end + 1:]
+
+
+def _defaultRepr(obj: Any) -> str:
+    """Mesmo texto de object.__repr__, sem despachar para o tipo."""
+    return f"<{_typeName(type(obj))} object at {hex(id(obj))}>"
+
+
+def _placeholder(obj: Any) -> str:
+    """Usado para tipos cujo repr é caro (placeholder_types) ou cujo resumo falhou."""
+    return f"<{_typeName(type(obj))} instance at {hex(id(obj))}>"
+
+
+def _typeName(obj_type: type) -> str:
+    module = obj_type.__module__
+    if module == "builtins":
+        return obj_type.__qualname__
+    return f"{module}.{obj_type.__qualname__}"
+
+
+def _unrepresentable(obj: Any) -> str:
+    # Assim como o repr() original, a falha contamina o container que contém o objeto
+    raise ValueError(f"repr de {_typeName(type(obj))} falhou anteriormente")
+
+
+def _guarded(summarizer: Callable[[Any], str]) -> Callable[[Any], str]:
+    def summary(obj: Any) -> str:
+        try:
+            return summarizer(obj)
+        except Exception:
+            return _placeholder(obj)
+    return summary
@@ -0,0 +1,234 @@
+""" Árvore de chamadas de um trace e busca das subárvores divergentes entre duas runs.
+
+O trace hierárquico já codifica o aninhamento pelos marcadores de profundidade (">>> f in arquivo" abre uma
+chamada, "<<< f returned: valor" fecha). Uma única passada em fluxo monta a árvore e calcula o hash de cada
+subárvore no estilo Merkle: H(função, arquivo, hashes dos filhos em ordem, retorno normalizado). Duas
+subárvores com o mesmo hash são iguais e nunca são visitadas.
+
+A comparação desce só pelos nós de hash diferente: os filhos são alinhados pelo hash (o mesmo alinhamento do
+trace_diff), os que sobram são pareados pelo nome da função, e a descida continua nos pares. Uma divergência
+é mínima quando não é explicada pelos filhos: uma chamada que só existe em uma das runs, ou um retorno
+diferente com todos os filhos iguais. O relatório traz a primeira divergência na ordem de execução e as
+menores subárvores divergentes, que apontam direto para a chamada de origem.
+"""
+from typing import Hashable, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from array import array
+import hashlib
+import re
+from .trace_diff import ADDRESS_PATTERN, matchingBlocks
+from .trace_format import iterTraceLines
+
+CALL_PATTERN = re.compile(r"^(>+) (.*) in (.*)$")
+RETURN_PATTERN = re.compile(r"^(<+) (.*?) returned: (.*)$")
+ROOT_LABEL = "<raiz>"
+
+
+class CallTree:
+    """Árvore de chamadas em arrays paralelos (um índice por nó; o nó 0 é a raiz virtual)."""
+
+    def __init__(self) -> None:
+        self.label_names: List[str] = []
+        self._label_ids = dict()
+        self.labels = array("i")
+        self.values: List[Optional[str]] = []
+        self.parent = array("i")
+        self.first_child = array("i")
+        self.next_sibling = array("i")
+        self.line = array("l")
+        self.size = array("i")
+        self.hashes: List[bytes] = []
+
+    def _label(self, label: str) -> int:
+        label_id = self._label_ids.get(label)
+        if label_id is None:
+            label_id = len(self.label_names)
+            self._label_ids[label] = label_id
+            self.label_names.append(label)
+        return label_id
+
+    def _newNode(self, label: str, parent: int, line: int) -> int:
+        node = len(self.labels)
+        self.labels.append(self._label(label))
+        self.values.append(None)
+        self.parent.append(parent)
+        self.first_child.append(-1)
+        self.next_sibling.append(-1)
+        self.line.append(line)
+        self.size.append(1)
+        self.hashes.append(b"")
+        return node
+
+    def children(self, node: int) -> List[int]:
+        result = []
+        child = self.first_child[node]
+        while child != -1:
+            result.append(child)
+            child = self.next_sibling[child]
+        return result
+
+    def labelOf(self, node: int) -> str:
+        return self.label_names[self.labels[node]]
+
+    def callPath(self, node: int) -> str:
+        """Cadeia de chamadas da raiz até o nó (só os nomes das funções)."""
+        names = []
+        while node > 0:
+            names.append(self.labelOf(node).split(" in ")[0])
+            node = self.parent[node]
+        return " > ".join(reversed(names)) or ROOT_LABEL
+
+    @classmethod
+    def fromLines(cls, lines: Iterable[str]) -> "CallTree":
+        """Monta a árvore em uma passada. Chamadas sem retorno (trace truncado) são fechadas com retorno vazio."""
+        tree = cls()
+        root = tree._newNode(ROOT_LABEL, -1, 0)
+        # Pilha de (nó, profundidade, hasher, último filho)
+        stack = [[root, 0, hashlib.blake2b(ROOT_LABEL.encode(), digest_size=16), -1]]
+
+        def close() -> None:
+            node, _, hasher, _ = stack.pop()
+            value = tree.values[node]
+            hasher.update(b"\x00" + (value or "").encode("utf-8", "surrogatepass"))
+            tree.hashes[node] = hasher.digest()
+            parent = stack[-1]
+            parent[2].update(tree.hashes[node])
+            tree.size[parent[0]] += tree.size[node]
+
+        for line_no, raw in enumerate(lines, start=1):
+            text = raw.rstrip("\n")
+            call = CALL_PATTERN.match(text)
+            if call:
+                depth = len(call.group(1))
+                while len(stack) > 1 and stack[-1][1] >= depth:
+                    close()
+                label = f"{call.group(2)} in {call.group(3)}"
+                node = tree._newNode(label, stack[-1][0], line_no)
+                if stack[-1][3] == -1:
+                    tree.first_child[stack[-1][0]] = node
+                else:
+                    tree.next_sibling[stack[-1][3]] = node
+                stack[-1][3] = node
+                stack.append([node, depth, hashlib.blake2b(label.encode("utf-8", "surrogatepass"), digest_size=16), -1])
+                continue
+            returned = RETURN_PATTERN.match(text)
+            if returned:
+                depth = len(returned.group(1))
+                while len(stack) > 1 and stack[-1][1] > depth:
+                    close()
+                if len(stack) > 1 and stack[-1][1] == depth:
+                    tree.values[stack[-1][0]] = ADDRESS_PATTERN.sub("0x?", returned.group(3))
+                    close()
+
+        while len(stack) > 1:
+            close()
+        tree.hashes[root] = stack[0][2].digest()
+        return tree
+
+    @classmethod
+    def fromTrace(cls, fileName: str) -> "CallTree":
+        return cls.fromLines(iterTraceLines(fileName))
+
+
+class Divergence(NamedTuple):
+    """Divergência mínima entre as árvores A e B (nodeA/nodeB = -1 quando a chamada só existe do outro lado)."""
+    kind: str
+    nodeA: int
+    nodeB: int
+    size: int
+
+
+def _align(keysA: List[Hashable], keysB: List[Hashable]) -> Iterator[Tuple[str, int, int]]:
+    """Alinha duas listas de chaves; gera ("equal", i, j) e ("gap", i, j) marcando o início de cada trecho
+    sem correspondência, terminado pelo próximo "equal" (ou pelo fim das listas)."""
+    ids = dict()
+    a = array("i", (ids.setdefault(key, len(ids)) for key in keysA))
+    b = array("i", (ids.setdefault(key, len(ids)) for key in keysB))
+    i = j = 0
+    for block in matchingBlocks(a, b):
+        if i < block.a or j < block.b:
+            yield "gap", i, j
+        for k in range(block.size):
+            yield "equal", block.a + k, block.b + k
+        i, j = block.a + block.size, block.b + block.size
+
+
+def findDivergences(treeA: CallTree, treeB: CallTree) -> List[Divergence]:
+    """Divergências mínimas entre duas árvores, na ordem de execução (pré-ordem)."""
+    divergences: List[Divergence] = []
+    stack: List[Tuple[str, int, int]] = [("pair", 0, 0)]
+    while stack:
+        kind, nodeA, nodeB = stack.pop()
+        if kind == "onlyA":
+            divergences.append(Divergence("chamada só na run A", nodeA, -1, treeA.size[nodeA]))
+            continue
+        if kind == "onlyB":
+            divergences.append(Divergence("chamada só na run B", -1, nodeB, treeB.size[nodeB]))
+            continue
+        if treeA.hashes[nodeA] == treeB.hashes[nodeB]:
+            continue
+
+        childrenA = treeA.children(nodeA)
+        childrenB = treeB.children(nodeB)
+        work: List[Tuple[str, int, int]] = []
+        boundaries = list(_align([treeA.hashes[c] for c in childrenA], [treeB.hashes[c] for c in childrenB]))
+        boundaries.append(("equal", len(childrenA), len(childrenB)))
+        gap_start: Optional[Tuple[int, int]] = None
+        for tag, i, j in boundaries:
+            if tag == "gap":
+                gap_start = (i, j)
+                continue
+            if gap_start is not None:
+                # Trecho sem hash igual: pareia pelo nome da função e desce nos pares
+                gapA = childrenA[gap_start[0]:i]
+                gapB = childrenB[gap_start[1]:j]
+                pairedA = pairedB = 0
+                labelBoundaries = list(_align([treeA.labelOf(c) for c in gapA], [treeB.labelOf(c) for c in gapB]))
+                labelBoundaries.append(("equal", len(gapA), len(gapB)))
+                for labelTag, x, y in labelBoundaries:
+                    if labelTag != "equal":
+                        continue
+                    work.extend(("onlyA", c, -1) for c in gapA[pairedA:x])
+                    work.extend(("onlyB", -1, c) for c in gapB[pairedB:y])
+                    if x < len(gapA) and y < len(gapB):
+                        work.append(("pair", gapA[x], gapB[y]))
+                    pairedA, pairedB = x + 1, y + 1
+                gap_start = None
+
+        if not work:
+            divergences.append(Divergence("retorno diferente", nodeA, nodeB, treeA.size[nodeA] + treeB.size[nodeB]))
+        stack.extend(reversed(work))
+    return divergences
+
+
+def _describe(treeA: CallTree, treeB: CallTree, divergence: Divergence) -> str:
+    if divergence.nodeA == -1:
+        node = divergence.nodeB
+        return (f"{treeB.callPath(node)} (linha {treeB.line[node]} do trace B): {divergence.kind}, "
+                f"{treeB.size[node]} chamada(s)\n")
+    if divergence.nodeB == -1:
+        node = divergence.nodeA
+        return (f"{treeA.callPath(node)} (linha {treeA.line[node]} do trace A): {divergence.kind}, "
+                f"{treeA.size[node]} chamada(s)\n")
+    nodeA, nodeB = divergence.nodeA, divergence.nodeB
+    return (f"{treeA.callPath(nodeA)} (linhas {treeA.line[nodeA]} em A e {treeB.line[nodeB]} em B): "
+            f"{divergence.kind}: A={treeA.values[nodeA]} B={treeB.values[nodeB]}\n")
+
+
+def callTreeReport(traceA: str, traceB: str, limit: int = 5) -> List[str]:
+    """Compara as árvores de chamadas de dois traces.
+    :param traceA: trace da run A (ex: a que passou)
+    :param traceB: trace da run B (ex: a que falhou)
+    :param limit: quantidade de menores subárvores divergentes listadas
+    :returns: linhas do relatório (vazio se as árvores são idênticas)
+    """
+    treeA = CallTree.fromTrace(traceA)
+    treeB = CallTree.fromTrace(traceB)
+    divergences = findDivergences(treeA, treeB)
+    if not divergences:
+        return []
+    lines = [f"Divergências mínimas: {len(divergences)}\n",
+             "Primeira divergência: " + _describe(treeA, treeB, divergences[0]),
+             "Menores subárvores divergentes:\n"]
+    for divergence in sorted(divergences, key=lambda d: d.size)[:limit]:
+        lines.append("  - " + _describe(treeA, treeB, divergence))
+    return lines
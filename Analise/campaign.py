@@ -0,0 +1,380 @@
+""" Modo campanha: executa todos os testes de um CSV, agrupados por repositório.
+
+As linhas do CSV são agrupadas por (URL, Hash). Cada repositório é clonado e tem suas dependências instaladas
+uma única vez, e em seguida todos os seus testes rodam em sequência. Repositórios diferentes podem rodar em
+paralelo (max_parallel_repos), cada um em um processo próprio, já que runSpecificTests muda o diretório
+corrente e chama o pytest no próprio processo.
+"""
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from pathlib import Path
+import csv
+import multiprocessing
+import os
+import re
+import subprocess
+import sys
+from . import utils
+from .VirtualEnvironment import VirtualEnvironment
+from .venv_cache import InstallStep, populateWheelhouse, runInstallStep, runnerStep, shellStep
+from .wheelhouse import Wheelhouse
+
+# Nome canônico da coluna -> nomes aceitos (CSV de testes, projetos_compativel.csv e projeto.csv)
+COLUMN_ALIASES = {
+    "Name": ("Name", "RepoName", "Projetos"),
+    "URL": ("URL", "Repo", "Repositório (Link)"),
+    "Hash": ("Hash", "GitHash", "Hash do Commit (Checkout)"),
+    "No_Runs": ("No_Runs", "#Runs"),
+    "Test": ("Test", "Test_Node"),
+}
+
+
+class CampaignTest(NamedTuple):
+    node: str
+    no_runs: int
+
+
+class CampaignRepository:
+    """Um repositório (URL + hash) da campanha e os testes pedidos para ele."""
+
+    def __init__(self, name: str, url: str, githash: str) -> None:
+        self.name = name
+        self.url = url
+        self.githash = githash
+        # Nome usado no diretório Test-<mod_name>; recebe o hash quando o mesmo projeto aparece em mais de um commit
+        self.mod_name = name
+        self.tests: List[CampaignTest] = []
+
+    @property
+    def slug(self) -> str:
+        return re.sub(r'[^a-zA-Z0-9_\-]', '_', f"{self.name}-{self.githash[:12]}")
+
+    def repository(self) -> utils.Repository:
+        return utils.Repository(url=self.url, noruns=str(max((t.no_runs for t in self.tests), default=0)),
+                                githash=self.githash, isgitrepo=True)
+
+
+def _column(row: Dict[str, str], column: str) -> str:
+    for alias in COLUMN_ALIASES[column]:
+        value = (row.get(alias) or "").strip()
+        if value:
+            return value
+    return ""
+
+
+def readCampaign(csvFile: str, default_runs: int = 1) -> List[CampaignRepository]:
+    """Lê o CSV inteiro e agrupa os testes por (URL, Hash), na ordem em que aparecem.
+    :param csvFile: CSV com as colunas Name, URL, Hash, No_Runs e Test (ou seus nomes alternativos)
+    :param default_runs: runs usadas quando a linha não tem No_Runs
+    """
+    with open(csvFile, "r", encoding="utf-8", newline="") as f:
+        rows = [row for row in csv.reader(f)]
+    # Linhas vazias antes do cabeçalho (ex: ",,,,," no início do projeto.csv)
+    while rows and not any(cell.strip() for cell in rows[0]):
+        rows.pop(0)
+    if not rows:
+        return []
+    header = [cell.strip() for cell in rows[0]]
+
+    groups: Dict[tuple, CampaignRepository] = {}
+    for line_no, cells in enumerate(rows[1:], start=2):
+        row = dict(zip(header, cells))
+        url = _column(row, "URL")
+        if not url:
+            if any(cell.strip() for cell in cells):
+                print(f"AVISO: linha {line_no} do CSV sem URL, ignorada.")
+            continue
+        githash = _column(row, "Hash") or "."
+        key = (url, githash)
+        if key not in groups:
+            groups[key] = CampaignRepository(_column(row, "Name") or utils.getRepoName(url), url, githash)
+        test_node = _column(row, "Test")
+        if test_node:
+            no_runs = _column(row, "No_Runs")
+            groups[key].tests.append(CampaignTest(test_node, int(float(no_runs)) if no_runs else default_runs))
+
+    names: Dict[str, int] = {}
+    for group in groups.values():
+        names[group.name] = names.get(group.name, 0) + 1
+    for group in groups.values():
+        if names[group.name] > 1:
+            group.mod_name = f"{group.name}-{group.githash[:8]}"
+    return list(groups.values())
+
+
+def campaignVenv(venv_root: Path, group: CampaignRepository, wheelhouse: Optional[Wheelhouse] = None) -> Path:
+    """Ambiente virtual próprio do repositório em venv_root, criado (com o pytest) se ainda não existir."""
+    venv_dir = Path(venv_root).resolve() / group.slug
+    if not (venv_dir / "bin" / "python").exists():
+        print(f">>> Criando ambiente virtual {venv_dir}...")
+        subprocess.run([sys.executable, "-m", "venv", str(venv_dir)], check=True)
+        runInstallStep(venv_dir, runnerStep(), venv_dir, wheelhouse)
+    return venv_dir
+
+
+def campaignWheelhouse(run_options: Dict[str, Any]) -> Optional[Wheelhouse]:
+    wheelhouse = run_options.get("wheelhouse")
+    return Wheelhouse(Path(wheelhouse), run_options.get("offline", False)) if wheelhouse else None
+
+
+def populateCampaignWheelhouse(csvFile: str, wheelhouse_dir: Path, python: str = sys.executable,
+                               git_cache: Optional[str] = None) -> List[str]:
+    """Constrói no wheelhouse as wheels de todas as dependências dos repositórios de um CSV, sem executar testes.
+    Cada repositório é clonado e posto no commit pedido; entram o pytest do runner, cada requirements (filtrado)
+    e, se houver, a receita do CUSTOM_INSTALLS. As wheels são construídas com `python` e só servem para a
+    mesma versão do interpretador.
+    :returns: mensagens de erro (um repositório com erro não interrompe os demais)
+    """
+    wheelhouse = Wheelhouse(wheelhouse_dir)
+    done = set()
+    errors = []
+    for group in readCampaign(csvFile):
+        print(f"\n===== Wheelhouse: {group.name} @ {group.githash} =====")
+        try:
+            project_dir, requirements_files = utils.checkoutRepository(group.repository(), git_cache)
+            steps: List[InstallStep] = [runnerStep(), *utils.installationSteps(project_dir, requirements_files)]
+            steps.extend(shellStep(command, project_dir) for command in VirtualEnvironment.recipeFor(group.name) or [])
+        except Exception as e:
+            errors.append(f"{group.name} @ {group.githash}: {e}")
+            print(f"!!!!!! ERRO ao preparar '{group.name}' !!!!!!\nErro: {e}\n")
+            continue
+
+        for step in steps:
+            key = (repr(step.command), tuple(step.requirements or ()), str(project_dir) if step.inputs else "")
+            if key in done:
+                continue
+            done.add(key)
+            try:
+                if populateWheelhouse(wheelhouse, step, project_dir, python):
+                    print(f"--- Wheels construídas: {step.description or step.command}")
+            except subprocess.CalledProcessError as e:
+                errors.append(f"{group.name} @ {group.githash}: {step.description or step.command}: {e}")
+                print(f"!!!!!! ERRO ao construir as wheels de {step.description or step.command} !!!!!!\nErro (stderr):\n{e.stderr}\n")
+
+    print(f"\n>>> Wheelhouse {wheelhouse.root}: {wheelhouse.wheelCount()} wheels, {len(errors)} erro(s).")
+    return errors
+
+
+def runDiffFinder(test_directory: str, params: List[bool], no_runs: int, automation_root: Optional[Path] = None) -> None:
+    """Executa o diff_finder.py da raiz da automação sobre o diretório de um teste.
+    O tipo de análise segue a instrumentação pedida (profiling, senão tracing, senão coverage). O script roda no
+    Python da automação (que tem o NumPy), não no venv do projeto analisado.
+    """
+    tracing, coverage, profiling = params
+    if profiling:
+        analise_tipo, coluna_chave = "profiling", "filename:lineno(function)"
+    elif tracing:
+        analise_tipo, coluna_chave = "tracing", "Function"
+    elif coverage:
+        analise_tipo, coluna_chave = "coverage", "Percentual de Cobertura (%)"
+    else:
+        return
+
+    diff_finder_script = Path(automation_root or os.getcwd()) / "diff_finder.py"
+    if not diff_finder_script.exists():
+        print(f"AVISO: {diff_finder_script} não encontrado, pulando o diff_finder.")
+        return
+
+    command = [sys.executable, str(diff_finder_script), test_directory, analise_tipo, str(no_runs), coluna_chave]
+    print(f"Executando comando: {' '.join(command)}")
+    try:
+        subprocess.run(command, check=True, text=True)
+        print("--- diff_finder.py executado com sucesso. ---")
+    except subprocess.CalledProcessError as e:
+        print("!!!!!! ERRO ao executar o diff_finder.py !!!!!!")
+        print(f"Comando: {' '.join(e.cmd)}")
+        print(f"Código de Saída: {e.returncode}")
+        raise
+
+
+def prepareCampaignRepository(group: CampaignRepository, env_path: Optional[Path], venv_root: Optional[Path],
+                              run_options: Dict[str, Any]) -> Tuple[utils.Repository, Tuple[Path, List[Path], Path]]:
+    """Clona/atualiza o repositório e instala suas dependências (venv próprio, cache de venvs ou venv compartilhado).
+    :returns: o Repository e o retorno de prepareRepository
+    """
+    wheelhouse = campaignWheelhouse(run_options)
+    group_env = campaignVenv(venv_root, group, wheelhouse) if venv_root else Path(env_path) if env_path else None
+    repo = group.repository()
+    prepared = utils.prepareRepository(repo, group_env, run_options.get("venv_cache"), wheelhouse,
+                                       run_options.get("git_cache"))
+    return repo, prepared
+
+
+def runCampaignTests(group: CampaignRepository, repo: utils.Repository, prepared: Tuple[Path, List[Path], Path],
+                     params: List[bool], run_options: Dict[str, Any], analyze: bool = True) -> List[str]:
+    """Executa em sequência todos os testes de um repositório já preparado.
+    :returns: mensagens de erro (um teste com erro não interrompe os demais)
+    """
+    group_env = prepared[2]
+    errors = []
+    for test in group.tests:
+        try:
+            utils.runSpecificTests(repo=repo, mod_name=group.mod_name, params=params, test_node=test.node,
+                                   no_runs=test.no_runs, env_path=group_env, prepared=prepared, **run_options)
+            if analyze:
+                sanitized_test_name = re.sub(r'[^a-zA-Z0-9_\-]', '_', test.node.split("::")[-1])
+                test_directory = os.path.join(os.getcwd(), f"Test-{group.mod_name}", sanitized_test_name)
+                runDiffFinder(test_directory, params, test.no_runs)
+        except Exception as e:
+            errors.append(f"{group.name} @ {group.githash}: {test.node}: {e}")
+            print(f"!!!!!! ERRO no teste '{test.node}' !!!!!!\nErro: {e}\n")
+    return errors
+
+
+def runCampaignRepositories(groups: List[CampaignRepository], params: List[bool], env_path: Optional[Path] = None,
+                            venv_root: Optional[Path] = None, run_options: Optional[Dict[str, Any]] = None,
+                            analyze: bool = True) -> List[str]:
+    """Prepara cada repositório uma vez e executa todos os seus testes em sequência.
+    :returns: mensagens de erro (um teste ou repositório com erro não interrompe os demais)
+    """
+    run_options = run_options or {}
+    errors = []
+    for group in groups:
+        if not group.tests:
+            print(f"AVISO: '{group.name}' ({group.githash}) não tem testes no CSV, ignorado.")
+            continue
+        print(f"\n===== Repositório {group.name} @ {group.githash} ({len(group.tests)} testes) =====")
+        try:
+            repo, prepared = prepareCampaignRepository(group, env_path, venv_root, run_options)
+        except Exception as e:
+            errors.append(f"{group.name} @ {group.githash}: preparação falhou: {e}")
+            print(f"!!!!!! ERRO ao preparar '{group.name}' !!!!!!\nErro: {e}\n")
+            continue
+        errors.extend(runCampaignTests(group, repo, prepared, params, run_options, analyze))
+    return errors
+
+
+def campaignResources(group: CampaignRepository, env_path: Optional[Path], run_options: Dict[str, Any]) -> Set[str]:
+    """Recursos que a preparação e as runs do repositório usam com exclusividade: o diretório do projeto (o clone
+    é compartilhado pelos commits de um projeto; com o cache git cada commit tem seu worktree) e o venv, quando
+    todos os repositórios usam o mesmo. Com venv_root cada repositório já tem o seu, e as camadas do cache de
+    venvs não mudam depois de prontas.
+    """
+    repo_name = group.repository().name
+    if run_options.get("git_cache"):
+        resources = {f"worktree:{repo_name}-{group.githash}"}
+    else:
+        resources = {f"clone:{repo_name}"}
+    if env_path is not None:
+        resources.add("venv:compartilhado")
+    return resources
+
+
+def runCampaignPipelined(groups: List[CampaignRepository], params: List[bool], env_path: Optional[Path],
+                         venv_root: Optional[Path], run_options: Dict[str, Any], analyze: bool,
+                         max_parallel_repos: int, prepare_workers: int, prepare_ahead: int) -> List[str]:
+    """Executa a campanha em dois estágios com limites próprios: a preparação (clone, venv, instalação) roda em
+    prepare_workers threads, até prepare_ahead repositórios à frente das runs, enquanto as runs dos repositórios
+    já preparados rodam em max_parallel_repos processos. Repositórios que disputam um recurso (ver
+    campaignResources) nunca são preparados ou executados ao mesmo tempo.
+    :returns: mensagens de erro da campanha
+    """
+    errors: List[str] = []
+    pending = [group for group in groups if group.tests]
+    for group in groups:
+        if not group.tests:
+            print(f"AVISO: '{group.name}' ({group.githash}) não tem testes no CSV, ignorado.")
+    resources = {id(group): campaignResources(group, env_path, run_options) for group in pending}
+    held: Set[str] = set()
+    preparing: Dict[Future, CampaignRepository] = {}
+    ready: List[Tuple[CampaignRepository, utils.Repository, Tuple[Path, List[Path], Path]]] = []
+    running: Dict[Future, CampaignRepository] = {}
+
+    pool_options = {"max_tasks_per_child": 1} if sys.version_info >= (3, 11) else {}
+    with ThreadPoolExecutor(max_workers=prepare_workers) as prepare_pool, \
+         ProcessPoolExecutor(max_workers=max_parallel_repos, mp_context=multiprocessing.get_context("spawn"), **pool_options) as run_pool:
+        while pending or preparing or ready or running:
+            # Preparação: na ordem do CSV, pulando os repositórios cujos recursos estão em uso. Além dos
+            # prepare_ahead de folga, prepara um repositório para cada processo de runs livre
+            for group in list(pending):
+                lookahead = prepare_ahead + max(0, max_parallel_repos - len(running))
+                if len(preparing) >= prepare_workers or len(preparing) + len(ready) >= lookahead:
+                    break
+                if resources[id(group)] & held:
+                    continue
+                pending.remove(group)
+                held |= resources[id(group)]
+                print(f">>> Preparando {group.name} @ {group.githash}...")
+                preparing[prepare_pool.submit(prepareCampaignRepository, group, env_path, venv_root, run_options)] = group
+
+            while ready and len(running) < max_parallel_repos:
+                group, repo, prepared = ready.pop(0)
+                print(f"\n===== Repositório {group.name} @ {group.githash} ({len(group.tests)} testes) =====")
+                running[run_pool.submit(runCampaignTests, group, repo, prepared, params, run_options, analyze)] = group
+
+            done, _ = wait(list(preparing) + list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in preparing:
+                    group = preparing.pop(future)
+                    try:
+                        repo, prepared = future.result()
+                        ready.append((group, repo, prepared))
+                    except Exception as e:
+                        held -= resources[id(group)]
+                        errors.append(f"{group.name} @ {group.githash}: preparação falhou: {e}")
+                        print(f"!!!!!! ERRO ao preparar '{group.name}' !!!!!!\nErro: {e}\n")
+                else:
+                    group = running.pop(future)
+                    held -= resources[id(group)]
+                    try:
+                        errors.extend(future.result())
+                    except Exception as e:
+                        errors.append(f"{group.name} @ {group.githash}: {e}")
+    return errors
+
+
+def runCampaign(csvFile: str, params: List[bool], env_path: Optional[Path] = None, venv_root: Optional[Path] = None,
+                max_parallel_repos: int = 1, run_options: Optional[Dict[str, Any]] = None, analyze: bool = True,
+                prepare_ahead: int = 0, prepare_workers: int = 2) -> List[str]:
+    """Executa a campanha inteira de um CSV.
+    :param env_path: venv compartilhado por todos os repositórios (como em --run-specific-test)
+    :param venv_root: diretório com um venv por repositório; exige o runner "daemon", pois é ele que executa
+        os testes com o python do venv
+    O cache de venvs (run_options["venv_cache"]) substitui env_path e venv_root, também com o runner "daemon".
+    :param max_parallel_repos: repositórios executados ao mesmo tempo, cada um em um processo
+    :param prepare_ahead: repositórios preparados em segundo plano à frente das runs (0 = prepara e executa
+        cada repositório em sequência)
+    :param prepare_workers: preparações simultâneas quando prepare_ahead > 0
+    :returns: mensagens de erro da campanha
+    """
+    run_options = run_options or {}
+    venv_cache = run_options.get("venv_cache")
+    if sum(option is not None for option in (env_path, venv_root, venv_cache)) != 1:
+        raise ValueError("Informe exatamente um entre env_path (venv compartilhado), venv_root (um venv por repositório) "
+                         "e venv_cache (cache de venvs).")
+    if (venv_root is not None or venv_cache is not None) and run_options.get("runner", "inprocess") != "daemon":
+        raise ValueError("Com um venv por repositório (venv_root ou venv_cache) os testes precisam do runner 'daemon'.")
+    if max_parallel_repos < 1:
+        raise ValueError(f"max_parallel_repos deve ser maior que zero, recebido: {max_parallel_repos}")
+    if prepare_ahead < 0 or prepare_workers < 1:
+        raise ValueError(f"prepare_ahead deve ser >= 0 e prepare_workers > 0, recebidos: {prepare_ahead}, {prepare_workers}")
+
+    groups = readCampaign(csvFile)
+    print(f">>> Campanha: {sum(len(g.tests) for g in groups)} testes em {len(groups)} repositórios.")
+
+    # Commits diferentes do mesmo projeto compartilham o diretório do clone e nunca rodam ao mesmo tempo
+    units: Dict[str, List[CampaignRepository]] = {}
+    for group in groups:
+        units.setdefault(group.repository().name, []).append(group)
+
+    errors: List[str] = []
+    if prepare_ahead > 0:
+        errors.extend(runCampaignPipelined(groups, params, env_path, venv_root, run_options, analyze,
+                                           max_parallel_repos, prepare_workers, prepare_ahead))
+    elif max_parallel_repos == 1 or len(units) == 1:
+        for unit in units.values():
+            errors.extend(runCampaignRepositories(unit, params, env_path, venv_root, run_options, analyze))
+    else:
+        with ProcessPoolExecutor(max_workers=max_parallel_repos, mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = {executor.submit(runCampaignRepositories, unit, params, env_path, venv_root, run_options, analyze): name
+                       for name, unit in units.items()}
+            for future in as_completed(futures):
+                try:
+                    errors.extend(future.result())
+                except Exception as e:
+                    errors.append(f"{futures[future]}: {e}")
+
+    print(f"\n>>> Campanha concluída com {len(errors)} erro(s).")
+    for error in errors:
+        print(f"  - {error}")
+    return errors
@@ -0,0 +1,148 @@
+""" Análise de consenso entre todas as runs de um teste, agrupadas pelo veredito.
+
+Em vez de comparar um único par passou/falhou, os CSVs de tracing de todas as runs são lidos em fluxo e
+acumulados por função e por veredito: em quantas runs a função apareceu, a soma e a soma dos quadrados da
+frequência de chamadas, e os fingerprints de retorno mais frequentes em um resumo Misra-Gries de tamanho
+fixo. A memória por função é constante, independente do número de runs.
+
+Cada função recebe uma nota de separação entre 0 e 1, a maior entre:
+* presença: diferença entre as frações de runs (que passaram / que falharam) em que a função foi chamada;
+* frequência: |média_F - média_P| / (|média_F - média_P| + desvio padrão combinado);
+* fingerprint: maior diferença entre as frações de runs em que um mesmo fingerprint de retorno aparece.
+As funções com as maiores notas são as que melhor separam PASSED de FAILED.
+"""
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+import csv
+import math
+
+VERDICTS = ("PASSED", "FAILED")
+FINGERPRINT_SLOTS = 8
+
+
+class MisraGries:
+    """Contadores aproximados dos itens mais frequentes com no máximo `capacity` entradas.
+    A contagem de cada item é subestimada em no máximo n / (capacity + 1).
+    """
+    __slots__ = ("capacity", "counters")
+
+    def __init__(self, capacity: int = FINGERPRINT_SLOTS) -> None:
+        self.capacity = capacity
+        self.counters: Dict[str, int] = dict()
+
+    def add(self, item: str) -> None:
+        if item in self.counters:
+            self.counters[item] += 1
+        elif len(self.counters) < self.capacity:
+            self.counters[item] = 1
+        else:
+            for key in list(self.counters):
+                self.counters[key] -= 1
+                if self.counters[key] == 0:
+                    del self.counters[key]
+
+    def count(self, item: str) -> int:
+        return self.counters.get(item, 0)
+
+
+class _VerdictStats:
+    __slots__ = ("runs", "calls", "calls_squared", "fingerprints")
+
+    def __init__(self, fingerprint_slots: int) -> None:
+        self.runs = 0
+        self.calls = 0
+        self.calls_squared = 0
+        self.fingerprints = MisraGries(fingerprint_slots)
+
+
+class FunctionSeparation(NamedTuple):
+    function: str
+    score: float
+    reason: str
+
+
+class ConsensusAggregator:
+    """Acumula os CSVs de tracing de várias runs e ordena as funções pela separação entre vereditos.
+
+    :param fingerprint_slots: tamanho do resumo Misra-Gries de fingerprints por função e veredito.
+    """
+
+    def __init__(self, fingerprint_slots: int = FINGERPRINT_SLOTS) -> None:
+        self.fingerprint_slots = fingerprint_slots
+        self.runs = {verdict: 0 for verdict in VERDICTS}
+        self.functions: Dict[str, Dict[str, _VerdictStats]] = dict()
+
+    def addRun(self, csvFile: str, verdict: str) -> None:
+        """Acumula um CSV gerado pelo parse_tracing.py.
+        :param verdict: "PASSED" ou "FAILED"
+        """
+        if verdict not in self.runs:
+            raise ValueError(f"Veredito inválido: {verdict}")
+        self.runs[verdict] += 1
+        with open(csvFile, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                stats = self.functions.get(row["Function"])
+                if stats is None:
+                    stats = {name: _VerdictStats(self.fingerprint_slots) for name in VERDICTS}
+                    self.functions[row["Function"]] = stats
+                current = stats[verdict]
+                calls = int(row.get("Call_Frequency") or 0)
+                current.runs += 1
+                current.calls += calls
+                current.calls_squared += calls * calls
+                values = row.get("Return_Fingerprints") or ""
+                for value in set(values.split(" | ")):
+                    if value:
+                        current.fingerprints.add(value)
+
+    def _separation(self, function: str) -> FunctionSeparation:
+        passed, failed = self.functions[function]["PASSED"], self.functions[function]["FAILED"]
+        totalP, totalF = self.runs["PASSED"], self.runs["FAILED"]
+
+        presenceP, presenceF = passed.runs / totalP, failed.runs / totalF
+        best = FunctionSeparation(function, abs(presenceF - presenceP),
+                                  f"chamada em {presenceF:.0%} das runs que falharam e {presenceP:.0%} das que passaram")
+
+        # Runs em que a função não aparece contam como 0 chamadas
+        meanP, meanF = passed.calls / totalP, failed.calls / totalF
+        varianceP = max(0.0, passed.calls_squared / totalP - meanP * meanP)
+        varianceF = max(0.0, failed.calls_squared / totalF - meanF * meanF)
+        difference = abs(meanF - meanP)
+        if difference:
+            score = difference / (difference + math.sqrt((varianceP + varianceF) / 2))
+            if score > best.score:
+                best = FunctionSeparation(function, score,
+                                          f"média de {meanF:.1f} chamadas nas runs que falharam e {meanP:.1f} nas que passaram")
+
+        # Ordem fixa para desempatar sem depender do hash das strings: primeiro o valor mais frequente nas runs
+        # que falharam, depois a ordem lexicográfica
+        values = sorted(passed.fingerprints.counters.keys() | failed.fingerprints.counters.keys(),
+                        key=lambda value: (-failed.fingerprints.count(value), value))
+        for value in values:
+            shareP = passed.fingerprints.count(value) / totalP
+            shareF = failed.fingerprints.count(value) / totalF
+            if abs(shareF - shareP) > best.score:
+                best = FunctionSeparation(function, abs(shareF - shareP),
+                                          f"retorno {value} em {shareF:.0%} das runs que falharam e {shareP:.0%} das que passaram")
+        return best
+
+    def ranking(self, limit: int = 10) -> List[FunctionSeparation]:
+        """Funções que melhor separam PASSED de FAILED (vazio se algum veredito não tem runs)."""
+        if not self.runs["PASSED"] or not self.runs["FAILED"]:
+            return []
+        separations = [self._separation(function) for function in self.functions]
+        separations = [separation for separation in separations if separation.score > 0]
+        separations.sort(key=lambda separation: (-separation.score, separation.function))
+        return separations[:limit]
+
+
+def consensusReport(runs: Iterable[Tuple[str, str]], limit: int = 10) -> List[str]:
+    """Relatório de consenso de todas as runs.
+    :param runs: pares (CSV de tracing, veredito)
+    :param limit: quantidade de funções listadas
+    :returns: linhas do relatório (vazio se nenhuma função separa os vereditos)
+    """
+    aggregator = ConsensusAggregator()
+    for csvFile, verdict in runs:
+        aggregator.addRun(csvFile, verdict)
+    return [f"{separation.function}: separação {separation.score:.2f} ({separation.reason})\n"
+            for separation in aggregator.ranking(limit)]
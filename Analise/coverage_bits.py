@@ -0,0 +1,238 @@
+""" Cobertura de linhas por run em bitsets compactos.
+
+Cada arquivo medido vira um inteiro do Python em que o bit n indica que a linha n foi executada; os inteiros
+de precisão arbitrária fazem o papel de bitset empacotado, e as operações |, &, ^ e & ~ rodam em C sobre
+palavras de máquina. Um arquivo de 2000 linhas ocupa ~250 bytes por run, então a cobertura de uma campanha
+inteira cabe em memória e a comparação entre runs leva milissegundos, sem reler os JSONs do pytest-cov.
+
+Em disco, cada run guarda um <nome>-lines.json.gz ao lado do CSV de cobertura, com os bitsets em hexadecimal.
+
+No modo "contexts" as runs não geram relatório JSON: cada uma grava os dados do coverage com o contexto
+estático Run-k, os dados são unidos em um único banco por teste (coverage-runs.db) e os bitsets de todas as
+runs são extraídos dele de uma vez, ao fim do teste (parse_coverage.py --contexts). O arquivo de configuração
+gerado para cada run leva as opções de seleção de arquivos do projeto, então as duas formas medem os mesmos
+arquivos.
+"""
+from typing import Dict, Iterable, Iterator, List, Tuple
+from pathlib import Path
+import configparser
+import gzip
+import json
+
+BITSET_VERSION = 1
+BITSET_SUFFIX = "-lines.json.gz"
+COVERAGE_MODES = ("report", "contexts")
+COVERAGE_DATABASE = "coverage-runs.db"
+
+# Arquivos em que o coverage procura a configuração, na mesma ordem, com o prefixo das seções
+PROJECT_COVERAGE_CONFIGS = ((".coveragerc", ""), ("setup.cfg", "coverage:"), ("tox.ini", "coverage:"),
+                            ("pyproject.toml", "tool.coverage."))
+# Opções copiadas para o arquivo gerado: as que decidem quais arquivos e linhas entram na medição
+PROJECT_COVERAGE_SETTINGS = {"run": ("source", "source_pkgs", "include", "omit"),
+                             "report": ("include", "omit", "exclude_lines", "exclude_also")}
+
+
+def runDatabase(output_test_dir: Path, run: int) -> Path:
+    """Dados do coverage de uma run no modo "contexts", unidos ao COVERAGE_DATABASE ao fim do teste."""
+    return Path(output_test_dir) / f"{COVERAGE_DATABASE}.Run-{run}"
+
+
+def _readTomlSections(config_file: Path) -> Dict[str, Dict[str, object]]:
+    try:
+        import tomllib
+    except ImportError:
+        # Python < 3.11: sem leitor de TOML na biblioteca padrão
+        return dict()
+    with open(config_file, "rb") as f:
+        coverage = tomllib.load(f).get("tool", dict()).get("coverage", dict())
+    return {f"tool.coverage.{name}": values for name, values in coverage.items() if isinstance(values, dict)}
+
+
+def projectCoverageSettings(project_dir: Path) -> Dict[str, Dict[str, str]]:
+    """Opções de PROJECT_COVERAGE_SETTINGS do primeiro arquivo de configuração do projeto que tem seções do
+    coverage (a mesma escolha que o coverage faz), já no formato do .coveragerc.
+    :returns: seção ("run"/"report") -> opção -> valor
+    """
+    for name, prefix in PROJECT_COVERAGE_CONFIGS:
+        config_file = Path(project_dir) / name
+        if not config_file.is_file():
+            continue
+        if name == "pyproject.toml":
+            sections = _readTomlSections(config_file)
+        else:
+            parser = configparser.ConfigParser(interpolation=None)
+            parser.read(config_file, encoding="utf-8")
+            sections = {section: dict(parser[section]) for section in parser.sections()}
+        if not any(section.startswith(prefix) for section in sections) and name != ".coveragerc":
+            continue
+
+        settings: Dict[str, Dict[str, str]] = dict()
+        for section, options in PROJECT_COVERAGE_SETTINGS.items():
+            values = sections.get(prefix + section, dict())
+            for option in options:
+                value = values.get(option)
+                if value is None:
+                    continue
+                if isinstance(value, list):
+                    value = "\n".join(str(item) for item in value)
+                settings.setdefault(section, dict())[option] = str(value)
+        return settings
+    return dict()
+
+
+def _writeRunCoverageConfig(run_output_dir: Path, project_dir: Path, run_options: Dict[str, str]) -> Path:
+    """Grava Run-k/coveragerc com as opções de seleção de arquivos e linhas da configuração do projeto
+    (.coveragerc, setup.cfg, tox.ini ou pyproject.toml) e as opções da run: o pytest-cov lê um único arquivo.
+    """
+    config = configparser.ConfigParser(interpolation=None)
+    config.read_dict(projectCoverageSettings(project_dir))
+    if not config.has_section("run"):
+        config.add_section("run")
+    for option, value in run_options.items():
+        config.set("run", option, value)
+
+    config_file = run_output_dir / "coveragerc"
+    with open(config_file, "w", encoding="utf-8") as f:
+        config.write(f)
+    return config_file
+
+
+def contextCoverageArgs(source: str, run_output_dir: Path, run: int, project_dir: Path = Path(".")) -> List[str]:
+    """Argumentos do pytest-cov para uma run no modo "contexts": dados com o contexto Run-k e nenhum relatório."""
+    run_output_dir = Path(run_output_dir).resolve()
+    config_file = _writeRunCoverageConfig(run_output_dir, project_dir, {
+        "data_file": str(runDatabase(run_output_dir.parent, run)), "context": f"Run-{run}"})
+    return [f"--cov={source}", f"--cov-config={config_file}", "--cov-report="]
+
+
+def reportCoverageArgs(source: str, run_output_dir: Path, json_output_file: Path, project_dir: Path = Path(".")) -> List[str]:
+    """Argumentos do pytest-cov para uma run no modo "report": relatório JSON da run.
+    Os dados ficam em Run-k/.coverage e não no .coverage do projeto: com --jobs > 1 as runs compartilham o
+    diretório do projeto, e o pytest-cov uniria aos dados desta run os .coverage.* das outras.
+    """
+    run_output_dir = Path(run_output_dir).resolve()
+    config_file = _writeRunCoverageConfig(run_output_dir, project_dir, {"data_file": str(run_output_dir / ".coverage")})
+    return [f"--cov={source}", f"--cov-config={config_file}", f"--cov-report=json:{json_output_file}"]
+
+
+def bitsetFile(coverage_csv: str) -> Path:
+    """Arquivo de bitsets que acompanha um CSV de cobertura (coverage.csv -> coverage-lines.json.gz)."""
+    csv_path = Path(coverage_csv)
+    return csv_path.with_name(csv_path.stem + BITSET_SUFFIX)
+
+
+def linesToBitset(lines: Iterable[int]) -> int:
+    """Bitset com o bit de cada linha ligado (montado em bytes: `bits |= 1 << n` seria quadrático)."""
+    lines = list(lines)
+    if not lines:
+        return 0
+    buffer = bytearray(max(lines) // 8 + 1)
+    for line in lines:
+        buffer[line >> 3] |= 1 << (line & 7)
+    return int.from_bytes(buffer, "little")
+
+
+def bitsetToLines(bits: int) -> List[int]:
+    """Números das linhas com o bit ligado, em ordem crescente."""
+    lines = []
+    for index, byte in enumerate(bits.to_bytes((bits.bit_length() + 7) // 8, "little")):
+        if byte:
+            lines.extend(index * 8 + bit for bit in range(8) if byte >> bit & 1)
+    return lines
+
+
+def formatLineRanges(lines: List[int]) -> str:
+    """Agrupa linhas consecutivas em intervalos (ex: [3, 4, 5, 9] -> "3-5, 9")."""
+    ranges = []
+    start = previous = None
+    for line in lines + [None]:
+        if start is not None and line == previous + 1:
+            previous = line
+            continue
+        if start is not None:
+            ranges.append(str(start) if start == previous else f"{start}-{previous}")
+        start = previous = line
+    return ", ".join(ranges)
+
+
+class CoverageBitsets:
+    """Linhas executadas de cada arquivo de uma run (ou de um conjunto de runs).
+
+    :param files: dicionário arquivo -> bitset das linhas executadas.
+    """
+
+    def __init__(self, files: Dict[str, int] = None) -> None:
+        self.files: Dict[str, int] = {name: bits for name, bits in (files or dict()).items() if bits}
+
+    @classmethod
+    def fromCoverageJson(cls, json_data: dict) -> "CoverageBitsets":
+        """Monta os bitsets a partir do JSON do coverage/pytest-cov (files -> executed_lines)."""
+        return cls({name: linesToBitset(data.get("executed_lines", ()))
+                    for name, data in json_data.get("files", dict()).items()})
+
+    @classmethod
+    def load(cls, bitset_file: Path) -> "CoverageBitsets":
+        with gzip.open(bitset_file, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != BITSET_VERSION:
+            raise ValueError(f"Versão de bitsets de cobertura não suportada em {bitset_file}: {data.get('version')}")
+        return cls({name: int(bits, 16) for name, bits in data["files"].items()})
+
+    def save(self, bitset_file: Path) -> None:
+        payload = {"version": BITSET_VERSION, "files": {name: format(bits, "x") for name, bits in sorted(self.files.items())}}
+        with gzip.open(bitset_file, "wt", encoding="utf-8") as f:
+            json.dump(payload, f)
+
+    def _combine(self, other: "CoverageBitsets", operation) -> "CoverageBitsets":
+        names = self.files.keys() | other.files.keys()
+        return CoverageBitsets({name: operation(self.files.get(name, 0), other.files.get(name, 0)) for name in names})
+
+    def __or__(self, other: "CoverageBitsets") -> "CoverageBitsets":
+        return self._combine(other, lambda a, b: a | b)
+
+    def __and__(self, other: "CoverageBitsets") -> "CoverageBitsets":
+        return self._combine(other, lambda a, b: a & b)
+
+    def __xor__(self, other: "CoverageBitsets") -> "CoverageBitsets":
+        return self._combine(other, lambda a, b: a ^ b)
+
+    def __sub__(self, other: "CoverageBitsets") -> "CoverageBitsets":
+        return CoverageBitsets({name: bits & ~other.files.get(name, 0) for name, bits in self.files.items()})
+
+    def __bool__(self) -> bool:
+        return bool(self.files)
+
+    def lineCount(self) -> int:
+        return sum(bin(bits).count("1") for bits in self.files.values())
+
+    def lines(self) -> Iterator[Tuple[str, List[int]]]:
+        """Pares (arquivo, linhas executadas), em ordem de arquivo."""
+        for name in sorted(self.files):
+            yield name, bitsetToLines(self.files[name])
+
+    @staticmethod
+    def union(runs: Iterable["CoverageBitsets"]) -> "CoverageBitsets":
+        result = CoverageBitsets()
+        for run in runs:
+            result = result | run
+        return result
+
+    @staticmethod
+    def intersection(runs: Iterable["CoverageBitsets"]) -> "CoverageBitsets":
+        result = None
+        for run in runs:
+            result = run if result is None else result & run
+        return result or CoverageBitsets()
+
+
+def coverageDiff(passedRuns: List[CoverageBitsets], failedRuns: List[CoverageBitsets]) -> List[str]:
+    """Linhas executadas só nas runs que falharam (em alguma delas e em nenhuma que passou) e vice-versa.
+    :returns: linhas do relatório, um arquivo por linha (vazio se a cobertura não separa os vereditos)
+    """
+    passed = CoverageBitsets.union(passedRuns)
+    failed = CoverageBitsets.union(failedRuns)
+    report = []
+    for label, only in (("só nas runs que falharam", failed - passed), ("só nas runs que passaram", passed - failed)):
+        for name, lines in only.lines():
+            report.append(f"{name}: {len(lines)} linha(s) {label}: {formatLineRanges(lines)}\n")
+    return report
@@ -1,18 +1,124 @@
 """ Funções para encontrar diferenças entre diversos traces
 """
-from typing import List
+from typing import Dict, FrozenSet, Iterator, List, Optional, Tuple
 from os import getcwd, chdir, listdir ,path
-from random import choice
-from difflib import unified_diff
+from glob import glob
+from .trace_format import iterTraceLines
+from .trace_diff import iterDiffHunks
+from .call_tree import callTreeReport
+from .consensus import consensusReport
+from .coverage_bits import BITSET_SUFFIX, CoverageBitsets, coverageDiff
+import csv
 import re
 
+TRACE_FILES = ("calls.bin.gz", "calls.gz", "calls.txt")
+
 
 def readLines(fileName: str) -> List[str]:
-    with open(fileName, "r") as f:
-        lines = f.readlines()
-    f.close()
+    """Lê as linhas de um arquivo de texto ou de um trace (binário ou gzip), já em formato texto."""
+    return list(iterTraceLines(fileName))
+
+def traceFile(runDir: str) -> str:
+    """Caminho do trace de uma run, em qualquer um dos formatos gerados pelo plugin.
+    :param runDir: diretório da run (ex: Run-3)
+    :returns: caminho do primeiro trace existente; calls.txt caso nenhum exista
+    """
+    for name in TRACE_FILES:
+        candidate = path.join(runDir, name)
+        if path.exists(candidate):
+            return candidate
+    return path.join(runDir, TRACE_FILES[-1])
+
+def tracingCsv(runDir: str) -> str:
+    """Caminho do CSV de tracing (<teste>-tracing.csv) de uma run."""
+    candidates = sorted(glob(path.join(runDir, "*-tracing.csv")))
+    if not candidates:
+        raise FileNotFoundError(f"Nenhum CSV de tracing em {runDir}")
+    return candidates[0]
+
+def readReturnFingerprints(csvFile: str) -> Dict[str, FrozenSet[str]]:
+    """Lê os fingerprints dos valores de retorno de cada função de um CSV de tracing.
+    :param csvFile: CSV gerado pelo parse_tracing.py
+    :returns: dicionário função -> conjunto de fingerprints
+    """
+    fingerprints = dict()
+    with open(csvFile, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            values = row.get("Return_Fingerprints") or ""
+            fingerprints[row["Function"]] = frozenset(value for value in values.split(" | ") if value)
+    return fingerprints
+
+def fingerprintDiff(csvA: str, csvB: str) -> List[str]:
+    """Compara duas runs pelos fingerprints normalizados dos retornos, sem diff de texto.
+    :param csvA: CSV de tracing da run A
+    :param csvB: CSV de tracing da run B
+    :returns: linhas descrevendo as funções cujos conjuntos de fingerprints diferem
+    """
+    fingerprintsA = readReturnFingerprints(csvA)
+    fingerprintsB = readReturnFingerprints(csvB)
+
+    diff = list()
+    for function in sorted(fingerprintsA.keys() | fingerprintsB.keys()):
+        valuesA = fingerprintsA.get(function)
+        valuesB = fingerprintsB.get(function)
+        if valuesA == valuesB:
+            continue
+        if valuesA is None:
+            diff.append(f"{function}: chamada apenas na run B\n")
+        elif valuesB is None:
+            diff.append(f"{function}: chamada apenas na run A\n")
+        else:
+            diff.append(f"{function}: retornos exclusivos A={sorted(valuesA - valuesB)} B={sorted(valuesB - valuesA)}\n")
+    return diff
+
+def profilingCsv(runDir: str) -> str:
+    """Caminho do CSV de profiling (<teste>-profiling.csv) de uma run."""
+    candidates = sorted(glob(path.join(runDir, "*-profiling.csv")))
+    if not candidates:
+        raise FileNotFoundError(f"Nenhum CSV de profiling em {runDir}")
+    return candidates[0]
+
+def readCallCounts(csvFile: str) -> Dict[str, str]:
+    """Lê o ncalls de cada função de um CSV de profiling (ex: "28/10" em funções recursivas)."""
+    with open(csvFile, "r", encoding="utf-8", newline="") as f:
+        return {row["filename:lineno(function)"]: row["ncalls"] for row in csv.DictReader(f)}
+
+def profilingDiff(csvA: str, csvB: str) -> List[str]:
+    """Compara duas runs pelas chamadas registradas no profiler. Os tempos variam em toda execução e não entram.
+    :param csvA: CSV de profiling da run A
+    :param csvB: CSV de profiling da run B
+    :returns: linhas descrevendo as funções chamadas em só uma das runs ou com ncalls diferente
+    """
+    callsA = readCallCounts(csvA)
+    callsB = readCallCounts(csvB)
+
+    diff = list()
+    for function in sorted(callsA.keys() | callsB.keys()):
+        ncallsA = callsA.get(function)
+        ncallsB = callsB.get(function)
+        if ncallsA == ncallsB:
+            continue
+        if ncallsA is None:
+            diff.append(f"{function}: chamada apenas na run B ({ncallsB} chamadas)\n")
+        elif ncallsB is None:
+            diff.append(f"{function}: chamada apenas na run A ({ncallsA} chamadas)\n")
+        else:
+            diff.append(f"{function}: ncalls A={ncallsA} B={ncallsB}\n")
+    return diff
 
-    return lines
+def consensusRuns(passedIndex: List[int], failedIndex: List[int]) -> Iterator[Tuple[str, str]]:
+    """Pares (CSV de tracing, veredito) das runs que têm CSV, para a análise de consenso."""
+    for verdict, indexes in (("PASSED", passedIndex), ("FAILED", failedIndex)):
+        for runNo in indexes:
+            try:
+                yield tracingCsv(f"Run-{runNo}"), verdict
+            except FileNotFoundError:
+                continue
+
+def runCoverage(runNo: int) -> Optional[CoverageBitsets]:
+    """Bitsets das linhas executadas de uma run, se a run tem cobertura."""
+    candidates = sorted(glob(path.join(f"Run-{runNo}", f"*{BITSET_SUFFIX}")))
+    return CoverageBitsets.load(candidates[0]) if candidates else None
 
 def flakyFinder(dirName: str) -> tuple:
     def extractRuns(line: str):
@@ -43,39 +149,74 @@ def flakyFinder(dirName: str) -> tuple:
         chdir(f"{cwd}/{dirName}/{test}")
         with open("runsSummary.txt", "a+") as f:
             f.seek(0)
-            i = 0
             for line in f:
                 testResult = extractRuns(line)
-                if testResult[0] == "END":
+                if testResult is None:
+                    # Cabeçalho ("Teste: ...") e runs com outros vereditos
+                    continue
+                if testResult == "END":
                     break
-                if testResult[1] == "FAILED":
-                    failedIndex.append(i)
-                elif testResult[1] == "PASSED":
-                    passedIndex.append(i)
-                i += 1
-            if len(passedIndex) != 0 and len(failedIndex) != 0:
+                runNo, status, _ = testResult
+                # Runs sem instrumentação (modo sob demanda) não têm diretório Run-k para comparar
+                if not path.isdir(f"Run-{runNo}"):
+                    continue
+                if status == "FAILED":
+                    failedIndex.append(runNo)
+                elif status == "PASSED":
+                    passedIndex.append(runNo)
+            if len(passedIndex) == 0 and len(failedIndex) == 0:
+                f.write("Veredito: nenhuma run instrumentada para comparar\n")
+            elif len(passedIndex) != 0 and len(failedIndex) != 0:
                 f.write("Veredito: FLAKY")
-                selectedPassed = choice(passedIndex)
-                selectedFailed = choice(failedIndex)
+                consensus = consensusReport(consensusRuns(passedIndex, failedIndex))
+                if consensus:
+                    f.write(f"\nConsenso entre todas as runs ({len(passedIndex)} passaram, {len(failedIndex)} falharam), "
+                            "funções que melhor separam os vereditos: \n")
+                    f.writelines(consensus)
+
+                passedCoverage = [bits for bits in map(runCoverage, passedIndex) if bits is not None]
+                failedCoverage = [bits for bits in map(runCoverage, failedIndex) if bits is not None]
+                if passedCoverage and failedCoverage:
+                    lines = coverageDiff(passedCoverage, failedCoverage)
+                    if lines:
+                        f.write("\nNa cobertura, foram encontradas linhas executadas em só um dos vereditos: \n")
+                        f.writelines(lines)
+
+                # Par representativo fixo (primeira run de cada veredito) para o diff detalhado
+                selectedPassed = passedIndex[0]
+                selectedFailed = failedIndex[0]
 
                 f.write(f"\nEntre as runs {selectedPassed} e {selectedFailed}: \n")
                 try:
-                    trace = traceDiff(f"Run-{selectedPassed}/calls.txt", f"Run-{selectedFailed}/calls.txt")
+                    returns = fingerprintDiff(tracingCsv(f"Run-{selectedPassed}"), tracingCsv(f"Run-{selectedFailed}"))
+                    if returns:
+                        f.write("\nNos valores de retorno (fingerprints), foram encontradas as diferencas: \n")
+                        f.writelines(returns)
+                    else:
+                        f.write("\nNenhuma diferença encontrada nos valores de retorno.")
+                except FileNotFoundError as e:
+                    print(f"Opção para trace não escolhida. Erro: {e}")
+
+                try:
+                    trace = traceDiff(traceFile(f"Run-{selectedPassed}"), traceFile(f"Run-{selectedFailed}"))
                     if trace:
                         f.write("\nNo trace, foram encontradas as diferencas: \n")
                         for traceLine in trace:
                             f.writelines(traceLine)
                     else:
                         f.write("\nNenhuma diferença encontrada no trace.")
+                    tree = callTreeReport(traceFile(f"Run-{selectedPassed}"), traceFile(f"Run-{selectedFailed}"))
+                    if tree:
+                        f.write("\nNa árvore de chamadas, foram encontradas as divergências: \n")
+                        f.writelines(tree)
                 except FileNotFoundError as e:
                     print(f"Opção para trace não escolhida. Erro: {e}")
 
                 try:
-                    stats = traceDiff(f"Run-{selectedPassed}/stats.txt", f"Run-{selectedFailed}/stats.txt")
+                    stats = profilingDiff(profilingCsv(f"Run-{selectedPassed}"), profilingCsv(f"Run-{selectedFailed}"))
                     if stats:
                         f.write("\nNo profiler, foram encontradas as diferencas: \n")
-                        for statsLine in stats:
-                            f.writelines(statsLine)
+                        f.writelines(stats)
                     else:
                         f.write("\nNenhuma diferença encontrada no profiler\n")
                 except FileNotFoundError as e:
@@ -83,46 +224,17 @@ def flakyFinder(dirName: str) -> tuple:
 
             elif len(passedIndex) == 0 or len(failedIndex) == 0:
                 f.write("Veredito: NOT FLAKY")
-                if len(passedIndex) == 0:
-                    selectedFailedA = choice(failedIndex)
-                    selectedFailedB = choice(failedIndex)
-
-                    while selectedFailedA == selectedFailedB:
-                        selectedFailedB = choice(failedIndex)
-
-                    f.write(f"\nEntre as runs {selectedFailedA} e {selectedFailedB}: \n")    
-                    try:
-                        trace = traceDiff(f"Run-{selectedFailedA}/calls.txt", f"Run-{selectedFailedB}/calls.txt")
-                        if trace:
-                            f.write("\nNo trace, foram encontradas as diferencas: \n")
-                            for traceLine in trace:
-                                f.writelines(traceLine)
-                        else:
-                            f.write("\nNenhuma diferença encontrada no trace\n")
-                    except FileNotFoundError as e:
-                        print(f"Opção para trace não escolhida. Erro: {e}")
-
-                    try:
-                        stats = traceDiff(f"Run-{selectedFailedA}/stats.txt", f"Run-{selectedFailedA}/stats.txt")
-                        if stats:
-                            f.write("\nNo profiler, foram encontradas as diferencas: \n")
-                            for statsLine in stats:
-                                f.writelines(statsLine)
-                        else:
-                            f.write("\nNenhuma diferença encontrada no profiler\n")
-                    except FileNotFoundError as e:
-                        print(f"Opção para profiling não escolhida. Erro: {e}")
-
+                if len(passedIndex) + len(failedIndex) < 2:
+                    # No modo sob demanda pode sobrar uma única run instrumentada
+                    f.write("\nApenas uma run instrumentada: nenhum par para comparar\n")
                 else:
-                    selectedPassedA = choice(passedIndex)
-                    selectedPassedB = choice(passedIndex)
+                    # Par fixo (as duas primeiras runs do veredito), como no ramo FLAKY
+                    index = failedIndex or passedIndex
+                    selectedA, selectedB = index[0], index[1]
 
-                    while selectedPassedA == selectedPassedB:
-                        selectedPassedB = choice(passedIndex)
-
-                    f.write(f"\nEntre as runs {selectedPassedA} e {selectedPassedB}: \n")
+                    f.write(f"\nEntre as runs {selectedA} e {selectedB}: \n")
                     try:
-                        trace = traceDiff(f"Run-{selectedPassedA}/calls.txt", f"Run-{selectedPassedB}/calls.txt")
+                        trace = traceDiff(traceFile(f"Run-{selectedA}"), traceFile(f"Run-{selectedB}"))
                         if trace:
                             f.write("\nNo trace, foram encontradas as diferencas: \n")
                             for traceLine in trace:
@@ -133,11 +245,10 @@ def flakyFinder(dirName: str) -> tuple:
                         print(f"Opção para trace não escolhida. Erro: {e}")
 
                     try:
-                        stats = traceDiff(f"Run-{selectedPassedA}/stats.txt", f"Run-{selectedPassedB}/stats.txt")
+                        stats = profilingDiff(profilingCsv(f"Run-{selectedA}"), profilingCsv(f"Run-{selectedB}"))
                         if stats:
                             f.write("\nNo profiler, foram encontradas as diferencas: \n")
-                            for statsLine in stats:
-                                f.writelines(statsLine)
+                            f.writelines(stats)
                         else:
                             f.write("\nNenhuma diferença encontrada no profiler\n")
                     except FileNotFoundError as e:
@@ -146,38 +257,12 @@ def flakyFinder(dirName: str) -> tuple:
         f.close()
         chdir(cwd)
 
-def traceDiff(runA: str, runB: str) -> List[str]:
+def traceDiff(runA: str, runB: str) -> List[List[str]]:
     """Funcao para comparar dois traces dos diversos testes de um repositório
+    Os traces são lidos em fluxo e comparados como sequências de ids internados (ver trace_diff.py); endereços
+    de memória ("at 0x...") são normalizados, então não aparecem como diferença.
     :param runA: Caminho para o trace A
     :param runB: Caminho para o trace B
-    :returns: Lista com as linhas do diff
+    :returns: Lista com os hunks do diff (cada um começando pela linha "@@")
     """
-
-    def separateDiff(diff: List[str]) -> List[str]:
-        currentDiff = []
-        allDiffs = []
-
-        for line in diff:
-            if line.startswith("@@"):
-                if currentDiff:
-                    if not any("at 0x" in line or "---" in line for line in currentDiff):
-                        allDiffs.append(currentDiff)
-                    currentDiff = [line + "\n"]
-                else:
-                    currentDiff.append(line)
-            else:
-                currentDiff.append(line)
-
-        if currentDiff and not any("at 0x" in line or "---" in line for line in currentDiff):
-            allDiffs.append(currentDiff)
-
-        return allDiffs
-
-    linesA = readLines(runA)
-    linesB = readLines(runB)
-
-    diff = list()
-    for line in unified_diff(linesA, linesB, lineterm = ""):
-        diff.append(line)
-
-    return separateDiff(diff)
\ No newline at end of file
+    return list(iterDiffHunks(iterTraceLines(runA), iterTraceLines(runB)))
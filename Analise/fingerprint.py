@@ -0,0 +1,37 @@
+""" Fingerprints estáveis dos valores de retorno rastreados.
+
+Antes do hash, o texto do valor é normalizado para remover o que muda entre execuções sem mudar o valor:
+endereços de memória, ids de objetos e diretórios temporários. Assim, duas runs que devolvem "o mesmo"
+objeto geram o mesmo fingerprint, e comparar runs vira igualdade de inteiros de 64 bits.
+"""
+import hashlib
+import re
+
+FINGERPRINT_BYTES = 8
+
+_NOISE_PATTERNS = (
+    # <obj at 0x7f3a...>, <function f at 0x...>, ponteiros em geral
+    (re.compile(r"0x[0-9a-fA-F]+"), "0x?"),
+    # id(obj) impresso por reprs customizados: id=140234..., id: 140234...
+    (re.compile(r"\b(id[=:]\s*)\d{8,}"), r"\1?"),
+    # tmp_path do pytest e tempfile.mkdtemp: /tmp/pytest-of-user/pytest-12/..., /tmp/tmpab12_cd3
+    (re.compile(r"pytest-\d+"), "pytest-?"),
+    (re.compile(r"\btmp[a-z0-9_]{8}\b"), "tmp?"),
+)
+
+
+def normalizeValue(text: str) -> str:
+    """Remove do texto do valor os trechos que variam entre execuções sem mudar o valor."""
+    for pattern, replacement in _NOISE_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def fingerprint(text: str) -> int:
+    """Hash de 64 bits do valor normalizado."""
+    digest = hashlib.blake2b(normalizeValue(text).encode("utf-8", "surrogatepass"), digest_size=FINGERPRINT_BYTES).digest()
+    return int.from_bytes(digest, "big")
+
+
+def formatFingerprint(value: int) -> str:
+    return f"{value:016x}"
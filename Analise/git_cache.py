@@ -0,0 +1,118 @@
+""" Cache de repositórios git: um espelho bare por URL e um worktree por commit.
+
+Cada URL é clonada uma única vez (`git clone --mirror`) em <cache>/mirrors. Os commits pedidos viram
+worktrees leves em <cache>/worktrees/<nome>-<hash>, que compartilham o banco de objetos do espelho: campanhas
+repetidas e vários commits do mesmo projeto não baixam nada de novo. Quando o espelho não tem o commit, só
+ele é buscado (`git fetch origin <hash>`), e a busca completa fica como alternativa para servidores que não
+aceitam pedir um commit diretamente.
+
+Nenhuma função muda o diretório corrente, e cada espelho tem um lock, então processos diferentes da campanha
+podem usar o mesmo cache.
+"""
+from typing import Iterator
+from pathlib import Path
+import contextlib
+import fcntl
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+
+
+class GitCacheError(Exception):
+    def __init__(self, *args: object) -> None: super().__init__(*args)
+
+
+def _git(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(["git", *args], check=True, capture_output=True, text=True)
+
+
+class GitMirrorCache:
+    """Espelhos bare e worktrees por commit.
+
+    :param root: diretório do cache.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = Path(root).resolve()
+        self.mirrors_dir = self.root / "mirrors"
+        self.worktrees_dir = self.root / "worktrees"
+        self.mirrors_dir.mkdir(parents=True, exist_ok=True)
+        self.worktrees_dir.mkdir(parents=True, exist_ok=True)
+
+    def mirrorPath(self, url: str) -> Path:
+        name = re.sub(r'[^a-zA-Z0-9_\-]', '_', re.sub(r'\.git$', '', url.rstrip("/")).split("/")[-1])
+        return self.mirrors_dir / f"{name}-{hashlib.sha1(url.encode('utf-8')).hexdigest()[:12]}.git"
+
+    def worktreePath(self, name: str, githash: str) -> Path:
+        return self.worktrees_dir / f"{name}-{'HEAD' if githash == '.' else githash[:12]}"
+
+    def hasCommit(self, mirror: Path, githash: str) -> bool:
+        return subprocess.run(["git", "--git-dir", str(mirror), "cat-file", "-e", f"{githash}^{{commit}}"],
+                              capture_output=True).returncode == 0
+
+    def ensureCommit(self, url: str, githash: str) -> str:
+        """Garante que o espelho da URL existe e tem o commit pedido ("." = HEAD atual do remoto).
+        :returns: hash completo do commit
+        """
+        mirror = self.mirrorPath(url)
+        with self._lock(mirror):
+            return self._ensureCommit(url, githash, mirror)
+
+    def worktree(self, url: str, githash: str, name: str) -> Path:
+        """Devolve o worktree do commit, criando-o (ou movendo-o para o commit) se necessário.
+        :param name: nome do projeto, usado no nome do diretório
+        """
+        mirror = self.mirrorPath(url)
+        dest = self.worktreePath(name, githash)
+        with self._lock(mirror):
+            commit = self._ensureCommit(url, githash, mirror)
+            if (dest / ".git").exists():
+                if _git("-C", str(dest), "rev-parse", "HEAD").stdout.strip() != commit:
+                    _git("-C", str(dest), "checkout", "--detach", "--force", commit)
+                return dest
+            if dest.exists():
+                shutil.rmtree(dest)
+            # Remove o registro de worktrees apagados à mão antes de criar o novo
+            _git("--git-dir", str(mirror), "worktree", "prune")
+            print(f"[GIT] Criando worktree {dest.name} ({commit[:12]})...")
+            _git("--git-dir", str(mirror), "worktree", "add", "--detach", str(dest), commit)
+        return dest
+
+    def _ensureCommit(self, url: str, githash: str, mirror: Path) -> str:
+        if not mirror.exists():
+            print(f"[GIT] Criando espelho de {url}...")
+            tmp = mirror.with_name(f"{mirror.name}.tmp-{os.getpid()}")
+            shutil.rmtree(tmp, ignore_errors=True)
+            try:
+                _git("clone", "--mirror", url, str(tmp))
+            except BaseException:
+                shutil.rmtree(tmp, ignore_errors=True)
+                raise
+            os.rename(tmp, mirror)
+        elif githash == ".":
+            _git("--git-dir", str(mirror), "fetch", "origin")
+
+        if githash == ".":
+            return _git("--git-dir", str(mirror), "rev-parse", "HEAD").stdout.strip()
+
+        if not self.hasCommit(mirror, githash):
+            print(f"[GIT] Buscando o commit {githash[:12]} em {url}...")
+            try:
+                # A ref evita que um gc do espelho descarte o commit buscado (por isso as buscas não usam --prune)
+                _git("--git-dir", str(mirror), "fetch", "origin", f"{githash}:refs/ttm/{githash}")
+            except subprocess.CalledProcessError:
+                _git("--git-dir", str(mirror), "fetch", "origin")
+            if not self.hasCommit(mirror, githash):
+                raise GitCacheError(f"Commit {githash} não encontrado em {url}")
+        return _git("--git-dir", str(mirror), "rev-parse", f"{githash}^{{commit}}").stdout.strip()
+
+    @contextlib.contextmanager
+    def _lock(self, mirror: Path) -> Iterator[None]:
+        with open(self.mirrors_dir / f"{mirror.name}.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -0,0 +1,130 @@
+""" Backend de tracing baseado em sys.monitoring (PEP 669), disponível a partir do Python 3.12.
+
+Diferente do sys.settrace, que paga um callback por frame do interpretador, o sys.monitoring permite
+desligar (DISABLE) os eventos de um code object fora do projeto logo no primeiro disparo; a partir daí
+essas funções rodam sem instrumentação nenhuma.
+"""
+from typing import Any, Callable, Optional
+import sys
+import threading
+
+MONITORING_AVAILABLE = hasattr(sys, "monitoring")
+
+TRACE_BACKENDS = ("auto", "settrace", "monitoring")
+
+# Ids livres por convenção (0 = debugger, 1 = coverage, 2 = profiler, 5 = optimizer).
+# O cProfile do 3.12 usa o PROFILER_ID, então evitamos esse id enquanto houver outro livre.
+_CANDIDATE_TOOL_IDS = (3, 4, 0)
+
+# Tool ids com code objects desligados (DISABLE) por uma sessão anterior neste processo
+_DISABLED_TOOL_IDS = set()
+
+
+def resolveTraceBackend(backend: str) -> str:
+    """Resolve o backend de tracing efetivo.
+    :param backend: "auto", "settrace" ou "monitoring".
+    :returns: "monitoring" se pedido (ou "auto") e disponível neste Python, "settrace" caso contrário.
+    """
+    if backend not in TRACE_BACKENDS:
+        raise ValueError(f"Backend de tracing inválido: {backend}. Opções: {', '.join(TRACE_BACKENDS)}")
+    if backend == "settrace":
+        return "settrace"
+    if not MONITORING_AVAILABLE:
+        if backend == "monitoring":
+            print(f"AVISO: sys.monitoring indisponível no Python {sys.version.split()[0]}, usando sys.settrace.")
+        return "settrace"
+    return "monitoring"
+
+
+class MonitoringTracer:
+    """Emite os mesmos eventos de chamada/retorno que um tracer de sys.settrace, via sys.monitoring.
+
+    :param resolve: recebe o code object e devolve uma informação qualquer sobre ele (ex: caminho relativo),
+        ou None quando a função não deve ser rastreada. Deve ser barato (memoizado).
+    :param on_call: chamado com (code, info) na entrada ou retomada de uma função rastreada.
+    :param on_return: chamado com (code, valor_de_retorno) na saída ou suspensão de uma função rastreada.
+
+    Assim como no sys.settrace, só a thread que chamou start() é rastreada.
+    """
+
+    def __init__(self, resolve: Callable[[Any], Optional[Any]], on_call: Callable[[Any, Any], None],
+                 on_return: Callable[[Any, Any], None], tool_name: str = "TTMestado") -> None:
+        self._resolve = resolve
+        self._on_call = on_call
+        self._on_return = on_return
+        self._tool_name = tool_name
+        self._tool_id = None
+        self._thread_id = None
+
+    def start(self) -> None:
+        monitoring = sys.monitoring
+        self._tool_id = self._acquireToolId()
+        self._thread_id = threading.get_ident()
+        events = monitoring.events
+
+        monitoring.register_callback(self._tool_id, events.PY_START, self._py_start)
+        monitoring.register_callback(self._tool_id, events.PY_RESUME, self._py_start)
+        monitoring.register_callback(self._tool_id, events.PY_THROW, self._py_throw)
+        monitoring.register_callback(self._tool_id, events.PY_RETURN, self._py_return)
+        monitoring.register_callback(self._tool_id, events.PY_YIELD, self._py_return)
+        monitoring.register_callback(self._tool_id, events.PY_UNWIND, self._py_unwind)
+
+        # Code objects desligados (DISABLE) em uma sessão anterior com este tool id voltam a disparar. O
+        # restart_events vale para todas as ferramentas: reativa também o que outras (ex: o coverage no 3.12+)
+        # desligaram, então só é chamado quando o tracing realmente deixou eventos desligados.
+        if self._tool_id in _DISABLED_TOOL_IDS:
+            monitoring.restart_events()
+            _DISABLED_TOOL_IDS.clear()
+        monitoring.set_events(self._tool_id, events.PY_START | events.PY_RESUME | events.PY_THROW |
+                              events.PY_RETURN | events.PY_YIELD | events.PY_UNWIND)
+
+    def stop(self) -> None:
+        if self._tool_id is None:
+            return
+        monitoring = sys.monitoring
+        events = monitoring.events
+        monitoring.set_events(self._tool_id, events.NO_EVENTS)
+        for event in (events.PY_START, events.PY_RESUME, events.PY_THROW,
+                      events.PY_RETURN, events.PY_YIELD, events.PY_UNWIND):
+            monitoring.register_callback(self._tool_id, event, None)
+        monitoring.free_tool_id(self._tool_id)
+        self._tool_id = None
+
+    def _acquireToolId(self) -> int:
+        monitoring = sys.monitoring
+        for tool_id in _CANDIDATE_TOOL_IDS:
+            if monitoring.get_tool(tool_id) is None:
+                monitoring.use_tool_id(tool_id, self._tool_name)
+                return tool_id
+        raise RuntimeError("Nenhum tool id do sys.monitoring está livre para o tracing.")
+
+    def _disable(self):
+        """Desliga o evento no code object (só ocorre no primeiro disparo de cada função fora do projeto)."""
+        _DISABLED_TOOL_IDS.add(self._tool_id)
+        return sys.monitoring.DISABLE
+
+    # PY_START / PY_RESUME equivalem ao evento 'call' do settrace (inclusive na retomada de geradores)
+    def _py_start(self, code, instruction_offset):
+        info = self._resolve(code)
+        if info is None:
+            return self._disable()
+        if threading.get_ident() == self._thread_id:
+            self._on_call(code, info)
+
+    # PY_RETURN / PY_YIELD equivalem ao evento 'return' do settrace
+    def _py_return(self, code, instruction_offset, retval):
+        if self._resolve(code) is None:
+            return self._disable()
+        if threading.get_ident() == self._thread_id:
+            self._on_return(code, retval)
+
+    # PY_THROW e PY_UNWIND não são eventos locais e não podem ser desligados com DISABLE
+    def _py_throw(self, code, instruction_offset, exception):
+        info = self._resolve(code)
+        if info is not None and threading.get_ident() == self._thread_id:
+            self._on_call(code, info)
+
+    def _py_unwind(self, code, instruction_offset, exception):
+        # Com settrace, uma exceção que escapa do frame gera 'return' com valor None
+        if self._resolve(code) is not None and threading.get_ident() == self._thread_id:
+            self._on_return(code, None)
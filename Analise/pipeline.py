@@ -0,0 +1,132 @@
+""" Pipeline de pós-processamento das runs.
+
+Os parsers da raiz da automação (parse_coverage.py, parse_profiling.py, parse_tracing.py) eram chamados com
+subprocess.run a cada run, abrindo até três interpretadores novos por execução. Aqui eles são importados
+como módulos e executados em um pool fixo de processos, que roda em paralelo com a próxima run do teste.
+Sem pipeline (pipeline=None), dispatch() executa o parser no próprio processo.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+import importlib.util
+import multiprocessing
+import os
+import sys
+import threading
+
+_automation_modules: Dict[str, Any] = {}
+
+
+def loadAutomationModule(automation_root: Path, name: str):
+    """Importa um dos scripts da raiz da automação (ex: parse_profiling) como módulo, para que suas
+    funções sejam chamadas no próprio processo em vez de via subprocess.
+    :returns: o módulo, ou None se o script não existir
+    """
+    script = Path(automation_root) / f"{name}.py"
+    if not script.exists():
+        return None
+    key = str(script.resolve())
+    if key not in _automation_modules:
+        spec = importlib.util.spec_from_file_location(name, script)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _automation_modules[key] = module
+    return _automation_modules[key]
+
+
+def runParser(automation_root: str, module: str, function: str, args: Sequence[Any], cleanup: Sequence[str] = ()) -> Any:
+    """Executa module.function(*args) de um script da raiz da automação e apaga os arquivos temporários.
+    :param automation_root: raiz da automação, onde estão os scripts parse_*.py
+    :param module: nome do script, sem .py
+    :param function: função do script a ser chamada
+    :param args: argumentos da função
+    :param cleanup: arquivos a remover ao final (ex: dump binário do profiler)
+    :returns: o retorno da função, ou None se o script não existir
+    """
+    try:
+        parser = loadAutomationModule(Path(automation_root), module)
+        if parser is None:
+            return None
+        return getattr(parser, function)(*args)
+    finally:
+        for fileName in cleanup:
+            if os.path.exists(fileName):
+                os.remove(fileName)
+
+
+def _initWorker(automation_root: str) -> None:
+    # Os parsers importam o pacote Analise a partir da raiz da automação. O worker herda o cwd do momento em
+    # que foi criado (em geral o diretório do projeto testado), então ele volta para a raiz da automação
+    os.chdir(automation_root)
+    if automation_root not in sys.path:
+        sys.path.insert(0, automation_root)
+
+
+class PostProcessingPipeline:
+    """Pool limitado de processos para o pós-processamento das runs.
+
+    :param automation_root: raiz da automação (scripts parse_*.py).
+    :param max_workers: quantidade de processos do pool.
+    :param max_pending: máximo de tarefas na fila; submit() bloqueia quando atingido (padrão: 2 por worker).
+
+    Os argumentos das tarefas devem ser picklable e os caminhos, absolutos.
+    """
+
+    def __init__(self, automation_root: Path, max_workers: int = 2, max_pending: Optional[int] = None) -> None:
+        self.automation_root = str(Path(automation_root).resolve())
+        # spawn: os workers não herdam threads nem o estado do pytest do processo principal
+        self._executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"),
+                                             initializer=_initWorker, initargs=(self.automation_root,))
+        self._slots = threading.BoundedSemaphore(max_pending or 2 * max_workers)
+        self._futures: List[Future] = []
+        self._lock = threading.Lock()
+
+    def submit(self, module: str, function: str, *args: Any, cleanup: Sequence[str] = ()) -> Future:
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(runParser, self.automation_root, module, function, args, tuple(cleanup))
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        future.description = f"{module}.{function}{args}"
+        with self._lock:
+            self._futures.append(future)
+        return future
+
+    def join(self) -> int:
+        """Espera todas as tarefas enviadas até agora.
+        :returns: quantidade de tarefas que falharam (os erros são impressos)
+        """
+        with self._lock:
+            futures, self._futures = self._futures, []
+        errors = 0
+        for future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                errors += 1
+                print(f"!!!!!! ERRO no pós-processamento ({future.description}) !!!!!!\nErro: {e}\n")
+        return errors
+
+    def close(self) -> None:
+        self.join()
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self) -> "PostProcessingPipeline":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def dispatch(pipeline: Optional[PostProcessingPipeline], automation_root: Path, module: str, function: str,
+             *args: Any, cleanup: Sequence[str] = ()) -> None:
+    """Envia o parser para o pipeline ou, sem pipeline, executa no próprio processo."""
+    if pipeline is not None:
+        pipeline.submit(module, function, *args, cleanup=cleanup)
+        return
+    try:
+        runParser(str(automation_root), module, function, args, cleanup)
+    except Exception as e:
+        print(f"!!!!!! ERRO no pós-processamento ({module}.{function}) !!!!!!\nErro: {e}\n")
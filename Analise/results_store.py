@@ -0,0 +1,207 @@
+""" Armazém colunar dos resultados das campanhas (Parquet, via pyarrow).
+
+Os resultados de cada teste ficam espalhados em milhares de CSVs pequenos (Test-<repo>/<teste>/Run-k). O
+armazém guarda os mesmos dados em quatro tabelas colunares, cada uma um diretório de arquivos Parquet:
+* runs: uma linha por run (veredito, duração, se foi instrumentada, percentual de cobertura);
+* profile: uma linha por função do profiling de cada run (ncalls, primitive_calls, tottime, cumtime);
+* trace: uma linha por função do tracing de cada run (frequência de chamadas e fingerprints de retorno);
+* coverage: uma linha por arquivo medido em cada run (linhas cobertas e o bitset das linhas, em bytes).
+Todas têm as colunas repo, githash, test e run, e a coluna appended_at com o instante da gravação.
+
+A escrita é só de acréscimo: ao fim de cada teste, cada tabela ganha um arquivo part-<id>.parquet, gravado em
+um temporário e renomeado, então processos diferentes da campanha podem escrever no mesmo armazém ao mesmo
+tempo. As consultas leem o diretório como um único dataset, só com as colunas e linhas pedidas; compact()
+junta as partes pequenas de uma tabela em uma só. Se um teste é gravado de novo (ex: a campanha foi repetida),
+as consultas e o compact() consideram só a gravação mais recente de cada run (repo, githash, test, run).
+"""
+from typing import Any, Dict, List, Optional, Sequence
+from pathlib import Path
+import csv
+import os
+import time
+import uuid
+from .coverage_bits import BITSET_SUFFIX, CoverageBitsets
+
+TABLES = ("runs", "profile", "trace", "coverage")
+KEY_COLUMNS = (("repo", "string"), ("githash", "string"), ("test", "string"), ("run", "int32"))
+# Instante da gravação (ns): entre gravações repetidas da mesma run vale a mais recente
+APPEND_COLUMN = ("appended_at", "int64")
+TABLE_COLUMNS = {
+    "runs": (("verdict", "string"), ("duration", "float64"), ("instrumented", "bool_"), ("coverage_percent", "float64")),
+    "profile": (("function", "string"), ("ncalls", "int64"), ("primitive_calls", "int64"), ("tottime", "float64"),
+                ("cumtime", "float64")),
+    "trace": (("function", "string"), ("call_frequency", "int64"), ("return_fingerprints", "string")),
+    "coverage": (("file", "string"), ("covered_lines", "int64"), ("lines_bitset", "binary")),
+}
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.dataset
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("O armazém de resultados precisa do pyarrow (pip install pyarrow).") from e
+    return pyarrow
+
+
+def _schema(table: str):
+    pa = _pyarrow()
+    columns = KEY_COLUMNS + (APPEND_COLUMN,) + TABLE_COLUMNS[table]
+    return pa.schema([(name, getattr(pa, kind)()) for name, kind in columns])
+
+
+def _number(value: Optional[str]) -> float:
+    """Campo numérico dos CSVs; ncalls de funções recursivas no formato antigo vem como "total/primitivas"."""
+    try:
+        return float((value or "").split("/")[0].strip())
+    except ValueError:
+        return 0.0
+
+
+def _readCsv(run_dir: Path, pattern: str) -> List[Dict[str, str]]:
+    candidates = sorted(run_dir.glob(pattern))
+    if not candidates:
+        return []
+    with open(candidates[0], "r", encoding="utf-8", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+class ResultsStore:
+    """Tabelas Parquet só de acréscimo com os resultados de todas as runs.
+
+    :param root: diretório do armazém (um subdiretório por tabela).
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = Path(root).resolve()
+        for table in TABLES:
+            (self.root / table).mkdir(parents=True, exist_ok=True)
+
+    def append(self, table: str, rows: Sequence[Dict[str, Any]]) -> Optional[Path]:
+        """Grava as linhas como uma nova parte da tabela.
+        :returns: caminho da parte, ou None se não há linhas
+        """
+        if table not in TABLES:
+            raise ValueError(f"Tabela inválida: {table}. Opções: {', '.join(TABLES)}")
+        if not rows:
+            return None
+        pa = _pyarrow()
+        schema = _schema(table)
+        appended_at = time.time_ns()
+        data = pa.Table.from_pylist([dict({name: row.get(name) for name in schema.names}, appended_at=appended_at)
+                                     for row in rows], schema=schema)
+        part = self.root / table / f"part-{uuid.uuid4().hex}.parquet"
+        tmp = part.with_name(f".{part.name}.tmp")
+        pa.parquet.write_table(data, tmp)
+        os.rename(tmp, part)
+        return part
+
+    def appendTest(self, repo: str, githash: str, test: str, output_test_dir: Path,
+                   run_results: Dict[int, Sequence[Any]]) -> None:
+        """Acrescenta os resultados de um teste: o veredito de cada run e os CSVs/bitsets dos diretórios Run-k.
+        Gravar o mesmo teste de novo substitui, nas consultas, as runs gravadas antes.
+        :param run_results: resultado de cada run (veredito, duração, ...), como no runsSummary.txt
+        """
+        keys = {"repo": repo, "githash": githash, "test": test}
+        tables: Dict[str, List[Dict[str, Any]]] = {table: [] for table in TABLES}
+        for run in sorted(run_results):
+            run_keys = dict(keys, run=run)
+            run_dir = Path(output_test_dir) / f"Run-{run}"
+            coverage_rows = _readCsv(run_dir, "*coverage.csv")
+            tables["runs"].append(dict(run_keys, verdict=run_results[run][0], duration=float(run_results[run][1]),
+                                       instrumented=run_dir.is_dir(),
+                                       coverage_percent=_number(coverage_rows[0].get("Percentual de Cobertura (%)"))
+                                       if coverage_rows else None))
+            if not run_dir.is_dir():
+                continue
+
+            for row in _readCsv(run_dir, "*profiling.csv"):
+                ncalls = row.get("ncalls") or ""
+                primitive = row.get("primitive_calls") or (ncalls.split("/")[-1] if ncalls else None)
+                tables["profile"].append(dict(run_keys, function=row.get("filename:lineno(function)"),
+                                              ncalls=int(_number(ncalls)), primitive_calls=int(_number(primitive)),
+                                              tottime=_number(row.get("tottime")), cumtime=_number(row.get("cumtime"))))
+            for row in _readCsv(run_dir, "*-tracing.csv"):
+                tables["trace"].append(dict(run_keys, function=row.get("Function"),
+                                            call_frequency=int(_number(row.get("Call_Frequency"))),
+                                            return_fingerprints=row.get("Return_Fingerprints") or ""))
+            bitset_files = sorted(run_dir.glob(f"*{BITSET_SUFFIX}"))
+            if bitset_files:
+                for name, bits in sorted(CoverageBitsets.load(bitset_files[0]).files.items()):
+                    tables["coverage"].append(dict(run_keys, file=name, covered_lines=bin(bits).count("1"),
+                                                   lines_bitset=bits.to_bytes((bits.bit_length() + 7) // 8, "little")))
+
+        for table, rows in tables.items():
+            self.append(table, rows)
+
+    def dataset(self, table: str):
+        """A tabela inteira como um pyarrow.dataset (todas as partes)."""
+        if table not in TABLES:
+            raise ValueError(f"Tabela inválida: {table}. Opções: {', '.join(TABLES)}")
+        pa = _pyarrow()
+        # Os temporários (".part-*.tmp") de escritas em andamento são ignorados pelo prefixo "."
+        return pa.dataset.dataset(str(self.root / table), format="parquet", schema=_schema(table))
+
+    def query(self, table: str, columns: Optional[List[str]] = None, **equals: Any):
+        """Linhas da tabela cujas colunas têm os valores pedidos (ex: query("runs", repo="x", verdict="FAILED")).
+        Um valor lista/tupla/conjunto aceita qualquer um dos valores. Só entra a gravação mais recente de cada run.
+        :returns: pyarrow.Table (use .to_pandas() ou .to_pylist() para analisar)
+        """
+        pa = _pyarrow()
+        condition = None
+        key_condition = None
+        key_names = [name for name, _ in KEY_COLUMNS]
+        for name, value in equals.items():
+            field = pa.dataset.field(name)
+            term = field.isin(list(value)) if isinstance(value, (list, tuple, set, frozenset)) else field == value
+            condition = term if condition is None else condition & term
+            if name in key_names:
+                key_condition = term if key_condition is None else key_condition & term
+
+        dataset = self.dataset(table)
+        read_columns = None if columns is None else list(dict.fromkeys(columns + key_names + [APPEND_COLUMN[0]]))
+        rows = dataset.to_table(columns=read_columns, filter=condition)
+        # A gravação mais recente de cada run é procurada em todas as linhas, não só nas que passaram no filtro:
+        # uma run regravada com outro veredito não pode trazer de volta a linha antiga
+        latest = (dataset.to_table(columns=key_names + [APPEND_COLUMN[0]], filter=key_condition)
+                  .group_by(key_names).aggregate([(APPEND_COLUMN[0], "max")])
+                  .rename_columns(key_names + [APPEND_COLUMN[0]]))
+        rows = rows.join(latest, keys=key_names + [APPEND_COLUMN[0]], join_type="inner")
+        return rows.select(columns if columns is not None else dataset.schema.names)
+
+    def flakyTests(self):
+        """Testes com runs PASSED e FAILED: repo, githash, test e a quantidade de runs de cada veredito."""
+        runs = self.query("runs", columns=["repo", "githash", "test", "verdict"], verdict=["PASSED", "FAILED"])
+        counts = runs.group_by(["repo", "githash", "test", "verdict"]).aggregate([([], "count_all")])
+        verdicts: Dict[tuple, Dict[str, int]] = dict()
+        for row in counts.to_pylist():
+            verdicts.setdefault((row["repo"], row["githash"], row["test"]), dict())[row["verdict"]] = row["count_all"]
+        return [dict(repo=repo, githash=githash, test=test, passed=counts["PASSED"], failed=counts["FAILED"])
+                for (repo, githash, test), counts in sorted(verdicts.items()) if len(counts) == 2]
+
+    def compact(self, table: str) -> Optional[Path]:
+        """Junta as partes da tabela em um único arquivo, já sem as gravações substituídas de cada run. Não deve
+        rodar junto com escritas na mesma tabela.
+        :returns: caminho da parte compactada, ou None se havia no máximo uma parte
+        """
+        parts = sorted((self.root / table).glob("part-*.parquet"))
+        if len(parts) <= 1:
+            return None
+        pa = _pyarrow()
+        part = self.root / table / f"part-{uuid.uuid4().hex}.parquet"
+        tmp = part.with_name(f".{part.name}.tmp")
+        pa.parquet.write_table(self.query(table), tmp)
+        os.rename(tmp, part)
+        for old in parts:
+            old.unlink()
+        return part
+
+
+def storeTestResults(results_store: Path, repo: str, githash: str, test: str, output_test_dir: Path,
+                     run_results: Dict[int, Sequence[Any]]) -> None:
+    """Acrescenta os resultados de um teste ao armazém, sem interromper a campanha em caso de erro."""
+    try:
+        ResultsStore(results_store).appendTest(repo, githash, test, output_test_dir, run_results)
+    except Exception as e:
+        print(f"!!!!!! ERRO ao gravar os resultados no armazém !!!!!!\nErro: {e}\n")
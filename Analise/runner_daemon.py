@@ -0,0 +1,211 @@
+""" Runner de pytest residente dentro do ambiente virtual do projeto.
+
+Em vez de chamar pytest.main de novo no interpretador da automação a cada run, um processo iniciado com o
+bin/python do venv importa o pytest e coleta o teste uma única vez (os módulos do projeto ficam carregados)
+e, para cada run, faz fork de um filho novo. Cada filho executa a run com o mesmo executeRun do modo em
+processo e morre em seguida, então nada vaza entre runs por sys.modules.
+
+Protocolo: uma linha JSON por mensagem no stdin/stdout do daemon. O stdout original fica reservado ao
+protocolo; a saída do pytest vai para o stderr. O filho devolve o veredito assim que o pytest termina e só
+depois executa os parsers, o que sobrepõe o pós-processamento de uma run com a execução da seguinte.
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from pathlib import Path
+import argparse
+import json
+import os
+import subprocess
+import sys
+import traceback
+from .pipeline import runParser
+
+RunResult = Tuple[str, float, int, int, int, int]
+ERROR_RUN: RunResult = ("ERROR", 0.0, 0, 0, 0, 0)
+
+# Argumentos de executeRun que chegam como texto pelo protocolo e precisam voltar a ser Path
+_PATH_ARGS = ("output_test_dir", "automation_root", "project_dir", "env_path")
+
+
+class RunnerDaemonError(Exception):
+    def __init__(self, *args: object) -> None: super().__init__(*args)
+
+
+class RunnerDaemon:
+    """Inicia e conversa com o runner residente.
+
+    :param env_path: ambiente virtual do projeto; o daemon roda com seu bin/python.
+    :param automation_root: raiz da automação (colocada no PYTHONPATH do daemon).
+    :param project_dir: diretório do projeto testado.
+    :param test_node: teste coletado antecipadamente pelo daemon.
+    :param warm: se False, só o pytest é pré-importado (o projeto é importado em cada filho).
+    """
+
+    def __init__(self, env_path: Path, automation_root: Path, project_dir: Path, test_node: str, warm: bool = True) -> None:
+        python = Path(env_path).resolve() / "bin" / "python"
+        if not python.exists():
+            raise FileNotFoundError(f"Interpretador do ambiente virtual não encontrado: {python}")
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(automation_root), env.get("PYTHONPATH")]))
+        command = [str(python), "-m", "Analise.runner_daemon", "--project-dir", str(project_dir), "--test-node", test_node]
+        if not warm:
+            command.append("--no-warm")
+        self._process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+                                         env=env, cwd=str(automation_root))
+        ready = self._receive()
+        if ready.get("event") != "ready":
+            self.close()
+            raise RunnerDaemonError(f"Resposta inesperada do runner: {ready}")
+
+    def run(self, run: int, **run_args: Any) -> RunResult:
+        """Executa uma run em um filho do daemon (mesmos argumentos de utils.executeRun, sem pipeline)."""
+        self._send({"command": "run", "run": run, "args": run_args})
+        reply = self._receive()
+        if "error" in reply:
+            print(f"!!!!!! ERRO na Run {run} (runner daemon) !!!!!!\nErro: {reply['error']}\n")
+            return ERROR_RUN
+        return tuple(reply["result"])
+
+    def close(self) -> None:
+        """Encerra o daemon, que antes espera os filhos terminarem o pós-processamento."""
+        if self._process.poll() is None:
+            try:
+                self._send({"command": "stop"})
+            except RunnerDaemonError:
+                pass
+        self._process.stdin.close()
+        self._process.wait()
+        self._process.stdout.close()
+
+    def __enter__(self) -> "RunnerDaemon":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _send(self, message: Dict[str, Any]) -> None:
+        try:
+            self._process.stdin.write(json.dumps(message, default=str) + "\n")
+            self._process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise RunnerDaemonError(f"O runner encerrou inesperadamente: {e}")
+
+    def _receive(self) -> Dict[str, Any]:
+        line = self._process.stdout.readline()
+        if not line:
+            raise RunnerDaemonError(f"O runner encerrou inesperadamente (código {self._process.wait()})")
+        return json.loads(line)
+
+
+class _DeferredJobs:
+    """Faz o papel do PostProcessingPipeline dentro do filho: guarda os parsers para depois do veredito."""
+
+    def __init__(self, automation_root: Path) -> None:
+        self.automation_root = str(automation_root)
+        self._jobs: List[Tuple[str, str, Tuple[Any, ...], Tuple[str, ...]]] = []
+
+    def submit(self, module: str, function: str, *args: Any, cleanup: Sequence[str] = ()) -> None:
+        self._jobs.append((module, function, args, tuple(cleanup)))
+
+    def run(self) -> None:
+        for module, function, args, cleanup in self._jobs:
+            try:
+                runParser(self.automation_root, module, function, args, cleanup)
+            except Exception as e:
+                print(f"!!!!!! ERRO no pós-processamento ({module}.{function}) !!!!!!\nErro: {e}\n")
+
+
+def _decodeRunArgs(args: Dict[str, Any]) -> Dict[str, Any]:
+    args = dict(args)
+    for key in _PATH_ARGS:
+        if key in args:
+            args[key] = Path(args[key])
+    args["requirements_files"] = [Path(p) for p in args.get("requirements_files", [])]
+    return args
+
+
+def _forkRun(run: int, run_args: Dict[str, Any]) -> Tuple[int, Optional[Dict[str, Any]]]:
+    """Executa a run em um filho.
+    :returns: pid do filho e a resposta enviada por ele (None se o filho morreu antes de responder)
+    """
+    from .utils import executeRun
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        status = 1
+        try:
+            jobs = _DeferredJobs(run_args["automation_root"])
+            result = executeRun(run, pipeline=jobs, **run_args)
+            os.write(write_fd, (json.dumps({"run": run, "result": list(result)}) + "\n").encode("utf-8"))
+            os.close(write_fd)
+            jobs.run()
+            status = 0
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(status)
+
+    os.close(write_fd)
+    with os.fdopen(read_fd, "rb") as reply:
+        data = reply.read()
+    return pid, json.loads(data) if data else None
+
+
+def serve(project_dir: str, test_node: str, warm: bool = True, max_pending_children: int = 2) -> None:
+    """Laço principal do daemon (roda dentro do venv)."""
+    # O stdout original vira o canal do protocolo; prints do pytest e dos parsers vão para o stderr
+    protocol = os.fdopen(os.dup(sys.stdout.fileno()), "w", buffering=1, encoding="utf-8")
+    sys.stdout.flush()
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    os.chdir(project_dir)
+    if project_dir not in sys.path:
+        sys.path.insert(0, project_dir)
+
+    import pytest
+    if warm:
+        # Importa o projeto, os conftest e o módulo do teste; os filhos reaproveitam sys.modules na coleta
+        pytest.main(["--collect-only", "-q", "-p", "no:cacheprovider", test_node])
+
+    def send(message: Dict[str, Any]) -> None:
+        protocol.write(json.dumps(message) + "\n")
+
+    pending: List[int] = []
+    send({"event": "ready", "pid": os.getpid(), "python": sys.version.split()[0]})
+    try:
+        for line in sys.stdin:
+            request = json.loads(line)
+            if request.get("command") == "stop":
+                break
+            # Limita os filhos que ainda estão no pós-processamento
+            while len(pending) >= max_pending_children:
+                os.waitpid(pending.pop(0), 0)
+
+            run = request["run"]
+            pid, reply = _forkRun(run, _decodeRunArgs(request["args"]))
+            if reply is None:
+                _, status = os.waitpid(pid, 0)
+                send({"run": run, "error": f"processo da run terminou sem resultado (status {status})"})
+            else:
+                pending.append(pid)
+                send(reply)
+    finally:
+        for pid in pending:
+            os.waitpid(pid, 0)
+        protocol.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Runner de pytest residente (uso interno de runSpecificTests).")
+    parser.add_argument("--project-dir", required=True, help="Diretório do projeto testado.")
+    parser.add_argument("--test-node", required=True, help="Teste a ser coletado antecipadamente.")
+    parser.add_argument("--no-warm", action="store_true", help="Não importa o projeto antes das runs.")
+    args = parser.parse_args()
+    serve(str(Path(args.project_dir).resolve()), args.test_node, warm=not args.no_warm)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+""" Políticas que decidem quantas runs de um teste executar.
+
+A política fixa executa sempre as No_Runs do CSV. A adaptativa para assim que o veredito está estatisticamente
+definido:
+* flaky: na primeira dupla PASSED/FAILED (alvo "pair") ou quando o intervalo de Wilson da taxa de falha fica
+  mais estreito que a precisão pedida (alvo "rate");
+* não flaky: quando todas as n runs tiveram o mesmo resultado e o limite superior da taxa do resultado oposto,
+  1 - (1 - confiança)^(1/n), fica abaixo de max_flake_rate (com 95% e 5%, são 59 runs em vez de 200).
+
+A instrumentação sob demanda (InstrumentOnDemandPolicy) envolve qualquer uma delas: as runs rodam sem
+tracing/coverage/profiling até aparecerem um PASSED e um FAILED, e só então passam a ser instrumentadas,
+até capturar algumas runs de cada veredito para o diff_finder.
+"""
+from typing import Any, List, Optional, Tuple
+from collections import Counter
+from math import sqrt
+from statistics import NormalDist
+
+RUN_POLICIES = ("fixed", "adaptive")
+ADAPTIVE_TARGETS = ("pair", "rate")
+INSTRUMENTATION_MODES = ("always", "on-demand")
+
+
+def wilsonInterval(failures: int, runs: int, confidence: float = 0.95) -> Tuple[float, float]:
+    """Intervalo de confiança de Wilson para a taxa de falha."""
+    if runs == 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(1 - (1 - confidence) / 2)
+    rate = failures / runs
+    denominator = 1 + z * z / runs
+    center = (rate + z * z / (2 * runs)) / denominator
+    half_width = z * sqrt(rate * (1 - rate) / runs + z * z / (4 * runs * runs)) / denominator
+    return max(0.0, center - half_width), min(1.0, center + half_width)
+
+
+def zeroEventUpperBound(runs: int, confidence: float = 0.95) -> float:
+    """Limite superior (exato) da probabilidade de um evento que não ocorreu em nenhuma de `runs` tentativas."""
+    if runs == 0:
+        return 1.0
+    return 1 - (1 - confidence) ** (1 / runs)
+
+
+class RunPolicy:
+    """Política fixa: executa sempre as max_runs pedidas.
+
+    O executor chama record() com o veredito de cada run concluída e para quando shouldStop() devolve True.
+    """
+    name = "fixed"
+
+    def __init__(self, max_runs: int) -> None:
+        self.max_runs = max_runs
+        self.verdicts: List[str] = []
+        self.stop_reason: Optional[str] = None
+
+    def record(self, verdict: str, run: Optional[int] = None, instrumented: bool = True) -> None:
+        self.verdicts.append(verdict)
+
+    def instrumentNext(self) -> bool:
+        """Se a próxima run a ser iniciada deve ser instrumentada."""
+        return True
+
+    def shouldStop(self) -> bool:
+        if self.stop_reason is None:
+            if len(self.verdicts) >= self.max_runs:
+                self.stop_reason = f"limite de {self.max_runs} runs atingido"
+            else:
+                self.stop_reason = self._decide()
+        return self.stop_reason is not None
+
+    def _decide(self) -> Optional[str]:
+        return None
+
+    def summaryLines(self) -> List[str]:
+        """Linhas extras do runsSummary.txt (escritas depois de "Tempo total")."""
+        return []
+
+
+class AdaptiveRunPolicy(RunPolicy):
+    """Para as runs assim que o veredito está estatisticamente definido.
+
+    :param max_runs: limite de runs (No_Runs do CSV).
+    :param min_runs: runs executadas antes de qualquer decisão.
+    :param confidence: nível de confiança dos limites.
+    :param target: "pair" para na primeira dupla PASSED/FAILED; "rate" continua até estimar a taxa de falha.
+    :param rate_precision: meia largura máxima do intervalo de Wilson no alvo "rate".
+    :param max_flake_rate: taxa de flakiness abaixo da qual um teste sem resultados mistos é dado como estável.
+    """
+    name = "adaptive"
+
+    def __init__(self, max_runs: int, min_runs: int = 2, confidence: float = 0.95, target: str = "pair",
+                 rate_precision: float = 0.1, max_flake_rate: float = 0.05) -> None:
+        super().__init__(max_runs)
+        if not 0 < confidence < 1:
+            raise ValueError(f"A confiança deve estar entre 0 e 1, recebido: {confidence}")
+        if target not in ADAPTIVE_TARGETS:
+            raise ValueError(f"Alvo adaptativo inválido: '{target}'. Opções: {', '.join(ADAPTIVE_TARGETS)}")
+        if not 0 < rate_precision < 1 or not 0 < max_flake_rate < 1:
+            raise ValueError("rate_precision e max_flake_rate devem estar entre 0 e 1.")
+        self.min_runs = min_runs
+        self.confidence = confidence
+        self.target = target
+        self.rate_precision = rate_precision
+        self.max_flake_rate = max_flake_rate
+
+    def _decide(self) -> Optional[str]:
+        runs = len(self.verdicts)
+        if runs < self.min_runs:
+            return None
+        counts = Counter(self.verdicts)
+        passed, failed = counts["PASSED"], counts["FAILED"]
+
+        if passed and failed:
+            if self.target == "pair":
+                return "runs PASSED e FAILED observadas"
+            low, high = wilsonInterval(failed, passed + failed, self.confidence)
+            if (high - low) / 2 <= self.rate_precision:
+                return f"taxa de falha estimada com precisão de ±{self.rate_precision}"
+            return None
+
+        if len(counts) == 1:
+            bound = zeroEventUpperBound(runs, self.confidence)
+            if bound <= self.max_flake_rate:
+                return (f"{runs} runs {self.verdicts[0]}: taxa do resultado oposto <= {bound:.4f} "
+                        f"com {self.confidence:.0%} de confiança")
+        return None
+
+    def summaryLines(self) -> List[str]:
+        runs = len(self.verdicts)
+        lines = [f"Política de runs: {self.name} (executadas {runs} de {self.max_runs})\n",
+                 f"Motivo da parada: {self.stop_reason or 'execução interrompida'}\n"]
+        counts = Counter(self.verdicts)
+        decided = counts["PASSED"] + counts["FAILED"]
+        if decided:
+            low, high = wilsonInterval(counts["FAILED"], decided, self.confidence)
+            lines.append(f"Taxa de falha: {counts['FAILED']}/{decided} = {counts['FAILED'] / decided:.4f} "
+                         f"(IC Wilson {self.confidence:.0%}: [{low:.4f}, {high:.4f}])\n")
+        return lines
+
+
+class InstrumentOnDemandPolicy(RunPolicy):
+    """Execução em duas fases, com o total de runs limitado pelo max_runs da política de descoberta.
+
+    1. Descoberta: runs sem instrumentação até observar um PASSED e um FAILED. Se isso não acontecer, a
+       política de descoberta decide quando parar (ex: a adaptativa encerra testes estáveis).
+    2. Captura: runs instrumentadas até reunir artifacts_per_verdict runs PASSED e FAILED.
+
+    :param discovery: política que governa a fase de descoberta.
+    :param artifacts_per_verdict: runs instrumentadas necessárias de cada veredito.
+    """
+    name = "on-demand"
+
+    def __init__(self, discovery: RunPolicy, artifacts_per_verdict: int = 3) -> None:
+        super().__init__(discovery.max_runs)
+        if artifacts_per_verdict < 1:
+            raise ValueError(f"artifacts_per_verdict deve ser maior que zero, recebido: {artifacts_per_verdict}")
+        self.discovery = discovery
+        self.artifacts_per_verdict = artifacts_per_verdict
+        self.captured: Counter = Counter()
+        self.instrumented_runs: List[int] = []
+
+    @property
+    def capturing(self) -> bool:
+        counts = Counter(self.discovery.verdicts)
+        return counts["PASSED"] > 0 and counts["FAILED"] > 0
+
+    def instrumentNext(self) -> bool:
+        return self.capturing
+
+    def record(self, verdict: str, run: Optional[int] = None, instrumented: bool = True) -> None:
+        super().record(verdict, run, instrumented)
+        if instrumented:
+            self.captured[verdict] += 1
+            if run is not None:
+                self.instrumented_runs.append(run)
+        else:
+            self.discovery.record(verdict, run, instrumented)
+
+    def _decide(self) -> Optional[str]:
+        if self.capturing:
+            if all(self.captured[verdict] >= self.artifacts_per_verdict for verdict in ("PASSED", "FAILED")):
+                return f"{self.artifacts_per_verdict} runs instrumentadas de cada veredito capturadas"
+            return None
+        if self.discovery.shouldStop():
+            return f"fase sem instrumentação: {self.discovery.stop_reason}"
+        return None
+
+    def summaryLines(self) -> List[str]:
+        runs = len(self.verdicts)
+        instrumented = sum(self.captured.values())
+        lines = [f"Política de runs: {self.name}/{self.discovery.name} (executadas {runs} de {self.max_runs}; "
+                 f"{runs - instrumented} sem instrumentação, {instrumented} instrumentadas)\n",
+                 f"Motivo da parada: {self.stop_reason or 'execução interrompida'}\n",
+                 f"Runs instrumentadas: {', '.join(str(run) for run in sorted(self.instrumented_runs)) or 'nenhuma'} "
+                 f"(PASSED: {self.captured['PASSED']}, FAILED: {self.captured['FAILED']})\n"]
+        counts = Counter(self.verdicts)
+        decided = counts["PASSED"] + counts["FAILED"]
+        if decided:
+            lines.append(f"Taxa de falha: {counts['FAILED']}/{decided} = {counts['FAILED'] / decided:.4f}\n")
+        return lines
+
+
+def createRunPolicy(policy: str, max_runs: int, instrumentation: str = "always", artifacts_per_verdict: int = 3,
+                    **options: Any) -> RunPolicy:
+    """Cria a política de runs pelo nome ("fixed" ou "adaptive"); options vão para o construtor.
+    Com instrumentation="on-demand", ela passa a governar a fase sem instrumentação de um InstrumentOnDemandPolicy.
+    """
+    if instrumentation not in INSTRUMENTATION_MODES:
+        raise ValueError(f"Modo de instrumentação inválido: '{instrumentation}'. Opções: {', '.join(INSTRUMENTATION_MODES)}")
+    if policy == "fixed":
+        run_policy = RunPolicy(max_runs)
+    elif policy == "adaptive":
+        run_policy = AdaptiveRunPolicy(max_runs, **options)
+    else:
+        raise ValueError(f"Política de runs inválida: '{policy}'. Opções: {', '.join(RUN_POLICIES)}")
+    if instrumentation == "on-demand":
+        return InstrumentOnDemandPolicy(run_policy, artifacts_per_verdict)
+    return run_policy
@@ -0,0 +1,227 @@
+""" Diff de traces em escala: linhas internadas, âncoras únicas (patience) e Myers em espaço linear.
+
+Os dois traces são lidos em fluxo e cada linha vira um id inteiro (array de 4 bytes por linha), depois de
+normalizar os endereços (`at 0x7f...` -> `at 0x?`): linhas que só diferem no endereço de um objeto são iguais.
+O alinhamento:
+1. corta o prefixo e o sufixo comuns de cada região;
+2. usa como âncoras as linhas que aparecem uma única vez nas duas sequências, na maior subsequência crescente
+   (patience diff), e repete o processo entre âncoras consecutivas;
+3. em regiões sem âncoras, divide pelo "middle snake" do Myers (espaço linear). Uma região cujo custo passa de
+   max_edit_cost é tratada como substituição completa, o que limita o tempo no pior caso.
+Os blocos comuns alimentam o agrupamento de hunks do difflib, então a saída tem o mesmo formato do
+unified_diff (hunks "@@ -a,b +c,d @@" com 3 linhas de contexto).
+"""
+from typing import Iterable, Iterator, List, Optional, Tuple
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from difflib import Match, SequenceMatcher
+import re
+
+ADDRESS_PATTERN = re.compile(r"0x[0-9a-fA-F]+")
+CONTEXT_LINES = 3
+MAX_EDIT_COST = 4096
+
+
+class LineInterner:
+    """Associa cada linha (com os endereços normalizados) a um id; guarda a primeira versão original vista."""
+
+    def __init__(self) -> None:
+        self._ids = dict()
+        self.lines: List[str] = []
+
+    def intern(self, line: str) -> int:
+        key = ADDRESS_PATTERN.sub("0x?", line)
+        line_id = self._ids.get(key)
+        if line_id is None:
+            line_id = len(self.lines)
+            self._ids[key] = line_id
+            self.lines.append(line)
+        return line_id
+
+    def internAll(self, lines: Iterable[str]) -> array:
+        ids = array("i")
+        ids.extend(map(self.intern, lines))
+        return ids
+
+
+def _patienceAnchors(a: array, aLo: int, aHi: int, b: array, bLo: int, bHi: int) -> List[Tuple[int, int]]:
+    """Pares (i, j) de linhas únicas nas duas regiões, na maior sequência crescente em i e j."""
+    countA = Counter(a[aLo:aHi])
+    countB = Counter(b[bLo:bHi])
+    positionB = {b[j]: j for j in range(bLo, bHi) if countB[b[j]] == 1 and countA.get(b[j]) == 1}
+    if not positionB:
+        return []
+    pairs = [(i, positionB[a[i]]) for i in range(aLo, aHi) if a[i] in positionB]
+
+    # Maior subsequência crescente em j (patience sorting)
+    tails: List[int] = []
+    tail_index: List[int] = []
+    previous = [-1] * len(pairs)
+    for index, (_, j) in enumerate(pairs):
+        pile = bisect_left(tails, j)
+        if pile == len(tails):
+            tails.append(j)
+            tail_index.append(index)
+        else:
+            tails[pile] = j
+            tail_index[pile] = index
+        previous[index] = tail_index[pile - 1] if pile > 0 else -1
+    anchors = []
+    index = tail_index[-1]
+    while index != -1:
+        anchors.append(pairs[index])
+        index = previous[index]
+    anchors.reverse()
+    return anchors
+
+
+def _middleSnake(a: array, aLo: int, aHi: int, b: array, bLo: int, bHi: int, max_edit_cost: int) -> Optional[Tuple[int, int]]:
+    """Ponto de divisão do caminho mínimo de edição (Myers, busca pelas duas pontas em espaço linear).
+    :returns: (i, j) absolutos, ou None se o custo passar de max_edit_cost
+    """
+    n = aHi - aLo
+    m = bHi - bLo
+    limit = min((n + m + 1) // 2, max_edit_cost)
+    v_offset = limit + 1
+    v_length = 2 * limit + 3
+    v1 = [-1] * v_length
+    v2 = [-1] * v_length
+    v1[v_offset + 1] = 0
+    v2[v_offset + 1] = 0
+    delta = n - m
+    front = delta % 2 != 0
+    k1start = k1end = k2start = k2end = 0
+    for d in range(limit):
+        for k1 in range(-d + k1start, d + 1 - k1end, 2):
+            k1_offset = v_offset + k1
+            if k1 == -d or (k1 != d and v1[k1_offset - 1] < v1[k1_offset + 1]):
+                x1 = v1[k1_offset + 1]
+            else:
+                x1 = v1[k1_offset - 1] + 1
+            y1 = x1 - k1
+            while x1 < n and y1 < m and a[aLo + x1] == b[bLo + y1]:
+                x1 += 1
+                y1 += 1
+            v1[k1_offset] = x1
+            if x1 > n:
+                k1end += 2
+            elif y1 > m:
+                k1start += 2
+            elif front:
+                k2_offset = v_offset + delta - k1
+                if 0 <= k2_offset < v_length and v2[k2_offset] != -1 and x1 >= n - v2[k2_offset]:
+                    return aLo + x1, bLo + y1
+
+        for k2 in range(-d + k2start, d + 1 - k2end, 2):
+            k2_offset = v_offset + k2
+            if k2 == -d or (k2 != d and v2[k2_offset - 1] < v2[k2_offset + 1]):
+                x2 = v2[k2_offset + 1]
+            else:
+                x2 = v2[k2_offset - 1] + 1
+            y2 = x2 - k2
+            while x2 < n and y2 < m and a[aHi - x2 - 1] == b[bHi - y2 - 1]:
+                x2 += 1
+                y2 += 1
+            v2[k2_offset] = x2
+            if x2 > n:
+                k2end += 2
+            elif y2 > m:
+                k2start += 2
+            elif not front:
+                k1_offset = v_offset + delta - k2
+                if 0 <= k1_offset < v_length and v1[k1_offset] != -1:
+                    x1 = v1[k1_offset]
+                    y1 = x1 - (k1_offset - v_offset)
+                    if x1 >= n - x2:
+                        return aLo + x1, bLo + y1
+    return None
+
+
+def matchingBlocks(a: array, b: array, max_edit_cost: int = MAX_EDIT_COST) -> List[Match]:
+    """Blocos comuns (i, j, tamanho) entre duas sequências de ids, no formato de SequenceMatcher.get_matching_blocks."""
+    runs: List[Tuple[int, int, int]] = []
+    regions = [(0, len(a), 0, len(b))]
+    while regions:
+        aLo, aHi, bLo, bHi = regions.pop()
+        start = aLo
+        while aLo < aHi and bLo < bHi and a[aLo] == b[bLo]:
+            aLo += 1
+            bLo += 1
+        if aLo > start:
+            runs.append((start, bLo - (aLo - start), aLo - start))
+        end = aHi
+        while aLo < aHi and bLo < bHi and a[aHi - 1] == b[bHi - 1]:
+            aHi -= 1
+            bHi -= 1
+        if aHi < end:
+            runs.append((aHi, bHi, end - aHi))
+        if aLo == aHi or bLo == bHi:
+            continue
+
+        anchors = _patienceAnchors(a, aLo, aHi, b, bLo, bHi)
+        if anchors:
+            previousA, previousB = aLo, bLo
+            for i, j in anchors:
+                regions.append((previousA, i, previousB, j))
+                runs.append((i, j, 1))
+                previousA, previousB = i + 1, j + 1
+            regions.append((previousA, aHi, previousB, bHi))
+            continue
+
+        split = _middleSnake(a, aLo, aHi, b, bLo, bHi, max_edit_cost)
+        if split is None or split in ((aLo, bLo), (aHi, bHi)):
+            continue  # região sem alinhamento útil: substituição completa
+        x, y = split
+        regions.append((aLo, x, bLo, y))
+        regions.append((x, aHi, y, bHi))
+
+    blocks: List[Match] = []
+    for i, j, size in sorted(runs):
+        if blocks and blocks[-1].a + blocks[-1].size == i and blocks[-1].b + blocks[-1].size == j:
+            blocks[-1] = Match(blocks[-1].a, blocks[-1].b, blocks[-1].size + size)
+        else:
+            blocks.append(Match(i, j, size))
+    blocks.append(Match(len(a), len(b), 0))
+    return blocks
+
+
+class _BlocksMatcher(SequenceMatcher):
+    """SequenceMatcher com os blocos comuns já calculados (reaproveita get_grouped_opcodes do difflib)."""
+
+    def __init__(self, blocks: List[Match]) -> None:
+        super().__init__(None, (), ())
+        self.matching_blocks = blocks
+
+
+def _formatRange(start: int, length: int) -> str:
+    beginning = start + 1 if length else start
+    return str(beginning) if length == 1 else f"{beginning},{length}"
+
+
+def iterDiffHunks(linesA: Iterable[str], linesB: Iterable[str], context: int = CONTEXT_LINES,
+                  max_edit_cost: int = MAX_EDIT_COST) -> Iterator[List[str]]:
+    """Hunks do diff unificado entre duas sequências de linhas, sem o cabeçalho ---/+++.
+    Cada hunk é uma lista de linhas: "@@ -a,b +c,d @@" seguida das linhas com prefixo " ", "-" ou "+".
+    """
+    interner = LineInterner()
+    a = interner.internAll(linesA)
+    b = interner.internAll(linesB)
+    text = interner.lines
+
+    def line(prefix: str, line_id: int) -> str:
+        content = text[line_id]
+        return prefix + (content if content.endswith("\n") else content + "\n")
+
+    for group in _BlocksMatcher(matchingBlocks(a, b, max_edit_cost)).get_grouped_opcodes(context):
+        first, last = group[0], group[-1]
+        hunk = [f"@@ -{_formatRange(first[1], last[2] - first[1])} +{_formatRange(first[3], last[4] - first[3])} @@\n"]
+        for tag, i1, i2, j1, j2 in group:
+            if tag == "equal":
+                hunk.extend(line(" ", a[i]) for i in range(i1, i2))
+                continue
+            if tag in ("replace", "delete"):
+                hunk.extend(line("-", a[i]) for i in range(i1, i2))
+            if tag in ("replace", "insert"):
+                hunk.extend(line("+", b[j]) for j in range(j1, j2))
+        yield hunk
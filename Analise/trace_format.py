@@ -0,0 +1,218 @@
+""" Formato binário compacto do trace hierárquico.
+
+Em vez de uma linha de texto por evento, o tracer guarda registros de tamanho fixo em um array de
+inteiros: (tipo do evento, profundidade, id da função, id do valor de retorno). Nomes de função, arquivos
+e valores de retorno são internados em tabelas e gravados uma única vez.
+
+O arquivo é um stream gzip com um cabeçalho seguido de frames (tipo de 1 byte + tamanho uint32 + payload):
+    F: novas funções, lista JSON de [nome, caminho] (ids sequenciais a partir de 0)
+    V: novos valores de retorno, lista JSON de [texto, fingerprint] (ids sequenciais a partir de 1; 0 = sem valor).
+       O fingerprint (ver fingerprint.py) é um hash de 64 bits do valor normalizado; na versão 1 do formato
+       os valores eram só texto, e o leitor calcula o fingerprint na hora.
+    E: eventos, uint32 little-endian, gravados por coluna (todos os tipos, depois todas as profundidades,
+       ids de função e ids de valor), o que comprime bem melhor que os registros intercalados
+Como as tabelas só crescem, vários lotes de frames podem ser concatenados no mesmo arquivo; é assim que o
+TraceRecorder descarrega o buffer em blocos quando recebe um destino (sink) e um limite de memória.
+"""
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+from array import array
+import gzip
+import io
+import json
+import struct
+import sys
+from .fingerprint import fingerprint
+
+MAGIC = b"TTMTRACE"
+VERSION = 2
+HEADER = struct.Struct("<8sH")
+FRAME = struct.Struct("<cI")
+
+EVENT_CALL = 0
+EVENT_RETURN = 1
+RECORD_SIZE = 4
+
+FRAME_FUNCTIONS = b"F"
+FRAME_VALUES = b"V"
+FRAME_EVENTS = b"E"
+
+
+class TraceRecorder:
+    """Acumula os eventos do tracer em registros internados.
+
+    Sem sink, os eventos ficam em memória até write(). Com sink, sempre que o buffer de eventos ou a tabela
+    de valores passa de max_buffer_bytes o bloco é serializado e entregue ao sink, mantendo a memória
+    do tracer limitada independentemente da duração do teste.
+    """
+
+    def __init__(self, sink: Optional[Callable[[bytes], None]] = None, max_buffer_bytes: int = 0) -> None:
+        self.events = array("I")
+        self._functions: Dict[Tuple[str, str], int] = {}
+        self._values: Dict[str, int] = {}
+        self._next_value_id = 1
+        self._values_bytes = 0
+        self._pending_functions: List[Tuple[str, str]] = []
+        self._pending_values: List[Tuple[str, int]] = []
+        self._header_written = False
+        self._flushed_events = 0
+        self._sink = sink
+        self._max_buffer_bytes = max_buffer_bytes
+        self._max_buffered_items = max_buffer_bytes // self.events.itemsize if sink and max_buffer_bytes else 0
+
+    def __len__(self) -> int:
+        """Total de eventos registrados, incluindo os já descarregados no sink."""
+        return self._flushed_events + len(self.events) // RECORD_SIZE
+
+    def internFunction(self, name: str, path: str) -> int:
+        key = (name, path)
+        function_id = self._functions.get(key)
+        if function_id is None:
+            function_id = len(self._functions)
+            self._functions[key] = function_id
+            self._pending_functions.append(key)
+        return function_id
+
+    def internValue(self, value: str) -> int:
+        value_id = self._values.get(value)
+        if value_id is None:
+            value_id = self._next_value_id
+            self._next_value_id += 1
+            self._values[value] = value_id
+            self._pending_values.append((value, fingerprint(value)))
+            self._values_bytes += len(value)
+        return value_id
+
+    def recordCall(self, depth: int, function_id: int) -> None:
+        self.events.extend((EVENT_CALL, depth, function_id, 0))
+        if self._max_buffered_items and len(self.events) >= self._max_buffered_items:
+            self.flush()
+
+    def recordReturn(self, depth: int, function_id: int, value: str) -> None:
+        self.events.extend((EVENT_RETURN, depth, function_id, self.internValue(value)))
+        if self._max_buffered_items and (len(self.events) >= self._max_buffered_items
+                                         or self._values_bytes >= self._max_buffer_bytes):
+            self.flush()
+
+    def flush(self) -> None:
+        """Entrega ao sink tudo o que ainda não foi gravado."""
+        if self._sink is None:
+            return
+        self._flushed_events += len(self.events) // RECORD_SIZE
+        self._sink(self.drain())
+        if self._values_bytes >= self._max_buffer_bytes:
+            # Os valores já gravados continuam válidos no arquivo; só o índice em memória é descartado.
+            # Um valor que reapareça depois ganha um id novo.
+            self._values = {}
+            self._values_bytes = 0
+
+    def write(self, f: BinaryIO) -> None:
+        """Grava no arquivo (já aberto, binário) as entradas novas das tabelas e os eventos acumulados,
+        esvaziando o buffer de eventos."""
+        f.write(self.drain())
+
+    def drain(self) -> bytes:
+        """Serializa as entradas novas das tabelas e os eventos acumulados, esvaziando o buffer de eventos."""
+        out = io.BytesIO()
+        if not self._header_written:
+            out.write(HEADER.pack(MAGIC, VERSION))
+            self._header_written = True
+        if self._pending_functions:
+            _writeFrame(out, FRAME_FUNCTIONS, json.dumps(self._pending_functions).encode("utf-8"))
+            self._pending_functions = []
+        if self._pending_values:
+            _writeFrame(out, FRAME_VALUES, json.dumps(self._pending_values).encode("utf-8"))
+            self._pending_values = []
+        if self.events:
+            columns = [self.events[i::RECORD_SIZE] for i in range(RECORD_SIZE)]
+            if sys.byteorder != "little":
+                for column in columns:
+                    column.byteswap()
+            _writeFrame(out, FRAME_EVENTS, b"".join(column.tobytes() for column in columns))
+            self.events = array("I")
+        return out.getvalue()
+
+
+def _writeFrame(f: BinaryIO, kind: bytes, payload: bytes) -> None:
+    f.write(FRAME.pack(kind, len(payload)))
+    f.write(payload)
+
+
+def isBinaryTrace(fileName: str) -> bool:
+    """Verifica se o arquivo está no formato binário (gzip + cabeçalho TTMTRACE)."""
+    try:
+        with gzip.open(fileName, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except (OSError, EOFError):
+        # Não é gzip (ex: trace em texto puro)
+        return False
+
+
+def iterTraceEvents(fileName: str) -> Iterator[Tuple[int, int, str, str, Optional[str], Optional[int]]]:
+    """Percorre um trace binário em streaming.
+    :param fileName: caminho do trace (.bin.gz).
+    :returns: iterador de (tipo, profundidade, função, caminho, valor de retorno, fingerprint do valor);
+        os dois últimos são None nos eventos de chamada
+    """
+    functions: List[Tuple[str, str]] = []
+    values: List[Tuple[Optional[str], Optional[int]]] = [(None, None)]
+
+    with gzip.open(fileName, "rb") as f:
+        magic, version = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"Arquivo '{fileName}' não é um trace binário.")
+        if version > VERSION:
+            raise ValueError(f"Versão {version} do trace binário não suportada (máximo {VERSION}).")
+
+        while True:
+            header = f.read(FRAME.size)
+            if not header:
+                break
+            kind, size = FRAME.unpack(header)
+            payload = f.read(size)
+
+            if kind == FRAME_FUNCTIONS:
+                functions.extend(tuple(item) for item in json.loads(payload))
+            elif kind == FRAME_VALUES:
+                if version == 1:
+                    values.extend((value, fingerprint(value)) for value in json.loads(payload))
+                else:
+                    values.extend(tuple(item) for item in json.loads(payload))
+            elif kind == FRAME_EVENTS:
+                events = array("I")
+                events.frombytes(payload)
+                if sys.byteorder != "little":
+                    events.byteswap()
+                count = len(events) // RECORD_SIZE
+                kinds, depths, function_ids, value_ids = (events[i * count:(i + 1) * count] for i in range(RECORD_SIZE))
+                for kind, depth, function_id, value_id in zip(kinds, depths, function_ids, value_ids):
+                    function_name, path = functions[function_id]
+                    value, value_fingerprint = values[value_id]
+                    yield kind, depth, function_name, path, value, value_fingerprint
+            else:
+                raise ValueError(f"Frame desconhecido {kind!r} no trace '{fileName}'.")
+
+
+def formatEvent(kind: int, depth: int, function_name: str, path: str, value: Optional[str],
+                value_fingerprint: Optional[int] = None) -> str:
+    """Formata um evento como a linha de texto do trace hierárquico (o fingerprint não entra no texto)."""
+    if kind == EVENT_CALL:
+        return f"{'>' * depth} {function_name} in {path}\n"
+    return f"{'<' * depth} {function_name} returned: {value}\n"
+
+
+def iterTraceLines(fileName: str) -> Iterator[str]:
+    """Lê um trace em qualquer formato (binário, texto gzip ou texto puro) como linhas de texto."""
+    if isBinaryTrace(fileName):
+        for event in iterTraceEvents(fileName):
+            yield formatEvent(*event)
+        return
+
+    with open(fileName, "rb") as f:
+        is_gzip = f.read(2) == b"\x1f\x8b"
+
+    if is_gzip:
+        with gzip.open(fileName, "rt", encoding="utf-8") as f:
+            yield from f
+    else:
+        with open(fileName, "r", encoding="utf-8") as f:
+            yield from f
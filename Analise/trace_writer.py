@@ -0,0 +1,76 @@
+""" Escrita do trace em segundo plano.
+
+O tracer entrega blocos de bytes já serializados; uma thread separada os comprime (o zlib libera o GIL
+durante a compressão) e anexa ao arquivo enquanto o teste continua rodando. A fila é limitada, então se o
+disco não acompanhar o tracer espera, em vez de acumular memória.
+"""
+from typing import Optional
+import queue
+import threading
+import zlib
+
+DEFAULT_BUFFER_BYTES = 16 * 1024 * 1024
+
+# wbits = 16 + MAX_WBITS gera um stream gzip legível por gzip.open
+_GZIP_WBITS = 16 + zlib.MAX_WBITS
+_STOP = None
+
+
+class TraceWriterError(Exception):
+    def __init__(self, *args: object) -> None: super().__init__(*args)
+
+
+class BackgroundTraceWriter:
+    """Comprime e anexa blocos de trace a um arquivo .gz em uma thread dedicada.
+
+    :param fileName: arquivo de saída (sobrescrito).
+    :param max_pending_chunks: quantos blocos podem esperar na fila antes de submit() bloquear.
+    :param compresslevel: nível de compressão do gzip.
+    """
+
+    def __init__(self, fileName: str, max_pending_chunks: int = 2, compresslevel: int = 6) -> None:
+        self.fileName = fileName
+        self._queue: "queue.Queue[Optional[bytes]]" = queue.Queue(maxsize=max_pending_chunks)
+        self._compresslevel = compresslevel
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._file = open(fileName, "wb")
+        self._thread = threading.Thread(target=self._run, name="ttm-trace-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, chunk: bytes) -> None:
+        """Entrega um bloco para compressão; bloqueia enquanto a fila estiver cheia."""
+        if self._error is not None:
+            raise TraceWriterError(f"Falha ao gravar o trace em '{self.fileName}': {self._error}")
+        if chunk:
+            self._queue.put(chunk)
+
+    def close(self) -> None:
+        """Espera a fila esvaziar, finaliza o stream gzip e fecha o arquivo."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._file.close()
+        if self._error is not None:
+            raise TraceWriterError(f"Falha ao gravar o trace em '{self.fileName}': {self._error}")
+
+    def _run(self) -> None:
+        compressor = zlib.compressobj(self._compresslevel, zlib.DEFLATED, _GZIP_WBITS)
+        while True:
+            chunk = self._queue.get()
+            if chunk is _STOP:
+                break
+            if self._error is not None:
+                # Continua consumindo a fila para não travar o tracer
+                continue
+            try:
+                self._file.write(compressor.compress(chunk))
+            except BaseException as e:
+                self._error = e
+        if self._error is None:
+            try:
+                self._file.write(compressor.flush())
+            except BaseException as e:
+                self._error = e
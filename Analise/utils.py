@@ -1,20 +1,34 @@
 import csv
+import json
 import re
 import subprocess
 import contextlib
 import ast
+import multiprocessing
 import os
 from os import path, getcwd, chdir
 from sys import builtin_module_names
-from typing import List, Tuple, Generator, Any, Optional
+from typing import Callable, Dict, List, Sequence, Tuple, Generator, Any, Optional
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from pathlib import Path
 from shutil import rmtree
 import pytest
 import sys
 from time import time
-import gzip
 import cProfile
 import pstats
+from .monitoring import MonitoringTracer, resolveTraceBackend
+from .trace_format import TraceRecorder
+from .trace_writer import BackgroundTraceWriter, DEFAULT_BUFFER_BYTES, TraceWriterError
+from .bounded_repr import BoundedRepr
+from .pipeline import PostProcessingPipeline, dispatch
+from .runner_daemon import ERROR_RUN, RunResult, RunnerDaemon
+from .scheduling import RunPolicy, createRunPolicy
+from .venv_cache import InstallStep, VenvCache, runInstallStep, runnerStep, sourceRevision
+from .wheelhouse import Wheelhouse
+from .git_cache import GitMirrorCache
+from .coverage_bits import COVERAGE_MODES, contextCoverageArgs, reportCoverageArgs
+from .results_store import storeTestResults
 
 # ===================================================================
 # Classe TestResult
@@ -22,7 +36,8 @@ import pstats
 class TestResult:
     def __init__(self, trace: bool = False, prof: bool = False, cov: bool = False, 
                  outputDir: str = ".", testName: str = "", 
-                 automation_root: Path = None, project_root_dir: str = ""):
+                 automation_root: Path = None, project_root_dir: str = "", trace_backend: str = "auto",
+                 trace_buffer_bytes: int = DEFAULT_BUFFER_BYTES, pipeline: Optional[PostProcessingPipeline] = None):
         self.testName = testName; self.outputDir = outputDir; self.cov = cov
         self.trace = trace; self.prof = prof; self.automation_root = automation_root
         if not self.automation_root or not self.automation_root.is_dir():
@@ -32,9 +47,19 @@ class TestResult:
             raise ValueError("`project_root_dir` deve ser fornecido para habilitar o tracing.")
         self.passed = 0; self.failed = 0; self.xfailed = 0; self.skipped = 0
         self.total_duration = 0.0; self.profiler = cProfile.Profile() if self.prof else None
-        self.traceBuffer = []
+        self.traceRecorder = None
+        self.trace_buffer_bytes = trace_buffer_bytes
+        self._trace_writer = None
         self.test_was_run = False
         self.trace_depth = 0
+        self._project_path = Path(self.project_root_dir).resolve() if self.project_root_dir else None
+        self._code_cache = {}
+        self._file_cache = {}
+        self.trace_backend = resolveTraceBackend(trace_backend)
+        self._monitor = None
+        self._bounded_repr = BoundedRepr()
+        # Sem pipeline, os parsers rodam no próprio processo ao fim da sessão
+        self.pipeline = pipeline
 
     @pytest.hookimpl(hookwrapper=True)
     def pytest_runtest_makereport(self, item, call):
@@ -45,95 +70,165 @@ class TestResult:
 
     def pytest_runtest_setup(self, item):
         if self.prof: self.profiler.enable()
-        if self.trace: sys.settrace(self.hierarchical_trace)
+        if self.trace: self._start_tracing()
 
     def pytest_runtest_teardown(self, item, nextitem):
         if self.prof: self.profiler.disable()
-        if self.trace: sys.settrace(None)
+        if self.trace: self._stop_tracing()
+
+    def _start_tracing(self):
+        if self.traceRecorder is None:
+            # Blocos cheios do buffer são comprimidos e gravados em segundo plano durante o teste
+            self._trace_writer = BackgroundTraceWriter(str(Path(self.outputDir) / "calls.bin.gz"))
+            self.traceRecorder = TraceRecorder(sink=self._trace_writer.submit, max_buffer_bytes=self.trace_buffer_bytes)
+        if self.trace_backend == "monitoring":
+            self._monitor = MonitoringTracer(self._trace_function_id, self._record_call, self._record_return)
+            self._monitor.start()
+        else:
+            sys.settrace(self.hierarchical_trace)
+
+    def _stop_tracing(self):
+        if self._monitor is not None:
+            self._monitor.stop()
+            self._monitor = None
+        else:
+            sys.settrace(None)
 
     def pytest_sessionfinish(self, session, exitstatus):
         if not self.test_was_run:
             print("AVISO: Nenhum teste foi executado, pulando pós-processamento de análise.")
+            if self._trace_writer is not None:
+                # Nada para analisar: o calls.bin.gz ficaria vazio
+                self._close_trace_writer()
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(self._trace_writer.fileName)
             return
         if self.prof and self.profiler: self.process_profiling_data()
         if self.trace: self.process_tracing_data()
 
     def process_profiling_data(self):
-        raw_stats_file = Path(self.outputDir) / f"{self.testName}.pstat"
-        human_readable_stats_file = Path(self.outputDir) / f"{self.testName}-stats.txt"
         profiling_csv = Path(self.outputDir) / f"{self.testName}-profiling.csv"
-        self.profiler.dump_stats(raw_stats_file)
-        if os.path.getsize(raw_stats_file) > 0:
-            stats = pstats.Stats(str(raw_stats_file))
-            with open(human_readable_stats_file, "w") as f:
-                stats.stream = f; stats.sort_stats("ncalls").print_stats()
-            parse_script = self.automation_root / "parse_profiling.py"
-            if parse_script.exists():
-                subprocess.run([sys.executable, str(parse_script), "--input_file", str(human_readable_stats_file), "--output_file", str(profiling_csv)], check=True, capture_output=True, text=True)
-        os.remove(raw_stats_file)
+        try:
+            stats = pstats.Stats(self.profiler)
+        except TypeError:
+            # pstats recusa um profiler sem nenhuma função registrada
+            return
+        if self.pipeline is None:
+            dispatch(None, self.automation_root, "parse_profiling", "export_profiling_stats", stats, str(profiling_csv))
+            return
+        # O Stats não atravessa processos; o worker lê o dump binário e o apaga ao terminar
+        stats_file = Path(self.outputDir) / f"{self.testName}-profiling.prof"
+        stats.dump_stats(str(stats_file))
+        self.pipeline.submit("parse_profiling", "export_profiling_stats", str(stats_file), str(profiling_csv),
+                             cleanup=[str(stats_file)])
 
     def process_tracing_data(self):
-        if self.traceBuffer:
-            calls_gz_file = Path(self.outputDir) / "calls.gz"
+        if self.traceRecorder is None: return
+        calls_gz_file = Path(self._trace_writer.fileName)
+        if not self._close_trace_writer(flush=True) or not len(self.traceRecorder):
+            # Trace vazio ou incompleto: não há o que analisar
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(calls_gz_file)
+        else:
             tracing_csv = Path(self.outputDir) / f"{self.testName}-tracing.csv"
-            with gzip.open(calls_gz_file, "wt", encoding='utf-8') as f: f.writelines(self.traceBuffer)
-            parse_script = self.automation_root / "parse_tracing.py"
-            if parse_script.exists():
-                subprocess.run([sys.executable, str(parse_script), "--input_file", str(calls_gz_file), "--output_file", str(tracing_csv)], check=True, capture_output=True, text=True)
-
+            dispatch(self.pipeline, self.automation_root, "parse_tracing", "parse_tracing_file", str(calls_gz_file), str(tracing_csv))
 
-    def hierarchical_trace(self, frame, event, arg):
+    def _close_trace_writer(self, flush: bool = False) -> bool:
+        """Grava o que resta do buffer (se `flush`) e fecha o writer do trace.
+        :returns: False se a gravação falhou; o erro é reportado e não interrompe o fim da sessão.
         """
-        Função de callback para sys.settrace que cria um log hierárquico e filtrado de forma robusta.
+        try:
+            try:
+                if flush: self.traceRecorder.flush()
+            finally:
+                self._trace_writer.close()
+        except TraceWriterError as e:
+            print(f"Erro salvando tracing: {e}")
+            return False
+        return True
+
+    def _trace_function_id(self, code) -> Optional[int]:
+        """
+        Decide se um code object pertence ao projeto analisado e devolve o id da função no trace
+        (ou None quando está fora do projeto). A decisão é memoizada por code object.
         """
-        if event not in ('call', 'return'):
-            return self.hierarchical_trace
-
-        code = frame.f_code
-        filename = code.co_filename
-        
         try:
-            project_path = Path(self.project_root_dir).resolve()
-            file_path = Path(filename).resolve()
-            is_in_project = project_path in file_path.parents or project_path == file_path.parent
-            
-        except (TypeError, OSError):
-            is_in_project = False
-        
-        if not is_in_project:
-            return self.hierarchical_trace
+            return self._code_cache[code]
+        except KeyError:
+            relative_path = self._project_relative_path(code.co_filename)
+            function_id = None if relative_path is None else self.traceRecorder.internFunction(code.co_name, relative_path)
+            self._code_cache[code] = function_id
+            return function_id
+
+    def _project_relative_path(self, filename: str) -> Optional[str]:
+        """
+        Caminho do arquivo relativo à raiz do projeto, ou None quando está fora dele.
+        Memoizado por arquivo, então `Path.resolve()` roda uma única vez por arquivo.
+        """
+        try:
+            return self._file_cache[filename]
+        except KeyError:
+            pass
 
-        func_name = code.co_name
+        # Pseudo-arquivos como "<frozen os>" ou "<string>" não existem em disco e, resolvidos
+        # a partir do cwd, pareceriam estar dentro do projeto
+        if filename.startswith("<"):
+            is_in_project = False
+        else:
+            try:
+                file_path = Path(filename).resolve()
+                is_in_project = self._project_path in file_path.parents
+            except (TypeError, OSError):
+                is_in_project = False
 
-        if event == 'call':
-            self.trace_depth += 1
-            indent = ">" * self.trace_depth
+        relative_path = None
+        if is_in_project:
             try:
-                relative_path = file_path.relative_to(project_path)
+                relative_path = str(file_path.relative_to(self._project_path))
             except ValueError:
                 relative_path = os.path.basename(filename) # Fallback
+        self._file_cache[filename] = relative_path
+        return relative_path
 
-            indent = ">" * self.trace_depth
-            self.traceBuffer.append(f"{indent} {func_name} in {relative_path}\n")
-            self.trace_depth += 1
-        
-        elif event == 'return':
-            if self.trace_depth > 0:
-                self.trace_depth -= 1
-            
-            indent = "<" * self.trace_depth
-            
-            try:
-                return_value_str = repr(arg)
-            except Exception:
-                return_value_str = "[Unrepresentable object]"
+    def hierarchical_trace(self, frame, event, arg):
+        """
+        Função de callback global para sys.settrace que cria um log hierárquico e filtrado de forma robusta.
+        Frames fora do projeto recebem um tracer local None, então seus eventos de linha e de retorno não custam nada.
+        """
+        if event != 'call':
+            return None
+
+        code = frame.f_code
+        function_id = self._trace_function_id(code)
+        if function_id is None:
+            return None
+
+        # Só o evento de retorno interessa ao tracer local
+        frame.f_trace_lines = False
+        self._record_call(code, function_id)
 
-            if len(return_value_str) > 150:
-                return_value_str = return_value_str[:150] + "..."
-                
-            self.traceBuffer.append(f"{indent} {func_name} returned: {return_value_str}\n")
+        return self._trace_return
 
-        return self.hierarchical_trace
+    def _trace_return(self, frame, event, arg):
+        """
+        Tracer local dos frames do projeto: registra o valor de retorno da função.
+        """
+        if event == 'return':
+            self._record_return(frame.f_code, arg)
+        return self._trace_return
+
+    def _record_call(self, code, function_id: int):
+        """Registra a entrada em uma função do projeto (comum aos backends settrace e sys.monitoring)."""
+        self.trace_depth += 1
+        self.traceRecorder.recordCall(self.trace_depth, function_id)
+
+    def _record_return(self, code, arg):
+        """Registra a saída de uma função do projeto e seu valor de retorno."""
+        depth = self.trace_depth
+        if self.trace_depth > 0:
+            self.trace_depth -= 1
+
+        self.traceRecorder.recordReturn(depth, self._code_cache[code], self._bounded_repr(arg))
     
     def pytest_terminal_summary(self, terminalreporter, exitstatus):
         self.passed = len(terminalreporter.stats.get('passed', []))
@@ -156,7 +251,8 @@ class VirtualEnvironment:
     def venv_dir(self) -> Path:
         return self._venv_dir
     
-    def executePytest(self, test_node: str, params: List[bool], output_dir: str, origin_dir: str, count: int, test_result_plugin) -> Tuple[str, float, int, int, int, int]:
+    def executePytest(self, test_node: str, params: List[bool], output_dir: str, origin_dir: str, count: int, test_result_plugin,
+                      coverage_mode: str = "report") -> Tuple[str, float, int, int, int, int]:
         current_dir = getcwd()
         chdir(origin_dir)
 
@@ -179,11 +275,17 @@ class VirtualEnvironment:
         json_output_file = None
         if include_coverage:
             sanitized_test_name = re.sub(r'[^a-zA-Z0-9_\-]', '_', final_test_node.split('/')[-1].split("::")[-1])
-            test_dir_for_cov = final_test_node.split('/')[0]
+            # Teste na raiz do projeto (ex: test_x.py::test_a) mede o projeto inteiro
+            test_path = final_test_node.split("::")[0]
+            test_dir_for_cov = test_path.split('/')[0] if '/' in test_path else "."
             
             run_output_dir = Path(output_dir)
-            json_output_file = run_output_dir / f"{sanitized_test_name}-cov.json"
-            pytest_args.extend([f"--cov={test_dir_for_cov}", f"--cov-report=json:{json_output_file}"])
+            if coverage_mode == "contexts":
+                # Sem relatório por run: os dados vão para o banco do teste, extraído ao fim (extractCoverageContexts)
+                pytest_args.extend(contextCoverageArgs(test_dir_for_cov, run_output_dir, count, Path(origin_dir)))
+            else:
+                json_output_file = run_output_dir / f"{sanitized_test_name}-cov.json"
+                pytest_args.extend(reportCoverageArgs(test_dir_for_cov, run_output_dir, json_output_file, Path(origin_dir)))
 
         pytest_args.append(final_test_node)
         
@@ -200,15 +302,8 @@ class VirtualEnvironment:
         if include_coverage and json_output_file and json_output_file.exists():
             sanitized_test_name = re.sub(r'[^a-zA-Z0-9_\-]', '_', final_test_node.split('/')[-1].split("::")[-1])
             csv_output_file = json_output_file.with_name(f"{sanitized_test_name}-coverage.csv")
-            parse_script = test_result_plugin.automation_root / "parse_coverage.py"
-            if parse_script.exists():
-                try:
-                    subprocess.run(
-                        [sys.executable, str(parse_script), "--input_file", str(json_output_file), "--output_file", str(csv_output_file), "--result", result],
-                        check=True, capture_output=True, text=True
-                    )
-                except subprocess.CalledProcessError as e:
-                    print(f"!!!!!! ERRO ao executar o script de parse de coverage !!!!!!\nErro (stderr):\n{e.stderr}\n")
+            dispatch(test_result_plugin.pipeline, test_result_plugin.automation_root, "parse_coverage", "parse_coverage_data",
+                     str(json_output_file.resolve()), str(csv_output_file.resolve()), result)
 
         chdir(current_dir)
         return (result, test_result_plugin.total_duration, passed, failed, skipped, xfailed)
@@ -247,84 +342,299 @@ def getRepoName(gitUrl: str) -> str:
     else: raise NoRepositoryNameException(f"Nenhum nome de repositório encontrado para {gitUrl}")
 
 def cloning(repo: Repository) -> None:
-    cwd = getcwd()
     if os.path.exists(repo.name): print(f"Diretório '{repo.name}' já existe. Pulando clone."); return
     subprocess.run(["git", "clone", repo.url, repo.name], check=True, capture_output=True)
-    chdir(repo.name)
-    subprocess.run(["git", "checkout", repo.githash], check=True, capture_output=True)
-    chdir(cwd)
-
-def getRepoRequirements(repo: Repository) -> List[Path]:
-    project_path = Path(repo.name)
+    subprocess.run(["git", "checkout", repo.githash], check=True, capture_output=True, cwd=repo.name)
+
+# Diretórios e palavras do nome de arquivos de requirements que não dizem respeito aos testes
+IGNORED_REQUIREMENTS_DIRS = {"docs", "doc", ".github", ".circleci", "ci", "benchmarks", "benchmark", "examples",
+                             "example", ".tox", ".nox", ".git", "node_modules", "venv", ".venv", "env", "site-packages"}
+IGNORED_REQUIREMENTS_WORDS = {"docs", "doc", "documentation", "sphinx", "rtd", "readthedocs", "lint", "linting",
+                              "style", "mypy", "typing", "release", "publish", "upload", "benchmark", "benchmarks"}
+
+def isTestRequirementsFile(req_file: Path, project_dir: Path) -> bool:
+    """Se o arquivo de requirements é relevante para executar os testes (descarta docs, CI, lint, release...)."""
+    relative = req_file.relative_to(project_dir)
+    if any(part.lower() in IGNORED_REQUIREMENTS_DIRS for part in relative.parts[:-1]):
+        return False
+    words = set(re.split(r'[-_.]', req_file.stem.lower()))
+    return not words & IGNORED_REQUIREMENTS_WORDS
+
+def getRepoRequirements(project_path: Path) -> List[Path]:
     if not project_path.is_dir(): return []
     abs_project_path = project_path.resolve()
-    return list(abs_project_path.rglob("*requirements*.txt"))
-
-def runSpecificTests(repo: Repository, mod_name: str, params: List[bool], test_node: str, no_runs: int,
-                     env_path: Path) -> None:
-    cwd = getcwd()
-    
+    return sorted(req_file for req_file in abs_project_path.rglob("*requirements*.txt")
+                  if req_file.is_file() and isTestRequirementsFile(req_file, abs_project_path))
+
+RUNNERS = ("inprocess", "daemon")
+
+PROTECTED_PACKAGES = {'pytest', 'pytest-cov', 'coverage', 'setuptools', 'wheel'}
+
+def filterRequirements(req_file: Path) -> List[str]:
+    """Linhas do arquivo de requirements que devem ser instaladas (sem comentários, -e e pacotes protegidos).
+    Caminhos de -r/-c passam a ser absolutos, já que as linhas são juntadas em um arquivo no diretório do projeto.
+    """
+    filtered_requirements = []
+    try:
+        with open(req_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = re.split(r'\s+#', line.strip())[0]
+                if not line or line.startswith('#') or line.startswith('-e'):
+                    continue
+
+                option = re.match(r'^(-r|--requirement|-c|--constraint)\s*=?\s*(\S+)$', line)
+                if option:
+                    filtered_requirements.append(f"{option.group(1)} {(req_file.parent / option.group(2)).resolve()}")
+                    continue
+
+                package_name = re.split(r'[=<>!~;\[\s]', line)[0].strip()
+
+                if package_name.lower() not in PROTECTED_PACKAGES:
+                    filtered_requirements.append(line)
+                else:
+                    print(f"      - Ignorando dependência protegida: {line}")
+    except Exception as e:
+        print(f"Erro ao ler o arquivo de requirements '{req_file.name}': {e}"); raise
+    return filtered_requirements
+
+def installationSteps(project_dir: Path, requirements_files: List[Path]) -> List[InstallStep]:
+    """Passos de instalação do projeto: o setup.py e depois todos os arquivos de requirements (já filtrados)
+    juntos, em uma única resolução do pip."""
+    steps = []
+    if (project_dir / "setup.py").exists():
+        steps.append(InstallStep(["install", "--no-cache-dir", "--no-build-isolation", "."],
+                                 description="o projeto (setup.py)", source=True))
+    if requirements_files:
+        print(f">>> Encontrados {len(requirements_files)} arquivos de dependências...")
+        merged_requirements: List[str] = []
+        for req_file in requirements_files:
+            print(f"--- Processando arquivo: {req_file.relative_to(project_dir)}")
+            filtered_requirements = filterRequirements(req_file)
+            if not filtered_requirements:
+                print("      - Nenhuma dependência não protegida para instalar.")
+            merged_requirements.extend(line for line in filtered_requirements if line not in merged_requirements)
+        if merged_requirements:
+            steps.append(InstallStep(["install", "--no-cache-dir", "--no-build-isolation"],
+                                     description=f"{len(merged_requirements)} dependências de {len(requirements_files)} arquivo(s) de requirements",
+                                     requirements=merged_requirements))
+    return steps
+
+def checkoutRepository(repo: Repository, git_cache: Optional[str] = None) -> Tuple[Path, List[Path]]:
+    """Clona o repositório (se necessário) e o coloca no commit pedido.
+    :param git_cache: diretório do cache git; o projeto passa a ser o worktree do commit, servido pelo espelho da URL
+    :returns: diretório do projeto e arquivos de requirements encontrados
+    """
+    if git_cache is not None:
+        project_dir = GitMirrorCache(Path(git_cache)).worktree(repo.url, repo.githash, repo.name)
+        return project_dir, getRepoRequirements(project_dir)
     if not path.exists(repo.name):
         print(f"Clonando repositório '{repo.name}'...")
         cloning(repo)
-
-    requirements_files = getRepoRequirements(repo)
-    pip_executable = str(env_path.resolve() / "bin" / "pip")
-    project_dir = (Path(cwd) / repo.name).resolve()
+    elif repo.githash != ".":
+        # O clone pode estar em outro commit (ex: campanha com mais de um hash do mesmo projeto)
+        subprocess.run(["git", "checkout", repo.githash], check=True, capture_output=True, cwd=repo.name)
+    project_dir = (Path(getcwd()) / repo.name).resolve()
+    return project_dir, getRepoRequirements(project_dir)
+
+def prepareRepository(repo: Repository, env_path: Optional[Path] = None, venv_cache: Optional[str] = None,
+                      wheelhouse: Optional[Wheelhouse] = None, git_cache: Optional[str] = None) -> Tuple[Path, List[Path], Path]:
+    """Clona o repositório (se necessário) e instala o projeto e suas dependências no ambiente virtual.
+    :param env_path: venv onde instalar (sem cache)
+    :param venv_cache: diretório do cache de venvs; o venv usado passa a ser a camada final do cache, e um
+        commit já instalado antes não reinstala nada
+    :param wheelhouse: wheelhouse local usado pelas instalações
+    :param git_cache: diretório do cache git (espelho por URL e worktree por commit)
+    :returns: diretório do projeto, arquivos de requirements encontrados e o venv pronto
+    """
+    if (env_path is None) == (venv_cache is None):
+        raise ValueError("Informe exatamente um entre env_path e venv_cache.")
+    project_dir, requirements_files = checkoutRepository(repo, git_cache)
 
     print(f"\n>>> Verificando e instalando dependências para '{repo.name}'...")
-    
-    setup_file_path = project_dir / "setup.py"
-    if setup_file_path.exists():
-        print(f">>> Instalando o projeto '{repo.name}'...")
-        try:
-            subprocess.run([pip_executable, "install", "--no-cache-dir", "--no-build-isolation", "."], check=True, cwd=str(project_dir), capture_output=True, text=True)
-        except subprocess.CalledProcessError as e:
-            print(f"!!!!!! ERRO CRÍTICO ao instalar o projeto (setup.py) !!!!!!\nErro (stderr):\n{e.stderr}\n"); raise
-        
-    if requirements_files:
-        print(f">>> Encontrados {len(requirements_files)} arquivos de dependências...")
-        for req_file in requirements_files:
-            print(f"--- Processando arquivo: {req_file.relative_to(project_dir)}")
-            
-            protected_packages = {'pytest', 'pytest-cov', 'coverage', 'setuptools', 'wheel'}
-            filtered_requirements = []
+    steps = installationSteps(project_dir, requirements_files)
+
+    if venv_cache is not None:
+        revision = sourceRevision(project_dir)
+        if revision is None:
+            print("AVISO: projeto sem commit limpo; a instalação do próprio projeto não será reaproveitada do cache.")
+        env_dir = VenvCache(Path(venv_cache)).build([runnerStep(), *steps], project_dir, revision, wheelhouse)
+    else:
+        env_dir = Path(env_path).resolve()
+        for step in steps:
+            print(f">>> Instalando {step.description}...")
             try:
-                with open(req_file, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        line = line.strip()
-                        if not line or line.startswith('#') or line.startswith('-e'):
-                            continue
-                        
-                        package_name = re.split(r'[=<>!~]', line)[0].strip()
-                        
-                        if package_name not in protected_packages:
-                            filtered_requirements.append(line)
-                        else:
-                            print(f"      - Ignorando dependência protegida: {line}")
-            except Exception as e:
-                print(f"Erro ao ler o arquivo de requirements '{req_file.name}': {e}"); raise
-
-            if filtered_requirements:
-                temp_req_path = project_dir / "temp_filtered_reqs.txt"
-                with open(temp_req_path, 'w', encoding='utf-8') as f:
-                    f.write('\n'.join(filtered_requirements))
-
-                print(f"--- Instalando {len(filtered_requirements)} dependências filtradas...")
-                try:
-                    subprocess.run(
-                        [pip_executable, "install", "--no-cache-dir", "--no-build-isolation", "-r", str(temp_req_path)],
-                        check=True, capture_output=True, text=True, cwd=str(project_dir)
-                    )
-                except subprocess.CalledProcessError as e:
-                    print(f"!!!!!! AVISO: Falha ao instalar dependências filtradas de '{req_file.name}' !!!!!!\nErro (stderr):\n{e.stderr}\n"); raise
-                finally:
-                    os.remove(temp_req_path)
-            else:
-                print("      - Nenhuma dependência não protegida para instalar.")
+                runInstallStep(env_dir, step, project_dir, wheelhouse)
+            except subprocess.CalledProcessError as e:
+                print(f"!!!!!! ERRO ao instalar {step.description} !!!!!!\nErro (stderr):\n{e.stderr}\n"); raise
 
     print(">>> Instalação de dependências concluída.")
-    
+    return project_dir, requirements_files, env_dir
+
+def executeRun(run: int, test_node: str, params: List[bool], output_test_dir: Path, test_name: str,
+               automation_root: Path, project_dir: Path, env_path: Path, requirements_files: List[Path],
+               trace_backend: str = "auto", trace_buffer_mb: int = 16,
+               pipeline: Optional[PostProcessingPipeline] = None, instrument: bool = True,
+               coverage_mode: str = "report") -> RunResult:
+    """Executa uma run do teste, com seus resultados em output_test_dir/Run-{run}.
+    Função de módulo para poder ser enviada aos workers do modo paralelo.
+    :param instrument: se False, a run só produz o veredito (sem tracing/coverage/profiling nem diretório Run-k)
+    :returns: (veredito, duração, passed, failed, skipped, xfailed)
+    """
+    if not instrument:
+        params = [False, False, False]
+    include_tracing, include_coverage, include_profiling = params
+    run_output_dir = Path(output_test_dir) / f"Run-{run}"
+    if any(params):
+        run_output_dir.mkdir(parents=True, exist_ok=True)
+
+    test_result = TestResult(
+        trace=include_tracing, prof=include_profiling, cov=include_coverage,
+        outputDir=str(run_output_dir), testName=test_name,
+        automation_root=automation_root,
+        project_root_dir=str(project_dir),
+        trace_backend=trace_backend,
+        trace_buffer_bytes=trace_buffer_mb * 1024 * 1024,
+        pipeline=pipeline
+    )
+
+    with venv(env_path, str(automation_root), requirements_files) as env:
+        return env.executePytest(
+            test_node=test_node,
+            params=params,
+            output_dir=str(run_output_dir),
+            origin_dir=str(project_dir),
+            count=run,
+            test_result_plugin=test_result,
+            coverage_mode=coverage_mode
+        )
+
+def executeRunsSequentially(no_runs: int, execute: Callable[[int, bool], RunResult], policy: Optional[RunPolicy] = None) -> Dict[int, RunResult]:
+    """Executa as runs em ordem até no_runs ou até a política mandar parar.
+    :param execute: função que executa a run de número k, instrumentada ou não
+    :returns: resultado de cada run, indexado pelo número da run
+    """
+    policy = policy or RunPolicy(no_runs)
+    results: Dict[int, RunResult] = {}
+    for run in range(no_runs):
+        instrument = policy.instrumentNext()
+        results[run] = execute(run, instrument)
+        policy.record(results[run][0], run, instrument)
+        if policy.shouldStop():
+            break
+    return results
+
+def executeRunsInParallel(no_runs: int, jobs: int, policy: Optional[RunPolicy] = None, **run_args) -> Dict[int, RunResult]:
+    """Distribui as runs entre `jobs` processos. Cada run roda em um processo novo (spawn), isolada do
+    estado deixado pelas anteriores; os parsers rodam no próprio worker, ao fim da run.
+    Só há `jobs` runs em andamento por vez, para que a política possa parar a execução; as runs já iniciadas
+    quando ela decide parar são concluídas e entram no resultado.
+    :returns: resultado de cada run, indexado pelo número da run
+    """
+    policy = policy or RunPolicy(no_runs)
+    pool_options = {"max_tasks_per_child": 1} if sys.version_info >= (3, 11) else {}
+    results: Dict[int, RunResult] = {}
+    running = {}
+    next_run = 0
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("spawn"), **pool_options) as executor:
+        while True:
+            while next_run < no_runs and len(running) < jobs and not policy.shouldStop():
+                instrument = policy.instrumentNext()
+                running[executor.submit(executeRun, next_run, instrument=instrument, **run_args)] = (next_run, instrument)
+                next_run += 1
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                run, instrument = running.pop(future)
+                try:
+                    results[run] = future.result()
+                except Exception as e:
+                    print(f"!!!!!! ERRO na Run {run} !!!!!!\nErro: {e}\n")
+                    results[run] = ERROR_RUN
+                policy.record(results[run][0], run, instrument)
+                print(f">>> Run {run} concluída: {results[run][0]} ({len(results)}/{no_runs})")
+    return results
+
+def finalVerdict(passed_count: int, failed_count: int, skipped_count: int, xfailed_count: int) -> str:
+    if skipped_count > 0: return "SKIPPED"
+    if xfailed_count > 0: return "XFAILED"
+    if passed_count > 0 and failed_count > 0: return "FLAKY"
+    if passed_count > 0 and failed_count == 0: return "PASSED"
+    if passed_count == 0 and failed_count > 0: return "FAILED"
+    return "ERROR"
+
+def writeRunsSummary(output_test_dir: Path, test_type: str, run_results: Dict[int, RunResult],
+                     extra_lines: Sequence[str] = ()) -> Path:
+    """Acrescenta ao runsSummary.txt o resultado de cada run (em ordem), o tempo total e o veredito final.
+    extra_lines (ex: dados da política de runs) entram depois de "Tempo total", onde o flakyFinder já parou de ler.
+    """
+    run_summary = [f"Teste: {test_type}\n"]
+    total_time, passed_count, failed_count, skipped_count, xfailed_count = 0.0, 0, 0, 0, 0
+    for run in sorted(run_results):
+        run_verdict, run_duration, run_passed, run_failed, run_skipped, run_xfailed = run_results[run]
+        total_time += run_duration
+        passed_count += run_passed
+        failed_count += run_failed
+        skipped_count += run_skipped
+        xfailed_count += run_xfailed
+        run_summary.append(f"Run {run}: {run_verdict} Tempo: {run_duration}\n")
+
+    run_summary.append(f"\nTempo total: {total_time:.4f}s\n")
+    run_summary.extend(extra_lines)
+    run_summary.append(f"Resultado Final: {finalVerdict(passed_count, failed_count, skipped_count, xfailed_count)}\n")
+
+    summary_file_path = Path(output_test_dir) / "runsSummary.txt"
+    with open(summary_file_path, "a", encoding='utf-8') as f:
+        f.writelines(run_summary)
+    return summary_file_path
+
+def extractCoverageContexts(env_path: Path, automation_root: Path, output_test_dir: Path, project_dir: Path,
+                            run_results: Dict[int, RunResult]) -> None:
+    """Modo de coverage "contexts": une os dados das runs no banco do teste e extrai as linhas de cada run.
+    Roda no Python do venv, que tem o coverage instalado.
+    """
+    results = {str(run): result[0] for run, result in run_results.items()}
+    command = [str(Path(env_path) / "bin" / "python"), str(Path(automation_root) / "parse_coverage.py"),
+               "--contexts", str(output_test_dir), "--project_dir", str(project_dir), "--results", json.dumps(results)]
+    try:
+        subprocess.run(command, check=True, cwd=project_dir, capture_output=True, text=True)
+    except subprocess.CalledProcessError as e:
+        print(f"!!!!!! ERRO ao extrair a cobertura das runs !!!!!!\nErro (stderr):\n{e.stderr}\n")
+
+def runSpecificTests(repo: Repository, mod_name: str, params: List[bool], test_node: str, no_runs: int,
+                     env_path: Optional[Path], trace_backend: str = "auto", trace_buffer_mb: int = 16,
+                     postprocess_workers: int = 2, jobs: int = 1, runner: str = "inprocess",
+                     run_policy: str = "fixed", policy_options: Optional[Dict[str, Any]] = None,
+                     instrumentation: str = "always", artifacts_per_verdict: int = 3,
+                     venv_cache: Optional[str] = None, wheelhouse: Optional[str] = None, offline: bool = False,
+                     git_cache: Optional[str] = None, coverage_mode: str = "report",
+                     results_store: Optional[str] = None,
+                     prepared: Optional[Tuple[Path, List[Path], Path]] = None) -> None:
+    """Executa as runs de um teste e grava o runsSummary.txt.
+    :param venv_cache: diretório do cache de venvs, usado no lugar de env_path (exige o runner "daemon")
+    :param wheelhouse: diretório do wheelhouse local usado na instalação; offline proíbe o acesso ao índice
+    :param git_cache: diretório do cache git, usado no lugar do clone em <cwd>/<nome>
+    :param coverage_mode: "report" (um JSON por run) ou "contexts" (um banco do coverage por teste, com contexto Run-k)
+    :param results_store: diretório do armazém colunar (Parquet) que recebe os resultados ao fim do teste
+    :param prepared: retorno de prepareRepository, quando o repositório já foi preparado (modo campanha)
+    """
+    if jobs < 1:
+        raise ValueError(f"jobs deve ser maior que zero, recebido: {jobs}")
+    if runner not in RUNNERS:
+        raise ValueError(f"Runner inválido: '{runner}'. Opções: {', '.join(RUNNERS)}")
+    if runner == "daemon" and jobs > 1:
+        raise ValueError("O runner 'daemon' executa as runs em sequência e não pode ser combinado com jobs > 1.")
+    if coverage_mode not in COVERAGE_MODES:
+        raise ValueError(f"Modo de coverage inválido: '{coverage_mode}'. Opções: {', '.join(COVERAGE_MODES)}")
+    if venv_cache is not None and runner != "daemon":
+        raise ValueError("Com o cache de venvs (venv_cache) os testes precisam do runner 'daemon'.")
+    policy = createRunPolicy(run_policy, no_runs, instrumentation, artifacts_per_verdict, **(policy_options or {}))
+    cwd = getcwd()
+    if offline and not wheelhouse:
+        raise ValueError("O modo offline exige um wheelhouse.")
+    project_dir, requirements_files, env_path = prepared or prepareRepository(
+        repo, None if venv_cache else env_path, venv_cache, Wheelhouse(Path(wheelhouse), offline) if wheelhouse else None, git_cache)
+
     include_tracing, include_coverage, include_profiling = params
     
     sanitized_test_name = re.sub(r'[^a-zA-Z0-9_\-]', '_', test_node.split("::")[-1])
@@ -332,57 +642,35 @@ def runSpecificTests(repo: Repository, mod_name: str, params: List[bool], test_n
     output_test_dir = (Path(cwd) / f"Test-{mod_name}" / sanitized_test_name).resolve()
     output_test_dir.mkdir(parents=True, exist_ok=True)
 
-    run_summary = []
     test_type = "Tracing" if include_tracing else "Coverage" if include_coverage else "Profiling"
-    run_summary.append(f"Teste: {test_type}\n")
-
-    total_time, passed_count, failed_count, skipped_count, xfailed_count = 0.0, 0, 0, 0, 0
-
-    with venv(env_path, cwd, requirements_files) as env:
-        for run in range(no_runs):
-            run_output_dir = output_test_dir / f"Run-{run}"
-            run_output_dir.mkdir(parents=True, exist_ok=True)
-            
-            automation_project_root = Path(cwd).resolve()
-            
-            test_result = TestResult(
-                trace=include_tracing, prof=include_profiling, cov=include_coverage,
-                outputDir=str(run_output_dir), testName=sanitized_test_name,
-                automation_root=automation_project_root,
-                project_root_dir=str(project_dir)
-            )
-
-            results = env.executePytest(
-                test_node=test_node,
-                params=params,
-                output_dir=str(run_output_dir),
-                origin_dir=str(project_dir),
-                count=run,
-                test_result_plugin=test_result
-            )
-            
-            run_verdict, run_duration, run_passed, run_failed, run_skipped, run_xfailed = results
-            total_time += run_duration
-            passed_count += run_passed
-            failed_count += run_failed
-            skipped_count += run_skipped
-            xfailed_count += run_xfailed
-            run_summary.append(f"Run {run}: {run_verdict} Tempo: {run_duration}\n")
-
-    run_summary.append(f"\nTempo total: {total_time:.4f}s\n")
-    
-    final_verdict = ""
-    if skipped_count > 0: final_verdict = "SKIPPED"
-    elif xfailed_count > 0: final_verdict = "XFAILED"
+    automation_project_root = Path(cwd).resolve()
+    run_args = dict(test_node=test_node, params=params, output_test_dir=output_test_dir, test_name=sanitized_test_name,
+                    automation_root=automation_project_root, project_dir=project_dir, env_path=Path(env_path).resolve(),
+                    requirements_files=requirements_files, trace_backend=trace_backend, trace_buffer_mb=trace_buffer_mb,
+                    coverage_mode=coverage_mode)
+
+    if jobs > 1:
+        print(f"\n>>> Executando {no_runs} runs em {jobs} processos...")
+        run_results = executeRunsInParallel(no_runs, jobs, policy, **run_args)
+    elif runner == "daemon":
+        # Com coverage o projeto não é pré-importado: as linhas de nível de módulo não seriam medidas
+        print(f"\n>>> Executando {no_runs} runs no runner residente do venv...")
+        with RunnerDaemon(run_args["env_path"], automation_project_root, project_dir, test_node, warm=not include_coverage) as daemon:
+            run_results = executeRunsSequentially(no_runs, lambda run, instrument: daemon.run(run, instrument=instrument, **run_args), policy)
     else:
-        if passed_count > 0 and failed_count > 0: final_verdict = "FLAKY"
-        elif passed_count > 0 and failed_count == 0: final_verdict = "PASSED"
-        elif passed_count == 0 and failed_count > 0: final_verdict = "FAILED"
-        else: final_verdict = "ERROR"
-    run_summary.append(f"Resultado Final: {final_verdict}\n") # Renomeado para "Resultado Final"
-    
-    summary_file_path = output_test_dir / "runsSummary.txt"
-    with open(summary_file_path, "a", encoding='utf-8') as f:
-        f.writelines(run_summary)
-    
-    print(f"\nSumário da execução salvo em: {summary_file_path}")
\ No newline at end of file
+        # Os parsers de cada run rodam no pool enquanto a próxima run executa; com 0 workers rodam em linha
+        pipeline = PostProcessingPipeline(automation_project_root, max_workers=postprocess_workers) if postprocess_workers > 0 else None
+        with contextlib.ExitStack() as stack:
+            if pipeline is not None: stack.enter_context(pipeline)
+            run_results = executeRunsSequentially(no_runs, lambda run, instrument: executeRun(run, pipeline=pipeline, instrument=instrument, **run_args), policy)
+
+    if include_coverage and coverage_mode == "contexts":
+        extractCoverageContexts(run_args["env_path"], automation_project_root, output_test_dir, project_dir, run_results)
+
+    if len(run_results) < no_runs:
+        print(f">>> Política '{policy.name}' encerrou após {len(run_results)} de {no_runs} runs: {policy.stop_reason}")
+    summary_file_path = writeRunsSummary(output_test_dir, test_type, run_results, policy.summaryLines())
+    print(f"\nSumário da execução salvo em: {summary_file_path}")
+    if results_store:
+        storeTestResults(Path(results_store), mod_name, sourceRevision(project_dir) or repo.githash, test_node,
+                         output_test_dir, run_results)
\ No newline at end of file
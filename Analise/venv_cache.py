@@ -0,0 +1,322 @@
+""" Cache de ambientes virtuais endereçado por conteúdo.
+
+A instalação de um projeto é uma sequência de passos (criar o venv, instalar o runner, instalar o projeto,
+cada requirements, cada comando das receitas do CUSTOM_INSTALLS). Cada passo vira uma camada do cache, com a
+chave
+    H(chave da camada anterior, comando, conteúdo dos arquivos de entrada[, commit e diretório do projeto])
+A camada base é chaveada pela versão do interpretador. Passos que instalam o próprio projeto (pip install .,
+pip install -e .) incluem o commit na chave; os demais (requirements, pacotes avulsos) são compartilhados
+entre commits com as mesmas entradas. Mudar um passo tardio refaz só as camadas a partir dele, e repetir um
+commit conhecido não instala nada.
+
+Cada camada é uma cópia completa do venv da anterior em <cache>/layers/<chave>, com os caminhos absolutos
+(shebangs dos scripts, activate) reescritos. A camada é montada em um diretório temporário e renomeada ao
+final, sob um lock por chave, então execuções concorrentes nunca veem uma camada pela metade.
+"""
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+from pathlib import Path
+import contextlib
+import fcntl
+import hashlib
+import json
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import sys
+import uuid
+from .wheelhouse import Wheelhouse
+
+CACHE_VERSION = 1
+
+# Pacotes que o runner precisa no venv do projeto (os mesmos protegidos na instalação)
+RUNNER_PACKAGES = ("pytest", "pytest-cov", "coverage", "setuptools", "wheel")
+
+# Arquivo temporário com os requirements filtrados de um passo, gravado no diretório do projeto
+TEMP_REQUIREMENTS = "temp_filtered_reqs.txt"
+
+
+class InstallStep(NamedTuple):
+    """Um passo de instalação, que vira uma camada do cache.
+
+    command: argumentos do pip (lista) ou linha de shell (str, como as receitas do CUSTOM_INSTALLS).
+    description: texto usado nas mensagens de erro.
+    requirements: linhas de requirements gravadas em um arquivo temporário e passadas ao pip com -r.
+    inputs: arquivos (relativos ao diretório do passo) cujo conteúdo entra na chave.
+    source: se o passo instala o próprio projeto; a chave passa a incluir o commit e o diretório.
+    """
+    command: Union[List[str], str]
+    description: str = ""
+    requirements: Optional[List[str]] = None
+    inputs: Tuple[str, ...] = ()
+    source: bool = False
+
+
+def shellStep(command: str, cwd: Path) -> InstallStep:
+    """Cria o passo de uma linha de shell das receitas, deduzindo os arquivos de entrada (-r, --constraint)
+    e se ela instala o projeto (. , .[extra], -e)."""
+    tokens = shlex.split(command)
+    inputs = []
+    for option, value in zip(tokens, tokens[1:]):
+        if option in ("-r", "--requirement", "-c", "--constraint") and (Path(cwd) / value).is_file():
+            inputs.append(value)
+    source = any(token == "." or token.startswith((".[", "./")) or token in ("-e", "--editable") for token in tokens)
+    return InstallStep(command, description=command, inputs=tuple(inputs), source=source)
+
+
+def runnerStep() -> InstallStep:
+    return InstallStep(["install", "--no-cache-dir", *RUNNER_PACKAGES], description="pytest e plugins do runner")
+
+
+def sourceRevision(project_dir: Path) -> Optional[str]:
+    """Commit do projeto, ou None se não for um repositório git ou houver arquivos versionados modificados."""
+    try:
+        head = subprocess.run(["git", "rev-parse", "HEAD"], cwd=str(project_dir), check=True, capture_output=True, text=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=str(project_dir),
+                               check=True, capture_output=True, text=True).stdout.strip()
+    except (subprocess.CalledProcessError, OSError):
+        return None
+    return None if dirty else head
+
+
+def venvEnvironment(venv_dir: Path) -> Dict[str, str]:
+    """Variáveis de ambiente equivalentes a um `source bin/activate`."""
+    env = dict(os.environ)
+    env.pop("PYTHONHOME", None)
+    env["VIRTUAL_ENV"] = str(venv_dir)
+    env["PATH"] = os.pathsep.join([str(Path(venv_dir) / "bin"), env.get("PATH", "")])
+    return env
+
+
+def _runStep(python: Path, step: InstallStep, cwd: Path, env: Dict[str, str]) -> subprocess.CompletedProcess:
+    if isinstance(step.command, str):
+        return subprocess.run(step.command, shell=True, executable="/bin/bash", cwd=str(cwd), env=env,
+                              check=True, capture_output=True, text=True)
+
+    command = [str(python), "-m", "pip", *step.command]
+    if step.requirements is None:
+        return subprocess.run(command, cwd=str(cwd), env=env, check=True, capture_output=True, text=True)
+
+    temp_req_path = Path(cwd) / TEMP_REQUIREMENTS
+    with open(temp_req_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(step.requirements))
+    try:
+        return subprocess.run(command + ["-r", str(temp_req_path)], cwd=str(cwd), env=env,
+                              check=True, capture_output=True, text=True)
+    finally:
+        os.remove(temp_req_path)
+
+
+# Executado com o python do venv: devolve as linhas de requirements que ainda não estão satisfeitas
+_UNSATISFIED_SCRIPT = r"""
+import json, sys
+from importlib import metadata
+try:
+    from packaging.requirements import Requirement
+except ImportError:
+    from pip._vendor.packaging.requirements import Requirement
+
+pending = []
+for line in json.load(sys.stdin):
+    try:
+        requirement = Requirement(line)
+    except Exception:
+        pending.append(line)
+        continue
+    if requirement.marker is not None and not requirement.marker.evaluate():
+        continue
+    if requirement.url or requirement.extras:
+        pending.append(line)
+        continue
+    try:
+        version = metadata.version(requirement.name)
+    except metadata.PackageNotFoundError:
+        pending.append(line)
+        continue
+    if not requirement.specifier.contains(version, prereleases=True):
+        pending.append(line)
+json.dump(pending, sys.stdout)
+"""
+
+
+def unsatisfiedRequirements(python: Path, requirements: Sequence[str]) -> List[str]:
+    """Linhas de requirements que ainda precisam ser instaladas no venv de `python` (consulta o
+    importlib.metadata dentro do venv). Opções como --index-url acompanham as linhas pendentes; -r sempre fica
+    pendente, pois o conteúdo do arquivo incluído não é verificado. Requirements com extras ou URL também ficam.
+    """
+    options = [line for line in requirements if line.startswith("-")]
+    packages = [line for line in requirements if not line.startswith("-")]
+    process = subprocess.run([str(python), "-c", _UNSATISFIED_SCRIPT], input=json.dumps(packages),
+                             check=True, capture_output=True, text=True)
+    pending = json.loads(process.stdout)
+    if not pending and not any(re.match(r"^(-r|--requirement)\b", option) for option in options):
+        return []
+    return options + pending
+
+
+def runInstallStep(venv_dir: Path, step: InstallStep, cwd: Path,
+                   wheelhouse: Optional[Wheelhouse] = None) -> subprocess.CompletedProcess:
+    """Executa um passo de instalação no venv (lança CalledProcessError em caso de falha).
+    Passos com requirements instalam só as linhas ainda não satisfeitas no venv.
+    Com um wheelhouse, instala sem índice e, se faltar alguma wheel, constrói as que faltam e tenta de novo.
+    """
+    env = venvEnvironment(venv_dir)
+    python = Path(venv_dir) / "bin" / "python"
+    if step.requirements is not None:
+        pending = unsatisfiedRequirements(python, step.requirements)
+        if not pending:
+            print(f"--- Já satisfeitas no venv: {step.description or step.command}")
+            return subprocess.CompletedProcess(step.command, 0, "", "")
+        if len(pending) < len(step.requirements):
+            print(f"--- {len(step.requirements) - len(pending)} dependências já satisfeitas; instalando {len(pending)}")
+        step = step._replace(requirements=pending)
+    if wheelhouse is None:
+        return _runStep(python, step, cwd, env)
+
+    try:
+        return _runStep(python, step, cwd, {**env, **wheelhouse.environment()})
+    except subprocess.CalledProcessError:
+        if wheelhouse.offline:
+            raise
+    wheel_step = wheelhouse.wheelStep(step)
+    if wheel_step is None:
+        return _runStep(python, step, cwd, {**env, **wheelhouse.environment(index=True)})
+    print(f"[WHEELHOUSE] Construindo as wheels que faltam: {step.description or step.command}")
+    _runStep(python, wheel_step, cwd, {**env, **wheelhouse.environment(index=True)})
+    return _runStep(python, step, cwd, {**env, **wheelhouse.environment()})
+
+
+def populateWheelhouse(wheelhouse: Wheelhouse, step: InstallStep, cwd: Path, python: str = sys.executable) -> bool:
+    """Constrói no wheelhouse as wheels de um passo, com o interpretador dado (as wheels dependem da versão).
+    :returns: False se o passo não gera wheels (ex: instala o próprio projeto)
+    """
+    wheel_step = wheelhouse.wheelStep(step)
+    if wheel_step is None:
+        return False
+    env = dict(os.environ)
+    env["PATH"] = os.pathsep.join([str(Path(python).parent), env.get("PATH", "")])
+    _runStep(Path(python), wheel_step, cwd, {**env, **wheelhouse.environment(index=True)})
+    return True
+
+
+def _digest(*parts: str) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        data = part.encode("utf-8", "surrogatepass")
+        h.update(len(data).to_bytes(8, "little"))
+        h.update(data)
+    return h.hexdigest()[:32]
+
+
+def _fileDigest(fileName: Path) -> str:
+    h = hashlib.sha256()
+    with open(fileName, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _relocate(venv_dir: Path, old: Path, new: Path) -> None:
+    """Reescreve os caminhos absolutos do venv (shebangs, activate, pyvenv.cfg) de old para new."""
+    old_bytes, new_bytes = str(old).encode(), str(new).encode()
+    candidates = [venv_dir / "pyvenv.cfg"]
+    bin_dir = venv_dir / "bin"
+    if bin_dir.is_dir():
+        candidates.extend(bin_dir.iterdir())
+    for fileName in candidates:
+        if fileName.is_symlink() or not fileName.is_file() or fileName.stat().st_size > (1 << 20):
+            continue
+        content = fileName.read_bytes()
+        if old_bytes in content:
+            mode = fileName.stat().st_mode
+            fileName.write_bytes(content.replace(old_bytes, new_bytes))
+            os.chmod(fileName, mode)
+
+
+class VenvCache:
+    """Cache de venvs em camadas.
+
+    :param root: diretório do cache.
+    :param python: interpretador usado para criar os venvs.
+    """
+
+    def __init__(self, root: Path, python: str = sys.executable) -> None:
+        self.root = Path(root).resolve()
+        self.layers_dir = self.root / "layers"
+        self.layers_dir.mkdir(parents=True, exist_ok=True)
+        self.python = python
+        self._python_version = subprocess.run([python, "-c", "import sys; print(sys.version)"],
+                                              check=True, capture_output=True, text=True).stdout.strip()
+
+    def layerPath(self, key: str) -> Path:
+        return self.layers_dir / key
+
+    def keys(self, steps: Sequence[InstallStep], cwd: Path, revision: Optional[str] = None) -> List[str]:
+        """Chaves da camada base e de cada passo."""
+        keys = [_digest("base", str(CACHE_VERSION), self._python_version, os.path.realpath(self.python))]
+        for step in steps:
+            parts = [keys[-1], repr(step.command), "\n".join(step.requirements or [])]
+            parts.extend(_fileDigest(Path(cwd) / name) for name in step.inputs)
+            if step.source:
+                # Sem um commit limpo não há como reconhecer o código depois: a camada nunca é reaproveitada
+                parts.extend([revision or f"sem-revisao-{uuid.uuid4()}", str(Path(cwd).resolve())])
+            keys.append(_digest(*parts))
+        return keys
+
+    def build(self, steps: Sequence[InstallStep], cwd: Path, revision: Optional[str] = None,
+              wheelhouse: Optional[Wheelhouse] = None) -> Path:
+        """Devolve o venv com todos os passos aplicados, montando só as camadas que ainda não existem.
+        :param steps: passos de instalação, em ordem
+        :param cwd: diretório do projeto, onde os passos são executados
+        :param revision: commit do projeto (ver sourceRevision)
+        :param wheelhouse: wheelhouse usado nas instalações das camadas novas
+        """
+        keys = self.keys(steps, cwd, revision)
+        ready = max((i for i, key in enumerate(keys) if self.layerPath(key).is_dir()), default=-1)
+        if ready == len(keys) - 1:
+            print(f"[CACHE] Ambiente virtual reaproveitado: {self.layerPath(keys[-1])}")
+            return self.layerPath(keys[-1])
+
+        if ready < 0:
+            self._materialize(keys[0], None, None, cwd, wheelhouse)
+            ready = 0
+        for i in range(ready + 1, len(keys)):
+            description = steps[i - 1].description or steps[i - 1].command
+            print(f"[CACHE] Camada {i}/{len(steps)}: {description}")
+            try:
+                self._materialize(keys[i], keys[i - 1], steps[i - 1], cwd, wheelhouse)
+            except subprocess.CalledProcessError as e:
+                print(f"!!!!!! ERRO ao instalar {description} !!!!!!\nErro (stderr):\n{e.stderr}\n"); raise
+        return self.layerPath(keys[-1])
+
+    def _materialize(self, key: str, parent: Optional[str], step: Optional[InstallStep], cwd: Path,
+                     wheelhouse: Optional[Wheelhouse] = None) -> None:
+        target = self.layerPath(key)
+        with self._lock(key):
+            if target.is_dir():
+                return
+            tmp = self.layers_dir / f"{key}.tmp-{os.getpid()}"
+            if tmp.exists():
+                shutil.rmtree(tmp)
+            try:
+                if parent is None:
+                    subprocess.run([self.python, "-m", "venv", "--prompt", "venv-cache", str(tmp)], check=True, capture_output=True, text=True)
+                else:
+                    shutil.copytree(self.layerPath(parent), tmp, symlinks=True)
+                    _relocate(tmp, self.layerPath(parent), tmp)
+                    runInstallStep(tmp, step, cwd, wheelhouse)
+                _relocate(tmp, tmp, target)
+                os.rename(tmp, target)
+            except BaseException:
+                shutil.rmtree(tmp, ignore_errors=True)
+                raise
+
+    @contextlib.contextmanager
+    def _lock(self, key: str) -> Iterator[None]:
+        with open(self.layers_dir / f"{key}.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
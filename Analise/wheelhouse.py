@@ -0,0 +1,62 @@
+""" Wheelhouse local: diretório de wheels construídas uma única vez e reaproveitadas nas instalações.
+
+Com um wheelhouse, cada instalação roda primeiro sem acesso ao índice (PIP_FIND_LINKS=<wheelhouse>,
+PIP_NO_INDEX=1). Se faltar alguma wheel, o passo é repetido como `pip wheel --wheel-dir <wheelhouse>` (com
+índice), que constrói só o que falta, e a instalação é refeita sem índice. Sdists pesados (numpy, scipy,
+scikit-image) são compilados uma vez por versão do Python, e no modo offline nenhuma instalação acessa a
+rede.
+
+Passos que instalam o próprio projeto nunca geram wheels: a wheel do projeto teria o mesmo nome em todos os
+commits. Eles usam o wheelhouse para as dependências e, fora do modo offline, o índice para o que faltar.
+"""
+from typing import Dict, Optional
+from pathlib import Path
+import os
+import shlex
+
+# Opções de `pip install` que `pip wheel` não aceita
+_INSTALL_ONLY_OPTIONS = ("-U", "--upgrade", "-e", "--editable", "--user", "--force-reinstall")
+
+
+class Wheelhouse:
+    """Diretório de wheels usado por todas as instalações.
+
+    :param root: diretório do wheelhouse (criado se não existir).
+    :param offline: se True, as instalações nunca usam o índice; uma wheel ausente é um erro.
+    """
+
+    def __init__(self, root: Path, offline: bool = False) -> None:
+        self.root = Path(root).resolve()
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.offline = offline
+
+    def environment(self, index: bool = False) -> Dict[str, str]:
+        """Variáveis do pip que apontam as instalações para o wheelhouse (também valem para as receitas de shell)."""
+        env = {"PIP_FIND_LINKS": str(self.root)}
+        if not index:
+            env["PIP_NO_INDEX"] = "1"
+        return env
+
+    def wheelStep(self, step):
+        """Passo equivalente que constrói as wheels de um passo de instalação no wheelhouse.
+        :param step: venv_cache.InstallStep
+        :returns: o InstallStep com `pip wheel`, ou None se o passo não for um `pip install` de dependências
+        """
+        if step.source:
+            return None
+        if isinstance(step.command, str):
+            tokens = shlex.split(step.command)
+            if tokens[:2] != ["pip", "install"]:
+                return None
+            arguments = [token for token in tokens[2:] if token not in _INSTALL_ONLY_OPTIONS]
+            if not arguments:
+                return None
+            command = shlex.join(["python", "-m", "pip", "wheel", "--wheel-dir", str(self.root), *arguments])
+            return step._replace(command=command)
+        if not step.command or step.command[0] != "install":
+            return None
+        arguments = [argument for argument in step.command[1:] if argument not in _INSTALL_ONLY_OPTIONS]
+        return step._replace(command=["wheel", "--wheel-dir", str(self.root), *arguments])
+
+    def wheelCount(self) -> int:
+        return sum(1 for name in os.listdir(self.root) if name.endswith(".whl"))
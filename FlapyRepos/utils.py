@@ -1,12 +1,14 @@
 import csv
 import os
 import subprocess
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
 
-def cloning(repos: Dict, hash: str) -> None:
+def cloning(repos: Dict, hash: str, git_cache: Optional[str] = None) -> None:
     """ (descontinuado) Realiza o cloning de um repositório, dado o dicionário de repositórios e sua respectiva chave.
     :param repos: dicionário de repositórios
     :param hash: hash do repositório a ser clonado
+    :param git_cache: diretório com espelhos bare; se informado, o repositório vira um worktree do espelho
+        (ver Analise/git_cache.py) em vez de um clone completo
     :returns: None
     """
     cwd = os.getcwd() + "/Repos"
@@ -14,14 +16,24 @@ def cloning(repos: Dict, hash: str) -> None:
     nome = repos[hash][0]
     url = repos[hash][1]
 
-    # Roda o git clone
-    subprocess.run(["git", "clone", url])
-
-    # Entra na pasta do repositorio clonado
-    os.chdir(cwd + "/" + nome)
-
-    # Faz o checkout para o commit da hash
-    subprocess.run(["git", "checkout", hash])
+    if git_cache:
+        espelho = os.path.join(os.path.abspath(git_cache), nome + ".git")
+        if not os.path.exists(espelho):
+            subprocess.run(["git", "clone", "--mirror", url, espelho])
+        elif subprocess.run(["git", "--git-dir", espelho, "cat-file", "-e", hash + "^{commit}"]).returncode != 0:
+            subprocess.run(["git", "--git-dir", espelho, "fetch", "origin", hash + ":refs/ttm/" + hash])
+        subprocess.run(["git", "--git-dir", espelho, "worktree", "prune"])
+        subprocess.run(["git", "--git-dir", espelho, "worktree", "add", "--detach", cwd + "/" + nome, hash])
+        os.chdir(cwd + "/" + nome)
+    else:
+        # Roda o git clone
+        subprocess.run(["git", "clone", url])
+
+        # Entra na pasta do repositorio clonado
+        os.chdir(cwd + "/" + nome)
+
+        # Faz o checkout para o commit da hash
+        subprocess.run(["git", "checkout", hash])
 
     pipping()
 
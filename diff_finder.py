@@ -0,0 +1,161 @@
+import csv
+import re
+import argparse
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+# Coluna chave (identifica a linha entre runs) e colunas numéricas de cada tipo de análise
+ANALYSIS_COLUMNS = {
+    "profiling": ("filename:lineno(function)", ("ncalls", "tottime", "cumtime")),
+    "tracing": ("Function", ("Call_Frequency",)),
+    "coverage": ("Test name", ("Percentual de Cobertura (%)", "Linhas Cobertas")),
+}
+RUN_PATTERN = re.compile(r"Run (\d+): (PASSED|FAILED) Tempo:")
+TOP_FUNCTIONS = 10
+
+def read_verdicts(test_directory: Path) -> Dict[int, str]:
+    """
+    Lê o veredito (PASSED/FAILED) de cada run no runsSummary.txt. Runs com outros vereditos ficam de fora.
+    """
+    verdicts = dict()
+    summary = test_directory / "runsSummary.txt"
+    if not summary.exists():
+        return verdicts
+    with open(summary, "r") as f:
+        for line in f:
+            match = RUN_PATTERN.search(line)
+            if match:
+                verdicts[int(match.group(1))] = match.group(2)
+    return verdicts
+
+def find_run_csv(run_dir: Path, key_column: str, metrics: Tuple[str, ...]) -> Optional[Path]:
+    """
+    Encontra o CSV da run que tem a coluna chave e todas as métricas pedidas.
+    """
+    for csv_file in sorted(run_dir.glob("*.csv")):
+        with open(csv_file, "r", encoding="utf-8", newline="") as f:
+            header = next(csv.reader(f), [])
+        if key_column in header and all(metric in header for metric in metrics):
+            return csv_file
+    return None
+
+def parse_number(value: str) -> float:
+    """
+    Converte um campo numérico do CSV; ncalls de funções recursivas vem como "total/primitivas".
+    """
+    value = (value or "").split("/")[0].strip()
+    try:
+        return float(value)
+    except ValueError:
+        return 0.0
+
+def load_matrix(test_directory: Path, key_column: str, metrics: Tuple[str, ...],
+                verdicts: Dict[int, str]) -> Tuple[List[str], List[int], np.ndarray]:
+    """
+    Carrega os CSVs de todas as runs em uma matriz métrica × chave × run. Uma chave ausente em uma run vale 0.
+    :returns: chaves, runs carregadas e a matriz (float64)
+    """
+    key_index: Dict[str, int] = dict()
+    runs: List[int] = []
+    key_ids, run_ids, values = [], [], []
+    for run in sorted(verdicts):
+        csv_file = find_run_csv(test_directory / f"Run-{run}", key_column, metrics)
+        if csv_file is None:
+            continue
+        column = len(runs)
+        runs.append(run)
+        with open(csv_file, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                key_ids.append(key_index.setdefault(row[key_column], len(key_index)))
+                run_ids.append(column)
+                values.append([parse_number(row[metric]) for metric in metrics])
+
+    matrix = np.zeros((len(metrics), len(key_index), len(runs)), dtype=np.float64)
+    if values:
+        # Chaves repetidas na mesma run são somadas
+        np.add.at(matrix, (slice(None), np.array(key_ids), np.array(run_ids)), np.array(values).T)
+    return list(key_index), runs, matrix
+
+def effect_sizes(matrix: np.ndarray, failed: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Médias por veredito e d de Cohen (FAILED - PASSED, desvio padrão combinado) de todas as linhas de uma vez.
+    Sem variância nos dois grupos, d é ±inf quando as médias diferem e 0 quando são iguais.
+    :param matrix: matriz métrica × chave × run
+    :param failed: máscara booleana das runs que falharam
+    :returns: média das que passaram, média das que falharam e d, cada um com forma métrica × chave
+    """
+    passed_values = matrix[..., ~failed]
+    failed_values = matrix[..., failed]
+    n_passed, n_failed = passed_values.shape[-1], failed_values.shape[-1]
+    mean_passed = passed_values.mean(axis=-1)
+    mean_failed = failed_values.mean(axis=-1)
+    var_passed = passed_values.var(axis=-1, ddof=1) if n_passed > 1 else np.zeros_like(mean_passed)
+    var_failed = failed_values.var(axis=-1, ddof=1) if n_failed > 1 else np.zeros_like(mean_failed)
+    dof = max(n_passed + n_failed - 2, 1)
+    pooled = np.sqrt(((n_passed - 1) * var_passed + (n_failed - 1) * var_failed) / dof)
+    # Médias iguais a menos do arredondamento da soma (ex: 0.2 vs 0.19999999999999998) não são diferença
+    difference = np.where(np.isclose(mean_failed, mean_passed, rtol=1e-9, atol=0.0), 0.0, mean_failed - mean_passed)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cohen_d = np.where(pooled > 0, difference / pooled, np.sign(difference) * np.inf)
+    cohen_d = np.where((pooled == 0) & (difference == 0), 0.0, cohen_d)
+    return mean_passed, mean_failed, cohen_d
+
+def compare_runs(test_directory: str, analysis_type: str, no_runs: int, key_column: str) -> Optional[Path]:
+    """
+    Compara as runs que passaram com as que falharam e grava diff_reports/<tipo>-effect_sizes.csv.
+    :returns: caminho do relatório, ou None se não há runs dos dois vereditos
+    """
+    if analysis_type not in ANALYSIS_COLUMNS:
+        raise ValueError(f"Tipo de análise inválido: {analysis_type}. Use {', '.join(ANALYSIS_COLUMNS)}.")
+    default_key, metrics = ANALYSIS_COLUMNS[analysis_type]
+    if key_column in metrics:
+        # Coverage tem uma linha por run: a coluna passada pelo main é uma métrica, não uma chave
+        key_column = default_key
+
+    test_path = Path(test_directory)
+    verdicts = read_verdicts(test_path)
+    keys, runs, matrix = load_matrix(test_path, key_column, metrics, verdicts)
+    if len(runs) < no_runs:
+        print(f"Aviso: {len(runs)} de {no_runs} runs com CSV de {analysis_type} em {test_directory}.")
+    failed = np.array([verdicts[run] == "FAILED" for run in runs], dtype=bool)
+    if not failed.any() or failed.all():
+        print(f"Nenhuma comparação PASSED vs FAILED possível em {test_directory}.")
+        return None
+
+    mean_passed, mean_failed, cohen_d = effect_sizes(matrix, failed)
+    metric_ids, key_ids = np.nonzero(cohen_d)
+    order = np.argsort(-np.abs(cohen_d[metric_ids, key_ids]), kind="stable")
+
+    report_dir = test_path / "diff_reports"
+    report_dir.mkdir(exist_ok=True)
+    report = report_dir / f"{analysis_type}-effect_sizes.csv"
+    with open(report, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow([key_column, "metric", "mean_passed", "mean_failed", "cohen_d"])
+        for index in order:
+            metric, key = metric_ids[index], key_ids[index]
+            writer.writerow([keys[key], metrics[metric], mean_passed[metric, key], mean_failed[metric, key],
+                             cohen_d[metric, key]])
+
+    print(f"{int((~failed).sum())} runs PASSED x {int(failed.sum())} runs FAILED, {len(keys)} linhas de {analysis_type}.")
+    for index in order[:TOP_FUNCTIONS]:
+        metric, key = metric_ids[index], key_ids[index]
+        print(f"  d={cohen_d[metric, key]:+.2f} {metrics[metric]} {keys[key]} "
+              f"({mean_passed[metric, key]:.4g} -> {mean_failed[metric, key]:.4g})")
+    print(f"Relatório salvo em {report}")
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara as runs que passaram e as que falharam de um teste (tamanho de efeito por função).")
+    parser.add_argument("test_directory", help="Diretório do teste (com runsSummary.txt e os Run-k)")
+    parser.add_argument("analysis_type", help="Tipo de análise", choices=list(ANALYSIS_COLUMNS))
+    parser.add_argument("no_runs", help="Quantidade de runs esperada", type=int)
+    parser.add_argument("key_column", help="Coluna que identifica a função nos CSVs")
+    args = parser.parse_args()
+
+    compare_runs(args.test_directory, args.analysis_type, args.no_runs, args.key_column)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,9 @@
-from Analise import utils
+from Analise import campaign, utils
 from os import path
 import os as os
 from typing import List
 import argparse
 import csv
-import subprocess
 import shutil
 from pathlib import Path
 import re
@@ -27,6 +26,22 @@ def str_to_int(value: str) -> int:
         return int(value)
     raise argparse.ArgumentTypeError(f"Valor inteiro invalido: {value}")
 
+def str_to_non_negative_int(value: str) -> int:
+    """Converte string para inteiro maior ou igual a zero."""
+    if value.isdigit():
+        return int(value)
+    raise argparse.ArgumentTypeError(f"Valor inteiro invalido: {value}")
+
+def str_to_probability(value: str) -> float:
+    """Converte string para um número estritamente entre 0 e 1."""
+    try:
+        number = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Valor invalido: {value}")
+    if 0 < number < 1:
+        return number
+    raise argparse.ArgumentTypeError(f"Valor deve estar entre 0 e 1: {value}")
+
 def argsDefiner():
     """Define, lê e processa os argumentos da linha de comando."""
     parser = argparse.ArgumentParser()
@@ -42,6 +57,37 @@ def argsDefiner():
     parser.add_argument("--include-test-profiling", help="Realizar o profiling dos testes", type=str_to_bool, default=False)
     parser.add_argument("--run-specific-test", help="Rodar a ferramenta em testes específicos a partir de um CSV.", type=str, default="")
     parser.add_argument("--venv-path", help="Caminho para o diretório do ambiente virtual a ser usado", type=str, default="")
+    parser.add_argument("--trace-backend", help="Backend do tracing: auto (sys.monitoring no Python 3.12+, senão sys.settrace), settrace ou monitoring",
+                        choices=["auto", "settrace", "monitoring"], default="auto")
+    parser.add_argument("--trace-buffer-mb", help="Memória máxima (MB) do buffer de tracing antes de descarregar um bloco para o disco", type=str_to_int, default=16)
+    parser.add_argument("--postprocess-workers", help="Processos que executam os parsers de cada run em paralelo com as próximas runs (0 = no próprio processo)",
+                        type=str_to_non_negative_int, default=2)
+    parser.add_argument("--jobs", help="Quantidade de processos que executam as runs em paralelo (1 = runs sequenciais no próprio processo)", type=str_to_int, default=1)
+    parser.add_argument("--runner", help="Como cada run é executada: inprocess (pytest.main no próprio processo) ou daemon (processo residente no venv, com um fork por run)",
+                        choices=["inprocess", "daemon"], default="inprocess")
+    parser.add_argument("--run-policy", help="fixed (sempre No_Runs) ou adaptive (para quando o veredito está estatisticamente definido)",
+                        choices=["fixed", "adaptive"], default="fixed")
+    parser.add_argument("--adaptive-target", help="Na política adaptive: pair (para na primeira dupla PASSED/FAILED) ou rate (estima a taxa de falha)",
+                        choices=["pair", "rate"], default="pair")
+    parser.add_argument("--confidence", help="Nível de confiança da política adaptive", type=str_to_probability, default=0.95)
+    parser.add_argument("--max-flake-rate", help="Taxa de flakiness abaixo da qual um teste sem resultados mistos é dado como estável", type=str_to_probability, default=0.05)
+    parser.add_argument("--rate-precision", help="Meia largura máxima do intervalo da taxa de falha no alvo rate", type=str_to_probability, default=0.1)
+    parser.add_argument("--instrumentation", help="always (toda run instrumentada) ou on-demand (runs sem instrumentação até observar PASSED e FAILED, depois instrumentadas)",
+                        choices=["always", "on-demand"], default="always")
+    parser.add_argument("--venv-root", help="Com --read-from-csv: diretório onde cada repositório ganha seu próprio ambiente virtual (exige --runner daemon)", type=str, default="")
+    parser.add_argument("--max-parallel-repos", help="Com --read-from-csv: quantos repositórios executar ao mesmo tempo", type=str_to_int, default=1)
+    parser.add_argument("--venv-cache", help="Diretório do cache de venvs (camadas por commit, requirements e versão do Python); substitui --venv-path/--venv-root e exige --runner daemon", type=str, default="")
+    parser.add_argument("--wheelhouse", help="Diretório de wheels locais usado nas instalações (as wheels que faltam são construídas uma vez e guardadas)", type=str, default="")
+    parser.add_argument("--offline", help="Instala apenas a partir do --wheelhouse, sem acessar o índice de pacotes", type=str_to_bool, default=False)
+    parser.add_argument("--populate-wheelhouse", help="Com --read-from-csv e --wheelhouse: só constrói as wheels das dependências de todos os repositórios do CSV", type=str_to_bool, default=False)
+    parser.add_argument("--git-cache", help="Diretório do cache git: um espelho por URL e um worktree por commit, no lugar de um clone completo por repositório", type=str, default="")
+    parser.add_argument("--prepare-ahead", help="Com --read-from-csv: quantos repositórios preparar (clone, venv, instalação) em segundo plano enquanto as runs executam (0 = em sequência)",
+                        type=str_to_non_negative_int, default=0)
+    parser.add_argument("--prepare-workers", help="Com --prepare-ahead: preparações de repositórios ao mesmo tempo", type=str_to_int, default=2)
+    parser.add_argument("--coverage-mode", help="Com --include-test-coverage: report (um relatório JSON por run) ou contexts (um banco do coverage por teste, com contexto Run-k, extraído ao fim das runs)",
+                        choices=["report", "contexts"], default="report")
+    parser.add_argument("--results-store", help="Diretório do armazém colunar (Parquet) que recebe os resultados de cada teste (runs, profiling, tracing, cobertura); exige o pyarrow", type=str, default="")
+    parser.add_argument("--artifacts-per-verdict", help="No modo on-demand, quantas runs instrumentadas capturar de cada veredito", type=str_to_int, default=3)
 
     args = parser.parse_args()
 
@@ -52,13 +98,62 @@ def argsDefiner():
     profiling = args.include_test_profiling
     specificTests = args.run_specific_test
     venvPath = args.venv_path
+    traceBackend = args.trace_backend
+    traceBufferMb = args.trace_buffer_mb
+    postprocessWorkers = args.postprocess_workers
+    jobs = args.jobs
+    runner = args.runner
+    runPolicy = args.run_policy
+    policyOptions = {
+        "target": args.adaptive_target,
+        "confidence": args.confidence,
+        "max_flake_rate": args.max_flake_rate,
+        "rate_precision": args.rate_precision
+    } if runPolicy == "adaptive" else {}
+    instrumentation = args.instrumentation
+    artifactsPerVerdict = args.artifacts_per_verdict
+    venvRoot = args.venv_root
+    maxParallelRepos = args.max_parallel_repos
+    prepareAhead = args.prepare_ahead
+    prepareWorkers = args.prepare_workers
+    venvCache = path.abspath(args.venv_cache) if args.venv_cache else None
+    wheelhouse = path.abspath(args.wheelhouse) if args.wheelhouse else None
+    offline = args.offline
+    gitCache = path.abspath(args.git_cache) if args.git_cache else None
+    coverageMode = args.coverage_mode
+    resultsStore = path.abspath(args.results_store) if args.results_store else None
+    if offline and not wheelhouse:
+        raise ValueError("O argumento --offline exige --wheelhouse")
+
+    # Opções de execução repassadas a cada runSpecificTests
+    runOptions = {
+        "trace_backend": traceBackend,
+        "trace_buffer_mb": traceBufferMb,
+        "postprocess_workers": postprocessWorkers,
+        "jobs": jobs,
+        "runner": runner,
+        "run_policy": runPolicy,
+        "policy_options": policyOptions,
+        "instrumentation": instrumentation,
+        "artifacts_per_verdict": artifactsPerVerdict,
+        "venv_cache": venvCache,
+        "wheelhouse": wheelhouse,
+        "offline": offline,
+        "git_cache": gitCache,
+        "coverage_mode": coverageMode,
+        "results_store": resultsStore
+    }
 
     # --- Lógica de Execução ---
-    if specificTests:
+    if args.populate_wheelhouse:
+        if not csvFile or not wheelhouse:
+            raise ValueError("--populate-wheelhouse exige --read-from-csv e --wheelhouse")
+        campaign.populateCampaignWheelhouse(path.abspath(csvFile), Path(wheelhouse), git_cache=gitCache)
+    elif specificTests:
         specificTests = path.abspath(specificTests)
         
-        if not venvPath:
-            raise ValueError("O argumento --venv-path é obrigatório ao usar --run-specific-test")
+        if bool(venvPath) == bool(venvCache):
+            raise ValueError("Use exatamente um entre --venv-path e --venv-cache ao usar --run-specific-test")
         
         with open(specificTests, "r", encoding="utf8") as csv_file:
             reader = list(csv.DictReader(csv_file, delimiter=","))
@@ -87,51 +182,15 @@ def argsDefiner():
                     params=[tracing, coverage, profiling],
                     test_node=test_node,
                     no_runs=test_no_runs,
-                    env_path=Path(venvPath)
+                    env_path=Path(venvPath) if venvPath else None,
+                    **runOptions
                 )
 
                 print(f"\n--- Iniciando pós-processamento com diff_finder.py ---")
                 
                 sanitized_test_name = re.sub(r'[^a-zA-Z0-9_\-]', '_', test_node.split("::")[-1])
                 test_directory = path.join(os.getcwd(), f"Test-{repo_name}", sanitized_test_name)
-
-                analise_tipo = ""
-                coluna_chave = ""
-
-                if profiling:
-                    analise_tipo = "profiling"
-                    coluna_chave = "filename:lineno(function)"
-                elif tracing:
-                    analise_tipo = "tracing"
-                    coluna_chave = "Function"
-                elif coverage:
-                    analise_tipo = "coverage"
-                    coluna_chave = "Percentual de Cobertura (%)"
-                
-                if analise_tipo:
-                    python_executable = Path(venvPath) / "bin" / "python"
-                    diff_finder_script = Path(os.getcwd()) / "diff_finder.py"
-
-                    command = [
-                        str(python_executable),
-                        str(diff_finder_script),
-                        test_directory,
-                        analise_tipo,
-                        str(test_no_runs),
-                        coluna_chave
-                    ]
-                    
-                    print(f"Executando comando: {' '.join(command)}")
-                    try:
-                        subprocess.run(command, check=True, text=True)
-                        print("--- diff_finder.py executado com sucesso. ---")
-                    except subprocess.CalledProcessError as e:
-                        print("!!!!!! ERRO ao executar o diff_finder.py !!!!!!")
-                        print(f"Comando: {' '.join(e.cmd)}")
-                        print(f"Código de Saída: {e.returncode}")
-                        print(f"Saída (stdout):\n{e.stdout}")
-                        print(f"Erro (stderr):\n{e.stderr}\n")
-                        raise 
+                campaign.runDiffFinder(test_directory, [tracing, coverage, profiling], test_no_runs)
 
             except Exception as e:
                 print(f"Erro ao executar o teste ou pós-processamento: {e}")
@@ -144,6 +203,20 @@ def argsDefiner():
                         writer.writeheader()
                         if len(reader) > 1:
                             writer.writerows(reader[1:])
+    elif csvFile:
+        # Campanha: todas as linhas do CSV, agrupadas por repositório (URL, Hash)
+        if sum(map(bool, (venvPath, venvRoot, venvCache))) != 1:
+            raise ValueError("Use exatamente um entre --venv-path (venv compartilhado), --venv-root (um venv por repositório) e --venv-cache com --read-from-csv")
+        campaign.runCampaign(
+            path.abspath(csvFile),
+            params=[tracing, coverage, profiling],
+            env_path=Path(venvPath) if venvPath else None,
+            venv_root=Path(venvRoot) if venvRoot else None,
+            max_parallel_repos=maxParallelRepos,
+            prepare_ahead=prepareAhead,
+            prepare_workers=prepareWorkers,
+            run_options=runOptions
+        )
     else:
         print("Nenhum fluxo de teste específico foi solicitado.")
 
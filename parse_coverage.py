@@ -1,10 +1,15 @@
 import json
 import csv
 import argparse
+import os
 import re
+from pathlib import Path
+from typing import Dict
+from Analise.coverage_bits import COVERAGE_DATABASE, CoverageBitsets, bitsetFile, linesToBitset
 
 def parse_coverage_data(input_file: str, output_file: str, test_result: str):
-    """Extrai dados de cobertura de arquivos JSON e escreve em um arquivo CSV."""
+    """Extrai dados de cobertura de arquivos JSON e escreve em um arquivo CSV, junto com os bitsets das linhas
+    executadas (<saída>-lines.json.gz)."""
     coverage_data = []
     pattern = r"Test-([^/]+)/([^/]+)/Run-(\d+)"
     match = re.search(pattern, input_file)
@@ -29,6 +34,10 @@ def parse_coverage_data(input_file: str, output_file: str, test_result: str):
             coverage_data.append([test_dir, test_name, count, test_result, percent_covered, covered_lines])
         else:
             print(f"Chave 'totals' não encontrada no arquivo: {input_file}")
+
+        # Linhas executadas por arquivo, em bitsets, para comparar runs sem reler o JSON
+        if "files" in json_data:
+            CoverageBitsets.fromCoverageJson(json_data).save(bitsetFile(output_file))
     
     except FileNotFoundError:
         print(f"Erro: Arquivo '{input_file}' não encontrado.")
@@ -42,14 +51,100 @@ def parse_coverage_data(input_file: str, output_file: str, test_result: str):
         csv_writer.writerow(['Project Name', 'Test name', 'Run', 'Test Result', 'Percentual de Cobertura (%)', 'Linhas Cobertas'])
         csv_writer.writerows(coverage_data)
 
+def combine_run_databases(output_test_dir: str) -> Path:
+    """Une os dados do coverage de cada run (coverage-runs.db.Run-k) no banco único do teste."""
+    from coverage import CoverageData
+
+    database = Path(output_test_dir) / COVERAGE_DATABASE
+    combined = CoverageData(basename=str(database))
+    combined.read()
+    for part in sorted(Path(output_test_dir).glob(f"{COVERAGE_DATABASE}.Run-*")):
+        run_data = CoverageData(basename=str(part))
+        run_data.read()
+        combined.update(run_data)
+        part.unlink()
+    combined.write()
+    return database
+
+def parse_coverage_contexts(output_test_dir: str, project_dir: str, results: Dict[str, str]) -> int:
+    """
+    Extrai de uma vez, do banco único do teste, as linhas executadas de cada run (contexto Run-k) e grava em
+    cada Run-k os mesmos arquivos do modo por run: <teste>-coverage.csv e <teste>-coverage-lines.json.gz.
+    :param results: veredito de cada run ({"0": "PASSED", ...})
+    :returns: quantidade de runs extraídas
+    """
+    from coverage import Coverage
+    from coverage.exceptions import NoDataError
+    try:
+        from coverage.report_core import get_analysis_to_report
+    except ImportError:
+        # coverage < 7.3
+        from coverage.report import get_analysis_to_report
+
+    test_dir = Path(output_test_dir)
+    database = combine_run_databases(output_test_dir)
+    # A configuração gerada para as runs traz o include/omit/exclude_lines do projeto (ver contextCoverageArgs)
+    config_files = sorted(test_dir.glob("Run-*/coveragerc"))
+    cov = Coverage(data_file=str(database), config_file=str(config_files[0]) if config_files else False)
+    cov.set_option("report:ignore_errors", True)
+    cov.load()
+    data = cov.get_data()
+
+    # Statements de cada arquivo: uma análise por arquivo para todas as runs. Os arquivos são os mesmos que o
+    # relatório JSON lista, incluindo os do source que nenhuma run importou (registrados sem linhas executadas)
+    statements = dict()
+    try:
+        for file_reporter, analysis in get_analysis_to_report(cov, None):
+            statements[file_reporter.filename] = linesToBitset(analysis.statements)
+    except NoDataError:
+        pass
+    total_statements = sum(bin(bits).count("1") for bits in statements.values())
+
+    # Mesmo nome de projeto do modo por run (Test-<repo>); str.removeprefix só existe a partir do Python 3.9
+    project_name = test_dir.parent.name
+    project_name = project_name[len("Test-"):] if project_name.startswith("Test-") else project_name
+
+    extracted = 0
+    for context in sorted(data.measured_contexts()):
+        match = re.fullmatch(r"Run-(\d+)", context)
+        if not match:
+            continue
+        data.set_query_contexts([f"^{re.escape(context)}$"])
+        executed = {name: linesToBitset(data.lines(name) or ()) for name in statements}
+        covered_lines = sum(bin(bits & statements[name]).count("1") for name, bits in executed.items())
+        bitsets = CoverageBitsets({os.path.relpath(name, project_dir): bits for name, bits in executed.items()})
+        percent_covered = 100.0 * covered_lines / total_statements if total_statements else 100.0
+
+        run_dir = test_dir / context
+        run_dir.mkdir(exist_ok=True)
+        output_file = run_dir / f"{test_dir.name}-coverage.csv"
+        with open(output_file, 'w', newline='') as csvfile:
+            csv_writer = csv.writer(csvfile)
+            csv_writer.writerow(['Project Name', 'Test name', 'Run', 'Test Result', 'Percentual de Cobertura (%)', 'Linhas Cobertas'])
+            csv_writer.writerow([project_name, test_dir.name, match.group(1),
+                                 results.get(match.group(1), "ERROR"), percent_covered, covered_lines])
+        bitsets.save(bitsetFile(output_file))
+        extracted += 1
+    return extracted
+
 def main():
     parser = argparse.ArgumentParser(description="Converte arquivos JSON de cobertura para CSV.")
-    parser.add_argument("--input_file", required=True, help="Arquivo de entrada (JSON) com dados de cobertura.")
-    parser.add_argument("--output_file", required=True, help="Arquivo de saída para os dados (CSV).")
-    parser.add_argument("--result", required=True, help="O resultado do teste (ex: PASSED, FAILED).")
+    parser.add_argument("--input_file", help="Arquivo de entrada (JSON) com dados de cobertura.")
+    parser.add_argument("--output_file", help="Arquivo de saída para os dados (CSV).")
+    parser.add_argument("--result", help="O resultado do teste (ex: PASSED, FAILED).")
+    parser.add_argument("--contexts", help="Diretório do teste: extrai as runs do banco único (modo contexts)")
+    parser.add_argument("--project_dir", help="Diretório do projeto medido (modo contexts)")
+    parser.add_argument("--results", help="JSON com o veredito de cada run (modo contexts)", default="{}")
     args = parser.parse_args()
 
-    parse_coverage_data(args.input_file, args.output_file, args.result)
+    if args.contexts:
+        if not args.project_dir:
+            parser.error("--contexts exige --project_dir")
+        parse_coverage_contexts(args.contexts, args.project_dir, json.loads(args.results))
+    elif args.input_file and args.output_file and args.result:
+        parse_coverage_data(args.input_file, args.output_file, args.result)
+    else:
+        parser.error("Informe --input_file, --output_file e --result, ou --contexts.")
 
 
 if __name__ == "__main__":
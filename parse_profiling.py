@@ -1,8 +1,15 @@
 import csv
 import re
 import argparse
+import marshal
+import pstats
+from typing import List, Tuple, Union
+
+PROFILING_COLUMNS = ['ncalls', 'primitive_calls', 'tottime', 'percall', 'cumtime', 'percall (cum)', 'filename:lineno(function)']
 
 def parse_profiling_data(input_file: str, output_file: str):
+    """(legado) Converte a saída em texto do pstats.print_stats para CSV. Prefira export_profiling_stats,
+    que lê o .prof/.pstat direto e não perde as linhas de funções recursivas (ncalls no formato "3/1")."""
     with open(input_file, 'r') as f:
         lines = f.readlines()
 
@@ -30,14 +37,75 @@ def parse_profiling_data(input_file: str, output_file: str):
         # Escrever os dados
         csv_writer.writerows(profiling_data)
 
+def profiling_rows(stats: pstats.Stats) -> List[Tuple[int, int, float, float, float, float, str]]:
+    """
+    Extrai as linhas tipadas direto de pstats.Stats.stats, na ordem de PROFILING_COLUMNS, ordenadas por ncalls.
+    O nome da função segue o formato do print_stats (filename:lineno(function)), para que os CSVs continuem
+    comparáveis com os gerados pelo parser de texto.
+    """
+    rows = []
+    for func, (primitive_calls, total_calls, tottime, cumtime, _callers) in stats.stats.items():
+        percall = tottime / total_calls if total_calls else 0.0
+        percall_cum = cumtime / primitive_calls if primitive_calls else 0.0
+        rows.append((total_calls, primitive_calls, tottime, percall, cumtime, percall_cum, pstats.func_std_string(func)))
+    rows.sort(key=lambda row: row[0], reverse=True)
+    return rows
+
+def export_profiling_stats(source: Union[str, pstats.Stats, object], output_file: str, output_format: str = "csv") -> int:
+    """
+    Exporta estatísticas do cProfile para uma tabela tipada, sem o ciclo print_stats -> regex.
+    :param source: arquivo .prof/.pstat, um pstats.Stats ou um cProfile.Profile
+    :param output_file: arquivo de saída
+    :param output_format: "csv" ou "npz" (colunar binário do NumPy, uma coluna por campo)
+    :returns: quantidade de funções exportadas
+    """
+    stats = source if isinstance(source, pstats.Stats) else pstats.Stats(source)
+    rows = profiling_rows(stats)
+
+    if output_format == "csv":
+        with open(output_file, 'w', newline='') as csvfile:
+            csv_writer = csv.writer(csvfile)
+            csv_writer.writerow(PROFILING_COLUMNS)
+            csv_writer.writerows(rows)
+    elif output_format == "npz":
+        import numpy as np
+        columns = list(zip(*rows)) if rows else [()] * len(PROFILING_COLUMNS)
+        with open(output_file, 'wb') as npzfile:
+            np.savez_compressed(
+                npzfile,
+                ncalls=np.array(columns[0], dtype=np.int64),
+                primitive_calls=np.array(columns[1], dtype=np.int64),
+                tottime=np.array(columns[2], dtype=np.float64),
+                percall=np.array(columns[3], dtype=np.float64),
+                cumtime=np.array(columns[4], dtype=np.float64),
+                percall_cum=np.array(columns[5], dtype=np.float64),
+                function=np.array(columns[6], dtype=str),
+            )
+    else:
+        raise ValueError(f"Formato de saída inválido: {output_format}. Use 'csv' ou 'npz'.")
+
+    return len(rows)
+
+def is_binary_stats(input_file: str) -> bool:
+    """Verifica se o arquivo é um dump binário do cProfile (.prof/.pstat) em vez da saída em texto."""
+    try:
+        with open(input_file, 'rb') as f:
+            return isinstance(marshal.load(f), dict)
+    except (EOFError, ValueError, TypeError):
+        return False
+
 def main():
-    parser = argparse.ArgumentParser(description="Converte um arquivo de perfilamento de texto para CSV")
-    parser.add_argument("--input_file", help="Arquivo de entrada com dados de perfilamento (TXT)")
-    parser.add_argument("--output_file", help="Arquivo de saída para os dados (CSV)")
+    parser = argparse.ArgumentParser(description="Converte dados de perfilamento (.prof/.pstat ou texto do print_stats) para CSV")
+    parser.add_argument("--input_file", help="Arquivo de entrada com dados de perfilamento (.prof/.pstat ou TXT)")
+    parser.add_argument("--output_file", help="Arquivo de saída para os dados (CSV ou NPZ)")
+    parser.add_argument("--format", help="Formato de saída para entradas binárias: csv ou npz", choices=["csv", "npz"], default="csv")
     args = parser.parse_args()
 
     if args.input_file and args.output_file:
-        parse_profiling_data(args.input_file, args.output_file)
+        if is_binary_stats(args.input_file):
+            export_profiling_stats(args.input_file, args.output_file, args.format)
+        else:
+            parse_profiling_data(args.input_file, args.output_file)
     else:
         print("Erro: Você deve fornecer --input_file e --output_file.")
 
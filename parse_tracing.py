@@ -4,10 +4,13 @@ import re
 import argparse
 from collections import Counter, defaultdict
 from pathlib import Path
+from Analise.trace_format import EVENT_CALL, isBinaryTrace, iterTraceEvents
+from Analise.fingerprint import fingerprint, formatFingerprint
 
 def parse_hierarchical_trace(input_file: str):
     """
     Processa o arquivo de tracing, lidando com retornos de objetos multi-linha.
+    :returns: frequência de chamadas por função e, por função, os valores de retorno distintos com seus fingerprints
     """
     if not Path(input_file).exists():
         print(f"Erro: Arquivo de entrada não encontrado: {input_file}")
@@ -16,6 +19,9 @@ def parse_hierarchical_trace(input_file: str):
     function_calls = Counter()
     return_values = defaultdict(list)
 
+    if isBinaryTrace(input_file):
+        return parse_binary_trace(input_file)
+
     call_pattern = re.compile(r"^\s*[>]*\s*([\w<>.-]+)\s+in\s+([\w./\\<>-]+)")
     
     return_pattern = re.compile(r"^\s*[<]*\s*([\w<>.-]+)\s+returned:\s*(.*)")
@@ -57,15 +63,38 @@ def parse_hierarchical_trace(input_file: str):
         print(f"Erro ao processar o arquivo de trace '{input_file}': {e}")
         return None, None
     
-    unique_return_values = defaultdict(set)
+    # No trace em texto não há fingerprints gravados: são calculados a partir do valor
+    unique_return_values = defaultdict(dict)
     for func, values in return_values.items():
-        unique_return_values[func] = set(values)
+        unique_return_values[func] = {value: fingerprint(value) for value in set(values)}
+
+    return function_calls, unique_return_values
+
+def parse_binary_trace(input_file: str):
+    """
+    Processa um trace no formato binário internado (calls.bin.gz), sem passar por texto nem regex.
+    Os fingerprints vêm do próprio trace (formato v2) ou são calculados pelo leitor (v1).
+    """
+    function_calls = Counter()
+    unique_return_values = defaultdict(dict)
+
+    try:
+        for kind, _depth, func_name, file_name, return_value, value_fingerprint in iterTraceEvents(input_file):
+            if kind == EVENT_CALL:
+                function_calls[f"{file_name}::{func_name}"] += 1
+            else:
+                unique_return_values[func_name][return_value] = value_fingerprint
+    except Exception as e:
+        print(f"Erro ao processar o arquivo de trace '{input_file}': {e}")
+        return None, None
 
     return function_calls, unique_return_values
 
 def save_to_csv(output_file: str, function_calls: Counter, return_values: defaultdict):
     """
-    Salva os resultados de frequência e valores de retorno em um arquivo CSV.
+    Salva os resultados de frequência e valores de retorno em um arquivo CSV, junto com os fingerprints
+    normalizados dos valores (sem endereços de memória e afins), comparáveis entre runs por igualdade.
+    :param return_values: por função, dicionário valor de retorno -> fingerprint
     """
     if not function_calls:
         print("Nenhuma chamada de função foi extraída. O arquivo CSV não será gerado.")
@@ -74,30 +103,39 @@ def save_to_csv(output_file: str, function_calls: Counter, return_values: defaul
     try:
         with open(output_file, mode='w', newline='', encoding='utf-8') as csv_file:
             writer = csv.writer(csv_file)
-            writer.writerow(['Function', 'Call_Frequency', 'Unique_Return_Values'])
+            writer.writerow(['Function', 'Call_Frequency', 'Unique_Return_Values', 'Return_Fingerprints'])
             
             for func_key, count in sorted(function_calls.items()):
                 func_name_only = func_key.split("::")[-1]
-                unique_returns_set = return_values.get(func_name_only, set())
-                returns_str = " | ".join(sorted(list(unique_returns_set)))
-                writer.writerow([func_key, count, returns_str])
+                unique_returns = return_values.get(func_name_only, dict())
+                returns_str = " | ".join(sorted(unique_returns))
+                fingerprints = {formatFingerprint(value_fingerprint) for value_fingerprint in unique_returns.values()}
+                writer.writerow([func_key, count, returns_str, " | ".join(sorted(fingerprints))])
         
         print(f"Análise concluída. Resultados salvos em {output_file}")
     except Exception as e:
         print(f"Erro ao escrever o arquivo CSV '{output_file}': {e}")
 
+def parse_tracing_file(input_file: str, output_file: str) -> bool:
+    """
+    Gera o CSV de frequências e valores de retorno a partir de um arquivo de trace.
+    :returns: True se o CSV foi gerado
+    """
+    print(f"Processando arquivo: {input_file}")
+    function_calls, return_values = parse_hierarchical_trace(input_file)
+    if not function_calls:
+        print("Processamento do arquivo de trace não gerou dados.")
+        return False
+    save_to_csv(output_file, function_calls, return_values)
+    return True
+
 def main():
     parser = argparse.ArgumentParser(description="Analisa um arquivo compactado de tracing hierárquico.")
-    parser.add_argument('--input_file', required=True, help="Caminho do arquivo .gz de entrada.")
+    parser.add_argument('--input_file', required=True, help="Caminho do arquivo .gz de entrada (texto ou binário).")
     parser.add_argument('--output_file', required=True, help="Caminho do arquivo CSV de saída.")
     args = parser.parse_args()
 
-    print(f"Processando arquivo: {args.input_file}")
-    function_calls, return_values = parse_hierarchical_trace(args.input_file)
-    if function_calls:
-        save_to_csv(args.output_file, function_calls, return_values)
-    else:
-        print("Processamento do arquivo de trace não gerou dados.")
+    parse_tracing_file(args.input_file, args.output_file)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
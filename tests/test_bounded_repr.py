@@ -0,0 +1,83 @@
+import time
+import tracemalloc
+
+import pytest
+
+from Analise.bounded_repr import REPR_LIMIT, UNREPRESENTABLE, BoundedRepr
+
+
+def expected(value):
+    text = repr(value)
+    return text if len(text) <= REPR_LIMIT else text[:REPR_LIMIT] + "..."
+
+
+@pytest.mark.parametrize("value", [
+    None, 42, 3.5, "curta", "x" * 500, b"y" * 500, bytearray(b"z" * 500),
+    list(range(1000)), tuple(range(1000)), {i: str(i) * 10 for i in range(100)}, ("único",),
+    {"a": [1, 2, {"b": "c" * 300}]},
+])
+def test_igual_ao_repr_truncado(value):
+    assert BoundedRepr()(value) == expected(value)
+
+
+@pytest.mark.parametrize("value", [
+    ["x" * 140, "y" * 50 + "'"],
+    "y" * 200 + "'",
+    "y" * 200 + "'\"",
+    ["a\\'" * 100 + '"'],
+    b"y" * 200 + b"'",
+    bytearray(b"'" * 3 + b"y" * 200),
+])
+def test_aspas_do_repr_completo(value):
+    assert BoundedRepr()(value) == expected(value)
+
+
+@pytest.mark.parametrize("value", [
+    ["x" * 147, "v" * 5_000_000],
+    {"k" * 200: "v" * 5_000_000},
+])
+def test_orcamento_negativo_nao_monta_o_valor_inteiro(value):
+    tracemalloc.start()
+    try:
+        text = BoundedRepr()(value)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert text == expected(value)
+    assert peak < 100_000
+
+
+def test_auto_referencia():
+    value = [1, 2]
+    value.append(value)
+    assert BoundedRepr()(value) == repr(value)
+
+
+def test_repr_que_falha():
+    class Broken:
+        def __repr__(self):
+            raise RuntimeError("falhou")
+
+    assert BoundedRepr()([1, Broken()]) == UNREPRESENTABLE
+
+
+def test_repr_padrao_de_object():
+    value = object()
+    assert BoundedRepr()(value) == repr(value)
+
+
+class Slow:
+    def __repr__(self):
+        time.sleep(0.005)
+        return "Slow()"
+
+
+def test_repr_lento_nao_muda_o_texto():
+    bounded = BoundedRepr()
+    assert [bounded(Slow()) for _ in range(3)] == ["Slow()"] * 3
+
+
+def test_tipos_com_placeholder():
+    value = Slow()
+    text = BoundedRepr(placeholder_types=[f"{__name__}.Slow"])(value)
+    assert text == f"<{__name__}.Slow instance at {hex(id(value))}>"
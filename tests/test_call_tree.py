@@ -0,0 +1,81 @@
+from Analise.call_tree import CallTree, callTreeReport, findDivergences
+
+TRACE = [
+    "> test_it in test_m.py\n",
+    ">> setup in m.py\n",
+    "<< setup returned: None\n",
+    ">> compute in m.py\n",
+    ">>> helper in m.py\n",
+    "<<< helper returned: 1\n",
+    "<< compute returned: 2\n",
+    "< test_it returned: None\n",
+]
+
+
+def divergences(linesA, linesB):
+    treeA, treeB = CallTree.fromLines(linesA), CallTree.fromLines(linesB)
+    return treeA, treeB, findDivergences(treeA, treeB)
+
+
+def test_arvore_montada_do_trace():
+    tree = CallTree.fromLines(TRACE)
+    assert tree.size[0] == 5
+    test_it = tree.children(0)[0]
+    assert [tree.labelOf(child) for child in tree.children(test_it)] == ["setup in m.py", "compute in m.py"]
+    helper = tree.children(tree.children(test_it)[1])[0]
+    assert tree.callPath(helper) == "test_it > compute > helper"
+    assert tree.values[helper] == "1"
+    assert tree.line[helper] == 5
+
+
+def test_arvores_iguais_sem_divergencia():
+    _, _, found = divergences(TRACE, list(TRACE))
+    assert found == []
+
+
+def test_enderecos_nao_contam():
+    other = [line.replace("returned: 1", "returned: <X at 0x1f>") for line in TRACE]
+    again = [line.replace("returned: 1", "returned: <X at 0x2e>") for line in TRACE]
+    assert divergences(other, again)[2] == []
+
+
+def test_retorno_diferente_aponta_a_folha():
+    changed = [line.replace("helper returned: 1", "helper returned: 7") for line in TRACE]
+    treeA, treeB, found = divergences(TRACE, changed)
+    # compute também retorna o mesmo valor, mas a divergência mínima é só a do helper
+    assert [(d.kind, treeA.callPath(d.nodeA), treeB.values[d.nodeB]) for d in found] == [
+        ("retorno diferente", "test_it > compute > helper", "7")]
+
+
+def test_chamada_extra_e_chamada_ausente():
+    extra = TRACE[:3] + [">> retry in m.py\n", "<< retry returned: None\n"] + TRACE[3:]
+    treeA, treeB, found = divergences(TRACE, extra)
+    assert [(d.kind, d.nodeA, treeB.callPath(d.nodeB), d.size) for d in found] == [
+        ("chamada só na run B", -1, "test_it > retry", 1)]
+
+    treeA, treeB, found = divergences(extra, TRACE)
+    assert [(d.kind, treeA.callPath(d.nodeA), d.nodeB) for d in found] == [
+        ("chamada só na run A", "test_it > retry", -1)]
+
+
+def test_pareia_pelo_nome_e_desce():
+    # A subárvore de compute muda de forma (helper chamado duas vezes); o pareamento pelo nome desce até o helper
+    changed = TRACE[:6] + [">>> helper in m.py\n", "<<< helper returned: 1\n"] + TRACE[6:]
+    treeA, treeB, found = divergences(TRACE, changed)
+    assert [(d.kind, treeB.callPath(d.nodeB)) for d in found] == [("chamada só na run B", "test_it > compute > helper")]
+
+
+def test_trace_truncado_fecha_as_chamadas():
+    tree = CallTree.fromLines(TRACE[:5])
+    assert tree.size[0] == 5
+    assert all(tree.hashes)
+
+
+def test_relatorio(tmp_path):
+    traceA, traceB = tmp_path / "a.txt", tmp_path / "b.txt"
+    traceA.write_text("".join(TRACE))
+    traceB.write_text("".join(line.replace("helper returned: 1", "helper returned: 7") for line in TRACE))
+    report = callTreeReport(str(traceA), str(traceB))
+    assert report[0] == "Divergências mínimas: 1\n"
+    assert report[1].startswith("Primeira divergência: test_it > compute > helper (linhas 5 em A e 5 em B)")
+    assert callTreeReport(str(traceA), str(traceA)) == []
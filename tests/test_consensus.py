@@ -0,0 +1,77 @@
+import csv
+
+import pytest
+
+from Analise.consensus import ConsensusAggregator, MisraGries, consensusReport
+
+
+def test_misra_gries_exato_dentro_da_capacidade():
+    summary = MisraGries(capacity=3)
+    for item in "aabbbc":
+        summary.add(item)
+    assert (summary.count("a"), summary.count("b"), summary.count("c"), summary.count("z")) == (2, 3, 1, 0)
+
+
+def test_misra_gries_subestima_no_maximo_n_sobre_k_mais_1():
+    capacity = 4
+    stream = ["frequente"] * 60 + [f"raro{i}" for i in range(100)]
+    summary = MisraGries(capacity)
+    for item in stream:
+        summary.add(item)
+    assert len(summary.counters) <= capacity
+    assert 60 - len(stream) / (capacity + 1) <= summary.count("frequente") <= 60
+
+
+def writeRun(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Function", "Call_Frequency", "Unique_Return_Values", "Return_Fingerprints"])
+        for function, calls, fingerprints in rows:
+            writer.writerow([function, calls, "", " | ".join(fingerprints)])
+    return str(path)
+
+
+@pytest.fixture
+def runs(tmp_path):
+    """Três runs que passaram e três que falharam: retry só nas que falharam, fetch retorna outro valor."""
+    result = []
+    for index in range(3):
+        result.append((writeRun(tmp_path / f"p{index}.csv", [("m.py::main", 1, ["aa"]), ("m.py::fetch", 2, ["ok"])]),
+                       "PASSED"))
+        result.append((writeRun(tmp_path / f"f{index}.csv", [("m.py::main", 1, ["aa"]), ("m.py::fetch", 2, ["erro"]),
+                                                             ("m.py::retry", 4 + index, [])]), "FAILED"))
+    return result
+
+
+def test_ranking_separa_os_vereditos(runs):
+    aggregator = ConsensusAggregator()
+    for csvFile, verdict in runs:
+        aggregator.addRun(csvFile, verdict)
+    ranking = aggregator.ranking()
+    assert {separation.function: separation.score for separation in ranking} == {"m.py::retry": 1.0,
+                                                                                  "m.py::fetch": 1.0}
+    assert ranking[0].function == "m.py::fetch"
+    assert "retorno" in ranking[0].reason
+    assert "chamada em 100% das runs que falharam e 0% das que passaram" in ranking[1].reason
+
+
+def test_relatorio(runs):
+    # "erro" e "ok" separam igualmente; no empate vence o retorno mais frequente nas runs que falharam
+    report = consensusReport(runs, limit=1)
+    assert report == ["m.py::fetch: separação 1.00 (retorno erro em 100% das runs que falharam e 0% das que passaram)\n"]
+
+
+def test_um_veredito_so_nao_gera_ranking(runs):
+    assert consensusReport([run for run in runs if run[1] == "PASSED"]) == []
+
+
+def test_veredito_invalido(runs):
+    with pytest.raises(ValueError):
+        ConsensusAggregator().addRun(runs[0][0], "SKIPPED")
+
+
+def test_empate_entre_fingerprints_usa_a_ordem_lexicografica(tmp_path):
+    runs = [(writeRun(tmp_path / "p.csv", [("m.py::f", 1, ["a"])]), "PASSED"),
+            (writeRun(tmp_path / "f.csv", [("m.py::f", 1, ["c", "b"])]), "FAILED")]
+    assert consensusReport(runs) == [
+        "m.py::f: separação 1.00 (retorno b em 100% das runs que falharam e 0% das que passaram)\n"]
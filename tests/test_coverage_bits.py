@@ -0,0 +1,69 @@
+import random
+
+import configparser
+
+from Analise.coverage_bits import (CoverageBitsets, bitsetFile, bitsetToLines, coverageDiff, formatLineRanges,
+                                   linesToBitset, reportCoverageArgs)
+
+
+def test_linhas_e_bitset_ida_e_volta():
+    rng = random.Random(1)
+    for _ in range(200):
+        lines = sorted(rng.sample(range(1, 3000), rng.randint(0, 200)))
+        bits = linesToBitset(lines)
+        assert bits == sum(1 << line for line in lines)
+        assert bitsetToLines(bits) == lines
+    assert linesToBitset([]) == 0
+    assert linesToBitset([5, 5, 3]) == 0b101000
+
+
+def test_intervalos():
+    assert formatLineRanges([3, 4, 5, 9, 11, 12]) == "3-5, 9, 11-12"
+    assert formatLineRanges([]) == ""
+
+
+def test_operacoes():
+    a = CoverageBitsets({"m.py": linesToBitset([1, 2, 3]), "n.py": linesToBitset([7])})
+    b = CoverageBitsets({"m.py": linesToBitset([2, 3, 4])})
+    assert dict((a | b).lines()) == {"m.py": [1, 2, 3, 4], "n.py": [7]}
+    assert dict((a & b).lines()) == {"m.py": [2, 3]}
+    assert dict((a ^ b).lines()) == {"m.py": [1, 4], "n.py": [7]}
+    assert dict((a - b).lines()) == {"m.py": [1], "n.py": [7]}
+    assert (a - a).files == {} and not (a - a)
+    assert (a | b).lineCount() == 5
+    assert CoverageBitsets.intersection([a, b, a]).files == (a & b).files
+    assert CoverageBitsets.intersection([]).files == {}
+
+
+def test_json_do_coverage_e_arquivo(tmp_path):
+    json_data = {"files": {"m.py": {"executed_lines": [1, 2, 10]}, "vazio.py": {"executed_lines": []}}}
+    bitsets = CoverageBitsets.fromCoverageJson(json_data)
+    assert dict(bitsets.lines()) == {"m.py": [1, 2, 10]}
+
+    bitset_file = bitsetFile(str(tmp_path / "t-coverage.csv"))
+    assert bitset_file.name == "t-coverage-lines.json.gz"
+    bitsets.save(bitset_file)
+    assert CoverageBitsets.load(bitset_file).files == bitsets.files
+
+
+def test_diff_entre_vereditos():
+    passed = [CoverageBitsets({"m.py": linesToBitset([1, 2, 3])}), CoverageBitsets({"m.py": linesToBitset([1, 2, 4])})]
+    failed = [CoverageBitsets({"m.py": linesToBitset([1, 2, 5, 6, 7]), "erro.py": linesToBitset([3])})]
+    assert coverageDiff(passed, failed) == [
+        "erro.py: 1 linha(s) só nas runs que falharam: 3\n",
+        "m.py: 3 linha(s) só nas runs que falharam: 5-7\n",
+        "m.py: 2 linha(s) só nas runs que passaram: 3-4\n",
+    ]
+    assert coverageDiff(passed, passed) == []
+
+
+def test_dados_do_modo_report_ficam_na_pasta_da_run(tmp_path):
+    (tmp_path / ".coveragerc").write_text("[run]\nomit = tests/*\n", encoding="utf-8")
+    run_dir = tmp_path / "out" / "Run-2"
+    run_dir.mkdir(parents=True)
+    args = reportCoverageArgs("src", run_dir, run_dir / "t-cov.json", tmp_path)
+    assert args[0] == "--cov=src" and args[2] == f"--cov-report=json:{run_dir / 't-cov.json'}"
+    config = configparser.ConfigParser(interpolation=None)
+    config.read(args[1].split("=", 1)[1])
+    assert config["run"]["data_file"] == str(run_dir.resolve() / ".coverage")
+    assert config["run"]["omit"] == "tests/*"
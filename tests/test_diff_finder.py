@@ -0,0 +1,51 @@
+from Analise.diff_finder import flakyFinder
+
+
+def writeTest(root, verdicts, instrumented):
+    """Diretório de um teste com o runsSummary.txt e um Run-k para cada run instrumentada."""
+    test_dir = root / "Test-repo" / "test_it"
+    test_dir.mkdir(parents=True)
+    lines = ["Teste: test_it\n"] + [f"Run {run}: {verdict} Tempo: 0.10\n" for run, verdict in enumerate(verdicts)]
+    (test_dir / "runsSummary.txt").write_text("".join(lines) + "Tempo total: 1.00\n")
+    for run in instrumented:
+        (test_dir / f"Run-{run}").mkdir()
+    return test_dir
+
+
+def test_uma_run_instrumentada_nao_procura_par(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    test_dir = writeTest(tmp_path, ["FAILED", "FAILED", "FAILED"], instrumented=[2])
+    flakyFinder("Test-repo")
+    summary = (test_dir / "runsSummary.txt").read_text()
+    assert summary.endswith("Veredito: NOT FLAKY\nApenas uma run instrumentada: nenhum par para comparar\n")
+
+
+def writeProfiling(run_dir, rows):
+    lines = ["ncalls,primitive_calls,tottime,percall,cumtime,percall (cum),filename:lineno(function)\n"]
+    lines += [f"{ncalls},{ncalls},0.1,0.1,0.2,0.2,{function}\n" for function, ncalls in rows]
+    (run_dir / "test_it-profiling.csv").write_text("".join(lines))
+
+
+def test_nao_flaky_compara_as_duas_primeiras_runs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    test_dir = writeTest(tmp_path, ["PASSED"] * 4, instrumented=[1, 2, 3])
+    writeProfiling(test_dir / "Run-1", [("m.py:1(f)", 3), ("m.py:5(g)", 1)])
+    writeProfiling(test_dir / "Run-2", [("m.py:1(f)", 4), ("m.py:9(h)", 2)])
+    flakyFinder("Test-repo")
+    summary = (test_dir / "runsSummary.txt").read_text()
+    assert "Veredito: NOT FLAKY\nEntre as runs 1 e 2: \n" in summary
+    assert ("No profiler, foram encontradas as diferencas: \n"
+            "m.py:1(f): ncalls A=3 B=4\n"
+            "m.py:5(g): chamada apenas na run A (1 chamadas)\n"
+            "m.py:9(h): chamada apenas na run B (2 chamadas)\n") in summary
+
+
+def test_flaky_compara_a_primeira_run_de_cada_veredito(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    test_dir = writeTest(tmp_path, ["FAILED", "PASSED", "FAILED", "PASSED"], instrumented=[0, 1, 2, 3])
+    for run in range(4):
+        writeProfiling(test_dir / f"Run-{run}", [("m.py:1(f)", 3)])
+    flakyFinder("Test-repo")
+    summary = (test_dir / "runsSummary.txt").read_text()
+    assert "Entre as runs 1 e 0: \n" in summary
+    assert "Nenhuma diferença encontrada no profiler\n" in summary
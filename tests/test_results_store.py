@@ -0,0 +1,88 @@
+import csv
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from Analise.coverage_bits import CoverageBitsets, bitsetFile
+from Analise.results_store import ResultsStore
+
+
+def writeCsv(path, header, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+@pytest.fixture
+def testDir(tmp_path):
+    """Diretório de um teste com duas runs instrumentadas (0 passou, 1 falhou) e uma sem instrumentação (2)."""
+    test_dir = tmp_path / "Test-repo" / "test_it"
+    for run, calls in ((0, 3), (1, 5)):
+        run_dir = test_dir / f"Run-{run}"
+        run_dir.mkdir(parents=True)
+        writeCsv(run_dir / "test_it-profiling.csv", ["ncalls", "primitive_calls", "tottime", "cumtime",
+                                                     "filename:lineno(function)"],
+                 [[calls, calls, 0.5, 1.5, "m.py:1(f)"], ["4/2", "", 0.1, 0.2, "m.py:9(g)"]])
+        writeCsv(run_dir / "test_it-tracing.csv", ["Function", "Call_Frequency", "Unique_Return_Values",
+                                                   "Return_Fingerprints"], [["m.py::f", calls, "1", "00ab"]])
+        coverage_csv = run_dir / "test_it-coverage.csv"
+        writeCsv(coverage_csv, ["Project Name", "Test name", "Run", "Test Result", "Percentual de Cobertura (%)",
+                                "Linhas Cobertas"], [["repo", "test_it", run, "PASSED", 50.0 + run, 2]])
+        CoverageBitsets({"m.py": 0b110 | run << 8}).save(bitsetFile(str(coverage_csv)))
+    return test_dir
+
+
+RESULTS = {0: ("PASSED", 0.1), 1: ("FAILED", 0.2), 2: ("PASSED", 0.3)}
+
+
+def test_append_e_query(tmp_path, testDir):
+    store = ResultsStore(tmp_path / "store")
+    store.appendTest("repo", "abc", "test_it", testDir, RESULTS)
+
+    runs = sorted(store.query("runs").to_pylist(), key=lambda row: row["run"])
+    assert [(row["run"], row["verdict"], row["instrumented"], row["coverage_percent"]) for row in runs] == [
+        (0, "PASSED", True, 50.0), (1, "FAILED", True, 51.0), (2, "PASSED", False, None)]
+
+    profile = store.query("profile", columns=["run", "function", "ncalls", "primitive_calls"], run=1)
+    assert sorted(profile.to_pylist(), key=lambda row: row["function"]) == [
+        {"run": 1, "function": "m.py:1(f)", "ncalls": 5, "primitive_calls": 5},
+        {"run": 1, "function": "m.py:9(g)", "ncalls": 4, "primitive_calls": 2}]
+
+    coverage = store.query("coverage", columns=["run", "covered_lines", "lines_bitset"], run=[0, 1])
+    bitsets = {row["run"]: int.from_bytes(row["lines_bitset"], "little") for row in coverage.to_pylist()}
+    assert bitsets == {0: 0b110, 1: 0b110 | 1 << 8}
+
+    assert store.flakyTests() == [dict(repo="repo", githash="abc", test="test_it", passed=2, failed=1)]
+
+
+def test_gravacao_repetida_substitui_a_anterior(tmp_path, testDir):
+    store = ResultsStore(tmp_path / "store")
+    store.appendTest("repo", "abc", "test_it", testDir, RESULTS)
+    store.appendTest("repo", "abc", "test_it", testDir, {**RESULTS, 1: ("PASSED", 0.2)})
+
+    assert store.query("runs").num_rows == 3
+    assert store.query("profile").num_rows == 4
+    # A linha FAILED da primeira gravação não volta por causa do filtro
+    assert store.query("runs", verdict="FAILED").num_rows == 0
+    assert store.flakyTests() == []
+
+
+def test_compact(tmp_path, testDir):
+    store = ResultsStore(tmp_path / "store")
+    store.appendTest("repo", "abc", "test_it", testDir, RESULTS)
+    store.appendTest("repo", "abc", "test_it", testDir, RESULTS)
+    store.appendTest("repo", "def", "test_it", testDir, RESULTS)
+    before = store.query("trace").sort_by("githash").to_pylist()
+
+    assert store.compact("trace") is not None
+    assert len(list((tmp_path / "store" / "trace").glob("part-*.parquet"))) == 1
+    assert store.compact("trace") is None
+    assert store.query("trace").sort_by("githash").to_pylist() == before
+    assert len(before) == 4
+
+
+def test_tabela_invalida(tmp_path):
+    with pytest.raises(ValueError):
+        ResultsStore(tmp_path / "store").append("outra", [{"repo": "x"}])
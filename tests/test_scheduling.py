@@ -0,0 +1,98 @@
+import pytest
+
+from Analise.scheduling import AdaptiveRunPolicy, RunPolicy, createRunPolicy, wilsonInterval, zeroEventUpperBound
+
+
+def runUntilStop(policy, verdicts):
+    """Alimenta a política com os vereditos até ela parar; devolve quantas runs foram executadas."""
+    for run, verdict in enumerate(verdicts):
+        policy.record(verdict, run, policy.instrumentNext())
+        if policy.shouldStop():
+            return run + 1
+    return len(verdicts)
+
+
+def test_fixa_executa_todas():
+    policy = RunPolicy(5)
+    assert runUntilStop(policy, ["PASSED", "FAILED"] * 10) == 5
+    assert policy.stop_reason == "limite de 5 runs atingido"
+
+
+def test_adaptativa_para_na_primeira_dupla():
+    policy = AdaptiveRunPolicy(100)
+    assert runUntilStop(policy, ["PASSED"] * 4 + ["FAILED"] + ["PASSED"] * 100) == 5
+    assert policy.stop_reason == "runs PASSED e FAILED observadas"
+
+
+def test_adaptativa_respeita_min_runs():
+    policy = AdaptiveRunPolicy(100, min_runs=6)
+    assert runUntilStop(policy, ["FAILED", "PASSED"] * 50) == 6
+
+
+def test_adaptativa_estavel_para_pelo_limite_de_zero_eventos():
+    policy = AdaptiveRunPolicy(200)
+    runs = runUntilStop(policy, ["PASSED"] * 200)
+    # 1 - 0.05^(1/n) <= 0.05 a partir de n = 59
+    assert runs == 59
+    assert zeroEventUpperBound(58) > 0.05 >= zeroEventUpperBound(59)
+
+
+def test_adaptativa_alvo_taxa_ate_a_precisao():
+    policy = AdaptiveRunPolicy(1000, target="rate", rate_precision=0.1)
+    runs = runUntilStop(policy, ["PASSED", "FAILED"] * 500)
+    low, high = wilsonInterval(runs // 2, runs)
+    assert (high - low) / 2 <= 0.1
+    low, high = wilsonInterval((runs - 2) // 2, runs - 2)
+    assert (high - low) / 2 > 0.1
+
+
+def test_adaptativa_nao_passa_do_maximo():
+    policy = AdaptiveRunPolicy(10)
+    assert runUntilStop(policy, ["PASSED"] * 100) == 10
+    assert policy.stop_reason == "limite de 10 runs atingido"
+
+
+def test_wilson():
+    assert wilsonInterval(0, 0) == (0.0, 1.0)
+    low, high = wilsonInterval(5, 10)
+    assert low < 0.5 < high and abs((low + high) / 2 - 0.5) < 1e-9
+
+
+@pytest.mark.parametrize("kwargs", [dict(confidence=1.5), dict(target="x"), dict(rate_precision=0),
+                                    dict(max_flake_rate=1)])
+def test_opcoes_invalidas(kwargs):
+    with pytest.raises(ValueError):
+        AdaptiveRunPolicy(10, **kwargs)
+
+
+def test_politica_invalida():
+    with pytest.raises(ValueError):
+        createRunPolicy("outra", 10)
+
+
+def test_sob_demanda_instrumenta_depois_da_dupla():
+    policy = createRunPolicy("fixed", 50, instrumentation="on-demand", artifacts_per_verdict=2)
+    verdicts = ["PASSED", "PASSED", "FAILED"] + ["PASSED", "FAILED"] * 10
+    instrumented = []
+    for run, verdict in enumerate(verdicts):
+        instrumented.append(policy.instrumentNext())
+        policy.record(verdict, run, instrumented[-1])
+        if policy.shouldStop():
+            break
+    assert instrumented == [False, False, False, True, True, True, True]
+    assert policy.instrumented_runs == [3, 4, 5, 6]
+    assert policy.stop_reason == "2 runs instrumentadas de cada veredito capturadas"
+
+
+def test_sob_demanda_teste_estavel_nao_instrumenta():
+    policy = createRunPolicy("adaptive", 200, instrumentation="on-demand")
+    assert runUntilStop(policy, ["PASSED"] * 200) == 59
+    assert policy.instrumented_runs == []
+    assert policy.stop_reason.startswith("fase sem instrumentação: 59 runs PASSED")
+
+
+def test_sob_demanda_limite_com_uma_run_instrumentada():
+    # O limite pode chegar logo depois da dupla: sobra uma única run instrumentada (ver flakyFinder)
+    policy = createRunPolicy("fixed", 3, instrumentation="on-demand")
+    assert runUntilStop(policy, ["PASSED", "FAILED", "FAILED"]) == 3
+    assert policy.instrumented_runs == [2]
@@ -0,0 +1,79 @@
+import difflib
+import random
+import re
+
+import pytest
+
+from Analise.trace_diff import iterDiffHunks
+
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+def unifiedHunks(a, b):
+    """Hunks do difflib.unified_diff, no mesmo formato do iterDiffHunks (sem o cabeçalho ---/+++)."""
+    hunks = []
+    for line in list(difflib.unified_diff(a, b))[2:]:
+        if line.startswith("@@"):
+            hunks.append([line.rstrip("\n").rstrip() + "\n"])
+        else:
+            hunks[-1].append(line)
+    return hunks
+
+
+def applyHunks(a, hunks):
+    """Aplica os hunks em a, conferindo as linhas de contexto e as removidas."""
+    result, position = [], 0
+    for hunk in hunks:
+        start, length = int(HUNK_HEADER.match(hunk[0]).group(1)), HUNK_HEADER.match(hunk[0]).group(2)
+        start = start - 1 if length != "0" else start
+        result.extend(a[position:start])
+        position = start
+        for line in hunk[1:]:
+            if line[0] in " -":
+                assert a[position] == line[1:]
+                position += 1
+            if line[0] in " +":
+                result.append(line[1:])
+    return result + a[position:]
+
+
+@pytest.mark.parametrize("a, b", [
+    (["a\n", "b\n", "c\n"], ["a\n", "b\n", "c\n"]),
+    (["a\n", "b\n", "c\n"], ["a\n", "x\n", "c\n"]),
+    ([f"{i}\n" for i in range(20)], [f"{i}\n" for i in range(20) if i != 10]),
+    ([f"{i}\n" for i in range(20)], [f"{i}\n" for i in range(20)] + ["novo\n"]),
+    ([], ["a\n", "b\n"]),
+    (["a\n", "b\n"], []),
+    ([f"{i}\n" for i in range(30)], ["x\n"] + [f"{i}\n" for i in range(30) if i not in (5, 20)] + ["y\n"]),
+])
+def test_igual_ao_unified_diff(a, b):
+    assert list(iterDiffHunks(a, b)) == unifiedHunks(a, b)
+
+
+def test_hunks_reconstroem_o_trace_b():
+    rng = random.Random(7)
+    for _ in range(300):
+        a = [f"{rng.choice('abcde')}\n" for _ in range(rng.randint(0, 40))]
+        b = list(a)
+        for _ in range(rng.randint(0, 6)):
+            position = rng.randint(0, len(b))
+            if b and rng.random() < 0.5:
+                del b[min(position, len(b) - 1)]
+            else:
+                b.insert(position, f"{rng.choice('abcxyz')}\n")
+        hunks = list(iterDiffHunks(a, b))
+        assert applyHunks(a, hunks) == b
+        assert (hunks == []) == (a == b)
+
+
+def test_custo_limitado_ainda_reconstroi():
+    rng = random.Random(3)
+    a = [f"{rng.randint(0, 3)}\n" for _ in range(300)]
+    b = [f"{rng.randint(0, 3)}\n" for _ in range(300)]
+    assert applyHunks(a, list(iterDiffHunks(a, b, max_edit_cost=8))) == b
+
+
+def test_enderecos_de_memoria_sao_ignorados():
+    a = ["> f in m.py\n", "< f returned: <Obj at 0x7f12>\n"]
+    b = ["> f in m.py\n", "< f returned: <Obj at 0x55aa>\n"]
+    assert list(iterDiffHunks(a, b)) == []
@@ -0,0 +1,92 @@
+import gzip
+import json
+
+import pytest
+
+from Analise.fingerprint import fingerprint
+from Analise.trace_format import (EVENT_CALL, EVENT_RETURN, FRAME, FRAME_EVENTS, FRAME_FUNCTIONS, FRAME_VALUES,
+                                  HEADER, MAGIC, TraceRecorder, isBinaryTrace, iterTraceEvents, iterTraceLines)
+
+EVENTS = [
+    (EVENT_CALL, 1, "main", "app.py", None),
+    (EVENT_CALL, 2, "helper", "util/h.py", None),
+    (EVENT_RETURN, 2, "helper", "util/h.py", "<Obj at 0x7f00>"),
+    (EVENT_CALL, 2, "helper", "util/h.py", None),
+    (EVENT_RETURN, 2, "helper", "util/h.py", "<Obj at 0x7f00>"),
+    (EVENT_RETURN, 1, "main", "app.py", "'olá'"),
+]
+
+
+def record(recorder, events):
+    for kind, depth, name, path, value in events:
+        function_id = recorder.internFunction(name, path)
+        if kind == EVENT_CALL:
+            recorder.recordCall(depth, function_id)
+        else:
+            recorder.recordReturn(depth, function_id, value)
+
+
+def withFingerprints(events):
+    return [event + (None if event[4] is None else fingerprint(event[4]),) for event in events]
+
+
+def test_ida_e_volta_v2(tmp_path):
+    trace = tmp_path / "calls.bin.gz"
+    recorder = TraceRecorder()
+    record(recorder, EVENTS)
+    with gzip.open(trace, "wb") as f:
+        recorder.write(f)
+
+    assert isBinaryTrace(str(trace))
+    assert list(iterTraceEvents(str(trace))) == withFingerprints(EVENTS)
+    assert list(iterTraceLines(str(trace)))[:3] == ["> main in app.py\n", ">> helper in util/h.py\n",
+                                                    "<< helper returned: <Obj at 0x7f00>\n"]
+
+
+def test_leitura_v1_calcula_os_fingerprints(tmp_path):
+    trace = tmp_path / "calls.bin.gz"
+    functions = [["main", "app.py"]]
+    columns = [[EVENT_CALL, EVENT_RETURN], [1, 1], [0, 0], [0, 1]]
+    with gzip.open(trace, "wb") as f:
+        f.write(HEADER.pack(MAGIC, 1))
+        for kind, payload in ((FRAME_FUNCTIONS, json.dumps(functions).encode()),
+                              (FRAME_VALUES, json.dumps(["42"]).encode()),
+                              (FRAME_EVENTS, b"".join(value.to_bytes(4, "little")
+                                                      for column in columns for value in column))):
+            f.write(FRAME.pack(kind, len(payload)) + payload)
+
+    assert list(iterTraceEvents(str(trace))) == [(EVENT_CALL, 1, "main", "app.py", None, None),
+                                                 (EVENT_RETURN, 1, "main", "app.py", "42", fingerprint("42"))]
+
+
+def test_versao_mais_nova_e_recusada(tmp_path):
+    trace = tmp_path / "calls.bin.gz"
+    with gzip.open(trace, "wb") as f:
+        f.write(HEADER.pack(MAGIC, 99))
+    with pytest.raises(ValueError):
+        list(iterTraceEvents(str(trace)))
+
+
+def test_descarga_no_limite_do_buffer(tmp_path):
+    chunks = []
+    recorder = TraceRecorder(sink=chunks.append, max_buffer_bytes=64)
+    events = EVENTS * 50 + [(EVENT_RETURN, 1, "main", "app.py", "x" * 100)]
+    record(recorder, events)
+    recorder.flush()
+
+    assert len(chunks) > 1
+    assert len(recorder) == len(events)
+    # Cada lote só traz as entradas novas das tabelas; concatenados formam um único trace válido
+    trace = tmp_path / "calls.bin.gz"
+    with gzip.open(trace, "wb") as f:
+        for chunk in chunks:
+            f.write(chunk)
+    assert list(iterTraceEvents(str(trace))) == withFingerprints(events)
+
+
+def test_trace_em_texto(tmp_path):
+    trace = tmp_path / "calls.gz"
+    with gzip.open(trace, "wt", encoding="utf-8") as f:
+        f.write("> main in app.py\n< main returned: 1\n")
+    assert not isBinaryTrace(str(trace))
+    assert list(iterTraceLines(str(trace))) == ["> main in app.py\n", "< main returned: 1\n"]